@@ -0,0 +1,73 @@
+""" adaptive_quality.py
+
+Per-level cost of the quality ladder and a closed loop run of the
+QualityController on a recording.
+
+python adaptive_quality.py [recording] [--frames 300] [--target-fps 30]
+
+First times the dual-engine setup at every level of DEFAULT_QUALITY_LADDER,
+then replays the frames with the controller picking the level and reports
+level changes and the frame rate it held. Without a recording, random frames
+(no hands) are used.
+"""
+import argparse
+import time
+
+import numpy as np
+import handyvision as hv
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--target-fps", type=float, default=30.0)
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = load_frames(args.recording, args.frames, args.width, args.height, mirror=False)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(args.frames)]
+
+    inference = rtg.create_inference(rtg.InferenceMode.DUAL_ENGINE, mirror=True)
+    preprocessor = inference.create_preprocessor()
+
+    def process(frame):
+        inference.update(preprocessor.process_inputs(frame))
+        return inference.get_gesture_estimations()
+
+    print(f"Budget at {args.target_fps:.0f} fps: {1000.0 / args.target_fps:.1f}ms")
+    for index, level in enumerate(hv.DEFAULT_QUALITY_LADDER):
+        inference.set_quality(level)
+        times, _ = time_per_frame(frames[:min(len(frames), 60)], process)
+        summarize(f"Q{index} {level.short_name()}", times)
+
+    controller = hv.QualityController(target_fps=args.target_fps)
+    inference.set_quality(controller.level)
+    frame_times = np.empty(len(frames))
+    trace = []
+    for i, frame in enumerate(frames):
+        start = time.perf_counter()
+        process(frame)
+        frame_times[i] = time.perf_counter() - start
+        if controller.update(frame_times[i]):
+            inference.set_quality(controller.level)
+            trace.append((i, controller.describe()))
+    inference.release()
+
+    print(f"Level changes: {len(trace)}")
+    for i, level in trace:
+        print(f"    frame {i:5d} -> {level}")
+    settled = frame_times[len(frame_times) // 2:]
+    print(f"Final level: {controller.describe()}")
+    print(f"Second half: {1.0 / settled.mean():.1f} fps ({settled.mean() * 1000.0:.1f}ms mean)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+""" bench_utils.py
+
+Shared helpers for the benchmarking scripts.
+
+Benchmarks run on recorded sessions (video file or image folder) so they
+can be repeated on a headless box without a webcam.
+"""
+import time
+
+import cv2 as cv
+import numpy as np
+import handyvision as hv
+
+from typing import Callable, List, Tuple, Any
+
+
+def load_frames(path: str, max_frames: int = 300, width: int = 1280, height: int = 720, mirror: bool = True) -> List[np.ndarray]:
+    """ Decode up to max_frames BGR frames from a recording, resized to (width, height)
+
+    Frames are mirrored like the game does unless mirror is False.
+    Decoding happens up front so it does not count towards timings.
+    """
+    source = hv.open_frame_source(path, hv.PlaybackMode.FAST)
+    if not source.good():
+        raise SystemExit(f"Could not open recording: {path}")
+    source.set_resolution(width, height)
+
+    frames = []
+    while len(frames) < max_frames:
+        got_frame, frame = source.get_frame()
+        if not got_frame:
+            break
+        frames.append(cv.flip(frame, 1) if mirror else frame)
+    source.release()
+
+    print(f"Loaded {len(frames)} frames from {path}")
+    return frames
+
+
+def time_per_frame(frames: List[np.ndarray], process: Callable[[np.ndarray], Any], warmup: int = 5) -> Tuple[np.ndarray, List[Any]]:
+    """ Run process over every frame, return (per frame seconds, outputs)
+
+    The first warmup frames are processed but not timed.
+    """
+    for frame in frames[:warmup]:
+        process(frame)
+
+    times = np.empty(len(frames))
+    outputs = []
+    for i, frame in enumerate(frames):
+        start = time.perf_counter()
+        outputs.append(process(frame))
+        times[i] = time.perf_counter() - start
+    return times, outputs
+
+
+def summarize(name: str, times_s: np.ndarray) -> dict:
+    """ Print and return mean / p50 / p95 / max frame time in ms and mean fps
+    """
+    ms = np.asarray(times_s) * 1000.0
+    summary = {
+        "name": name,
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "max_ms": float(ms.max()),
+        "fps": float(1000.0 / max(ms.mean(), 1e-9)),
+    }
+    print(
+        f"{name:<28} mean {summary['mean_ms']:8.2f}ms  p50 {summary['p50_ms']:8.2f}ms  "
+        f"p95 {summary['p95_ms']:8.2f}ms  max {summary['max_ms']:8.2f}ms  fps {summary['fps']:7.1f}"
+    )
+    return summary
+
+
+def agreement(reference: List[Any], candidate: List[Any]) -> float:
+    """ Fraction of frames where candidate output equals the reference output
+    """
+    if not reference:
+        return 1.0
+    matches = sum(1 for a, b in zip(reference, candidate) if a == b)
+    return matches / len(reference)
@@ -0,0 +1,64 @@
+""" digit_classifier.py
+
+Compare per-hand detect_digits / get_gesture against the batched
+classify_hands_batch classifier.
+
+python digit_classifier.py [--points hands.npy] [--hands 5000]
+
+--points: (N, 21, 3) array of recorded landmarks (e.g. saved HandState.points),
+          random hand-like landmarks are generated when not given.
+"""
+import argparse
+import time
+
+import numpy as np
+import handyvision as hv
+
+
+def random_hands(count: int, seed: int = 0) -> np.ndarray:
+    """ Random hand-like landmark sets: fingers fanned out from the wrist,
+    each randomly extended or curled
+    """
+    rng = np.random.default_rng(seed)
+    points = np.zeros((count, 21, 3), dtype=np.float32)
+    size = rng.uniform(0.05, 0.2, count)
+    points[:, hv.HandLandmark.WRIST, :2] = 0.5
+    for finger in range(5):
+        angle = np.deg2rad(-150 + 30 * finger + rng.normal(0, 10, count))
+        extended = rng.random(count) > 0.5
+        for joint in range(4):
+            reach = size * (0.5 + 0.35 * joint) * np.where(extended | (joint == 0), 1.0, 0.6 - 0.2 * joint)
+            points[:, 1 + 4 * finger + joint, 0] = 0.5 + reach * np.cos(angle)
+            points[:, 1 + 4 * finger + joint, 1] = 0.5 + reach * np.sin(angle)
+    points[..., :2] += rng.normal(0, 0.01, (count, 21, 2))
+    return points
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", help="(N, 21, 3) .npy landmark file")
+    parser.add_argument("--hands", type=int, default=5000)
+    args = parser.parse_args()
+
+    points = np.load(args.points) if args.points else random_hands(args.hands)
+    hands = [hv.HandState(p, hv.Handedness.LEFT) for p in points]
+    print(f"Classifying {len(hands)} hands")
+
+    start = time.perf_counter()
+    loop_gestures = [hv.get_gesture(hv.detect_digits(hand)) for hand in hands]
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    digits, codes = hv.classify_hands_batch(points)
+    batch_s = time.perf_counter() - start
+
+    batch_gestures = [None if c == hv.UNKNOWN_GESTURE_CODE else hv.Gesture(c) for c in codes.tolist()]
+    matches = sum(a == b for a, b in zip(loop_gestures, batch_gestures))
+
+    print(f"Per-hand loop: {loop_s * 1000:9.2f}ms ({loop_s * 1e6 / len(hands):7.2f}us/hand)")
+    print(f"Batched:       {batch_s * 1000:9.2f}ms ({batch_s * 1e6 / len(hands):7.2f}us/hand)")
+    print(f"Speedup: {loop_s / batch_s:.1f}x, agreement {matches}/{len(hands)}")
+
+
+if __name__ == "__main__":
+    main()
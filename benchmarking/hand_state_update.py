@@ -0,0 +1,106 @@
+""" hand_state_update.py
+
+Micro-benchmark of HPEE.__update_hand_states post-processing: turning
+mediapipe results into HandStates, without the model inference itself.
+
+python hand_state_update.py [--hands 2] [--iterations 5000]
+
+before: per hand MessageToDict for the handedness label, then a HandState
+        built from the landmark protobuf
+after:  the current HPEE path, handedness read from the classification
+        message and all hands converted to numpy in one pass
+"""
+import argparse
+import time
+
+import numpy as np
+import handyvision as hv
+
+from google.protobuf.json_format import MessageToDict
+from mediapipe.framework.formats import landmark_pb2, classification_pb2
+
+
+class CannedResults:
+    """ Stands in for the mediapipe model, returns the same results every call
+    """
+    def __init__(self, multi_hand_landmarks, multi_handedness):
+        self.multi_hand_landmarks = multi_hand_landmarks
+        self.multi_handedness = multi_handedness
+
+    def process(self, frame):
+        return self
+
+
+def make_results(num_hands: int, seed: int = 0) -> CannedResults:
+    """ Mediapipe style results for num_hands random hands, alternating left/right
+    """
+    rng = np.random.default_rng(seed)
+    multi_hand_landmarks = []
+    multi_handedness = []
+    for i in range(num_hands):
+        landmarks = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z in rng.random((21, 3)).tolist():
+            landmarks.landmark.add(x=x, y=y, z=z)
+        multi_hand_landmarks.append(landmarks)
+
+        handedness = classification_pb2.ClassificationList()
+        label = "Left" if i % 2 == 0 else "Right"
+        handedness.classification.add(index=i % 2, score=0.95, label=label)
+        multi_handedness.append(handedness)
+    return CannedResults(multi_hand_landmarks, multi_handedness)
+
+
+def update_hand_states_before(results: CannedResults):
+    """ The hand state update as it was before, MessageToDict per hand
+    """
+    left, right = None, None
+    for mp_landmark, mp_handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
+        label = MessageToDict(mp_handedness)["classification"][0]["label"]
+        hand = hv.HandState(mp_landmark.landmark, hv.Handedness[label.upper()])
+        if hand.handedness == hv.Handedness.LEFT:
+            left = hand
+        else:
+            right = hand
+    return left, right
+
+
+def time_call(fn, iterations: int) -> float:
+    """ Mean microseconds per call
+    """
+    for _ in range(min(100, iterations)):
+        fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1e6 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hands", type=int, default=2)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    results = make_results(args.hands)
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    hpee = hv.HPEE(hv.HPEEConfig(max_hands=args.hands))
+    hpee.model = results
+    update_after = lambda: hpee._HPEE__update_hand_states(frame)
+
+    before_us = time_call(lambda: update_hand_states_before(results), args.iterations)
+    after_us = time_call(update_after, args.iterations)
+    handedness_us = time_call(
+        lambda: [MessageToDict(h)["classification"][0]["label"] for h in results.multi_handedness],
+        args.iterations
+    )
+
+    print(f"{args.hands} hands, {args.iterations} iterations")
+    print(f"before (MessageToDict per hand): {before_us:8.2f}us/frame")
+    print(f"  of which MessageToDict:        {handedness_us:8.2f}us/frame")
+    print(f"after (bulk numpy conversion):   {after_us:8.2f}us/frame")
+    print(f"speedup: {before_us / after_us:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+""" hud_layers.py
+
+Per frame cost of the cached HUD layers (hv.CachedLayer) against drawing
+the same HUD with OpenCV calls every frame.
+
+python hud_layers.py [recording] [--frames 300]
+
+"direct" runs the render functions the layers are built from, "cached"
+composites the pre-rendered layers. Pixel differences are reported for the
+static HUD (anti-aliased edges are snapped to the mask) and the help box.
+Without a recording, random frames are used.
+"""
+import argparse
+
+import cv2 as cv
+import numpy as np
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = load_frames(args.recording, args.frames, args.width, args.height)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(args.frames)]
+    height, width = frames[0].shape[:2]
+    hud = rtg.HUD(height, width)
+
+    cases = [
+        ("static HUD", hud.render_static_hud, hud.draw_hud),
+        ("help box", hud.render_help_box, hud.draw_help_box),
+    ]
+    for name, direct, cached in cases:
+        # Both draw the same pixels, drawing over the frames again does not change the work
+        expected, composited = direct(frames[0].copy()), cached(frames[0].copy())
+        direct_times, _ = time_per_frame(frames, direct)
+        cached_times, _ = time_per_frame(frames, cached)
+        summarize(f"{name} direct", direct_times)
+        summarize(f"{name} cached", cached_times)
+
+        diff = cv.absdiff(expected, composited).max(axis=2)
+        print(
+            f"    speedup {direct_times.mean() / max(cached_times.mean(), 1e-9):.2f}x, "
+            f"{np.count_nonzero(diff)} pixels differ (max {diff.max()})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+""" icon_overlay.py
+
+Per frame cost of drawing the two CHECK_GESTURE gesture icons.
+
+python icon_overlay.py [recording] [--frames 300] [--assets ../assets]
+
+"float" is the previous overlay_transparent_image (float64 alpha, dstack
+temporaries, blend and write back), "bgra" converts the icons on every call
+and "premultiplied" composites icons converted once (hv.PremultipliedImage),
+the way Game does. Without a recording, random frames are used.
+"""
+import argparse
+
+import cv2 as cv
+import numpy as np
+import handyvision as hv
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize
+
+
+def float_overlay(background: np.ndarray, overlay: np.ndarray, top_left: np.ndarray) -> np.ndarray:
+    """ Previous float blend, kept as the reference
+    """
+    overlay_alpha = overlay[:, :, 3] / 255.0
+    image_alpha = 1 - overlay_alpha
+    bot_right = top_left + np.array([overlay.shape[0], overlay.shape[1]])
+    region = np.s_[top_left[0]:bot_right[0], top_left[1]:bot_right[1], 0:3]
+    background[region] = np.dstack([image_alpha] * 3) * background[region] \
+        + np.dstack([overlay_alpha] * 3) * overlay[:, :, 0:3]
+    return background
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--assets", default="../assets")
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = load_frames(args.recording, args.frames, args.width, args.height)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(args.frames)]
+    height, width = frames[0].shape[:2]
+    first = frames[0].copy()
+
+    scale = rtg.GameConfig().gesture_icon_scale
+    icons = hv.IconManager(args.assets)
+    left = icons.icon_for_gesture(hv.Handedness.LEFT, hv.Gesture.PEACE, scale)
+    right = icons.icon_for_gesture(hv.Handedness.RIGHT, hv.Gesture.PEACE, scale)
+    hud = rtg.HUD(height, width)
+
+    # Same placement as HUD.draw_gesture_icons
+    left_top_left = np.array([10, width // 2 - left.shape[1] - 5])
+    right_top_left = left_top_left + (0, left.shape[1] + 10)
+
+    def float_icons(frame):
+        float_overlay(frame, left, left_top_left)
+        return float_overlay(frame, right, right_top_left)
+
+    premultiplied = hv.PremultipliedImage(left), hv.PremultipliedImage(right)
+    cases = [
+        ("float", float_icons),
+        ("bgra", lambda frame: hud.draw_gesture_icons(frame, left, right)),
+        ("premultiplied", lambda frame: hud.draw_gesture_icons(frame, *premultiplied)),
+    ]
+
+    reference = float_icons(first.copy())
+    float_ms = None
+    for name, draw in cases:
+        times, _ = time_per_frame(frames, draw)
+        summarize(name, times)
+        float_ms = times.mean() if float_ms is None else float_ms
+        diff = cv.absdiff(reference, draw(first.copy())).max()
+        print(f"    speedup {float_ms / times.mean():.2f}x, max difference to float {diff}")
+
+
+if __name__ == "__main__":
+    main()
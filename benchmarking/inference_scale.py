@@ -0,0 +1,62 @@
+""" inference_scale.py
+
+Throughput vs gesture accuracy of downscaled inference inputs
+(HPEEConfig.inference_scale, applied by FramePreprocessor).
+
+python inference_scale.py path/to/session.mp4 [--frames 300] [--scales 1.0 0.75 0.5 0.35 0.25] [--mode DUAL_ENGINE]
+
+Each scale runs the full per frame path: split, resize and convert the
+camera frame, infer, map gestures. Agreement is measured against the
+first scale, which should be 1.0. MediaPipe's palm detector resizes its
+input to 192x192 itself, so most of the gain comes from the landmark
+model and the cheaper colour conversion, not from detection.
+"""
+import argparse
+
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize, agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.75, 0.5, 0.35, 0.25])
+    parser.add_argument("--mode", default="DUAL_ENGINE", choices=[m.name for m in rtg.InferenceMode])
+    args = parser.parse_args()
+
+    frames = load_frames(args.recording, args.frames, args.width, args.height, mirror=False)
+    mode = rtg.InferenceMode[args.mode]
+
+    results = []
+    for scale in args.scales:
+        inference = rtg.create_inference(mode, mirror=True, inference_scale=scale)
+        preprocessor = inference.create_preprocessor()
+
+        def process(frame):
+            inference.update(preprocessor.process_inputs(frame))
+            return inference.get_gesture_estimations()
+
+        times, outputs = time_per_frame(frames, process)
+        input_shape = preprocessor.inputs[0].shape
+        summarize(f"{mode.name} x{scale:g}", times)
+        print(f"    input {input_shape[1]}x{input_shape[0]}, preprocessing mean {preprocessor.stats.mean_ms():.2f}ms")
+        results.append((scale, times, outputs))
+        inference.release()
+
+    _, ref_times, ref_out = results[0]
+    print(f"{'scale':>6} {'speedup':>8} {'agreement':>10} {'P1':>7} {'P2':>7}")
+    for scale, times, outputs in results:
+        print(
+            f"{scale:>6g} {ref_times.mean() / times.mean():>7.2f}x "
+            f"{agreement(ref_out, outputs) * 100:>9.1f}% "
+            f"{agreement([o[0] for o in ref_out], [o[0] for o in outputs]) * 100:>6.1f}% "
+            f"{agreement([o[1] for o in ref_out], [o[1] for o in outputs]) * 100:>6.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+""" inference_server_load.py
+
+Load generator for the local inference server (hv.InferenceServer).
+
+python inference_server_load.py [recording] [--address /tmp/hv.sock | --port 5055] [--concurrency 1 2 4 8] [--duration 5]
+
+Without --address / --port an in-process server is started with --models
+engines on a Unix socket. For each concurrency level, that many clients
+send frames back to back for --duration seconds. BUSY answers are counted
+and retried after --backoff-ms. Reports throughput of processed frames,
+round trip latency percentiles and the server side split between queue wait
+and service time. Without a recording, random frames (no hands) are used.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import handyvision as hv
+
+from bench_utils import load_frames
+
+
+def client_loop(address, frames, encoding, stop_at: float, backoff_s: float, out: list):
+    """ Send frames until stop_at, append every ServerResult to out
+    """
+    client = hv.InferenceClient(address, encoding)
+    i = 0
+    while time.perf_counter() < stop_at:
+        result = client.infer(frames[i % len(frames)])
+        out.append(result)
+        if result.status == hv.ResponseStatus.BUSY:
+            time.sleep(backoff_s)
+        else:
+            i += 1
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--address", help="Unix socket of a running server")
+    parser.add_argument("--port", type=int, help="localhost TCP port of a running server")
+    parser.add_argument("--models", type=int, default=2, help="engines of the in-process server")
+    parser.add_argument("--max-queue", type=int, default=2, help="queue per engine of the in-process server")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per concurrency level")
+    parser.add_argument("--backoff-ms", type=float, default=5.0, help="wait after a BUSY answer")
+    parser.add_argument("--raw", action="store_true", help="send raw frames instead of JPEG")
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = load_frames(args.recording, args.frames, args.width, args.height)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(args.frames)]
+
+    server = None
+    if args.address:
+        address = args.address
+    elif args.port:
+        address = ("127.0.0.1", args.port)
+    else:
+        address = os.path.join(tempfile.mkdtemp(), "handyvision.sock")
+        server = hv.InferenceServer(address, hv.HPEEConfig(), args.models, args.max_queue)
+        server.start()
+        print(f"In-process server with {args.models} models, queue {args.max_queue} per model")
+
+    encoding = hv.FrameEncoding.RAW if args.raw else hv.FrameEncoding.JPEG
+    print(f"{'clients':>7} {'fps':>7} {'busy':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'wait ms':>8} {'service ms':>10}")
+    for clients in args.concurrency:
+        results = []
+        stop_at = time.perf_counter() + args.duration
+        threads = [
+            threading.Thread(target=client_loop, args=(address, frames, encoding, stop_at, args.backoff_ms / 1000.0, results))
+            for _ in range(clients)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed_s = time.perf_counter() - start
+
+        ok = [r for r in results if r.ok()]
+        busy = sum(1 for r in results if r.status == hv.ResponseStatus.BUSY)
+        if not ok:
+            print(f"{clients:>7} no frames processed, {busy} busy")
+            continue
+        rtt_ms = np.array([r.round_trip_s for r in ok]) * 1000.0
+        print(
+            f"{clients:>7} {len(ok) / elapsed_s:>7.1f} {busy / len(results) * 100:>5.1f}% "
+            f"{np.percentile(rtt_ms, 50):>8.2f} {np.percentile(rtt_ms, 95):>8.2f} {np.percentile(rtt_ms, 99):>8.2f} "
+            f"{np.mean([r.queue_wait_s for r in ok]) * 1000.0:>8.2f} {np.mean([r.service_s for r in ok]) * 1000.0:>10.2f}"
+        )
+
+    if server is not None:
+        server.close()
+        print(server.stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+""" mirror_landmarks.py
+
+Compare mirroring the camera frame before inference with mirroring the
+landmarks afterwards (HPEEConfig.mirror).
+
+python mirror_landmarks.py path/to/session.mp4 [--frames 300] [--mode DUAL_ENGINE]
+
+pixels:    flip the frame, split and convert the mirrored halves, infer
+landmarks: split and convert the camera frame, infer, mirror landmark x and handedness
+
+Both paths include building the mirrored display frame, so timings compare
+full per frame cost. Reports how often both paths agree on every player's
+(left, right) gestures.
+"""
+import argparse
+
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize, agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--mode", default="DUAL_ENGINE", choices=[m.name for m in rtg.InferenceMode])
+    args = parser.parse_args()
+
+    frames = load_frames(args.recording, args.frames, args.width, args.height, mirror=False)
+    mode = rtg.InferenceMode[args.mode]
+
+    results = {}
+    for mirror in (False, True):
+        inference = rtg.create_inference(mode, mirror=mirror)
+        preprocessor = inference.create_preprocessor()
+
+        def process(frame):
+            inference.update(preprocessor.process_inputs(frame))
+            gestures = inference.get_gesture_estimations()
+            preprocessor.process_display(frame)
+            return gestures
+
+        times, outputs = time_per_frame(frames, process)
+        name = "landmarks" if mirror else "pixels"
+        summarize(f"{mode.name} {name}", times)
+        print(f"    preprocessing mean {preprocessor.stats.mean_ms():.2f}ms")
+        results[mirror] = (times, outputs)
+        inference.release()
+
+    pixel_times, pixel_out = results[False]
+    landmark_times, landmark_out = results[True]
+
+    print(f"Speedup (mean): {pixel_times.mean() / landmark_times.mean():.2f}x")
+    print(f"Gesture agreement (all four hands): {agreement(pixel_out, landmark_out) * 100:.1f}%")
+    print(f"P1 agreement: {agreement([o[0] for o in pixel_out], [o[0] for o in landmark_out]) * 100:.1f}%")
+    print(f"P2 agreement: {agreement([o[1] for o in pixel_out], [o[1] for o in landmark_out]) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
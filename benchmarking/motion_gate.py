@@ -0,0 +1,63 @@
+""" motion_gate.py
+
+Measure how much inference the motion gate (HPEEConfig.motion_gate) skips
+on a recording and what it costs in gesture agreement.
+
+python motion_gate.py path/to/session.mp4 [--frames 300] [--threshold 0.002] [--max-age 0.5]
+
+Runs the dual-engine setup with and without the gate. Recordings are
+played back as fast as possible, so max age expiry triggers less often
+than it would live.
+"""
+import argparse
+
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize, agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--threshold", type=float, default=0.002, help="changed pixel fraction")
+    parser.add_argument("--max-age", type=float, default=0.5, help="max result reuse age in seconds")
+    args = parser.parse_args()
+
+    frames = load_frames(args.recording, args.frames, args.width, args.height, mirror=False)
+
+    results = {}
+    for gated in (False, True):
+        inference = rtg.create_inference(
+            rtg.InferenceMode.DUAL_ENGINE,
+            mirror=True,
+            motion_gate=gated,
+            motion_threshold=args.threshold,
+            motion_max_age_s=args.max_age
+        )
+        preprocessor = inference.create_preprocessor()
+
+        def process(frame):
+            inference.update(preprocessor.process_inputs(frame))
+            return inference.get_gesture_estimations()
+
+        times, outputs = time_per_frame(frames, process)
+        name = "motion gate" if gated else "every frame"
+        summarize(name, times)
+        if gated:
+            for player, stats in zip(("P1", "P2"), inference.get_stats()):
+                print(f"    {player} {stats}, skipped {stats.skip_ratio() * 100:.1f}%")
+        results[gated] = (times, outputs)
+        inference.release()
+
+    full_times, full_out = results[False]
+    gated_times, gated_out = results[True]
+
+    print(f"Speedup (mean): {full_times.mean() / gated_times.mean():.2f}x")
+    print(f"Gesture agreement (all four hands): {agreement(full_out, gated_out) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
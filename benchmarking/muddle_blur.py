@@ -0,0 +1,105 @@
+""" muddle_blur.py
+
+Per frame cost of HUD.muddle_frame (the FLIPOFF tint and blur) for each
+hv.BlurMode, against the previous slice-assignment implementation.
+
+python muddle_blur.py [recording] [--frames 300] [--ksize 7] [--sigma 5] [--downsample 4]
+
+Uses the game's default blur (ksize 7, sigma 5) on one half of the frame.
+Differences are measured against the previous implementation on the first
+frame, CACHED is timed at 30 fps frame spacing so it refreshes like it would
+in the game. Without a recording, random frames are used, pixel noise is
+the worst case for the downsampled modes.
+"""
+import argparse
+import time
+
+import cv2 as cv
+import numpy as np
+import handyvision as hv
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize
+
+
+def previous_muddle(frame: np.ndarray, config: hv.GaussianConfig) -> np.ndarray:
+    """ Previous implementation (left half), kept as the reference
+    """
+    cols = frame.shape[1]
+    frame[:, 0:cols//2, 2] = 255
+    frame[:, 0:cols//2, :] = cv.GaussianBlur(frame[:, 0:cols//2, :], config.ksize, config.sigmaX, config.sigmaY)
+    return frame
+
+
+def paced_times(frames, process, fps: float = 30.0) -> np.ndarray:
+    """ Per frame seconds of process with frames spaced 1 / fps apart, the wait is not timed
+    """
+    times = np.empty(len(frames))
+    next_frame = time.perf_counter()
+    for i, frame in enumerate(frames):
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+        next_frame += 1.0 / fps
+        start = time.perf_counter()
+        process(frame)
+        times[i] = time.perf_counter() - start
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--ksize", type=int, default=7)
+    parser.add_argument("--sigma", type=float, default=5)
+    parser.add_argument("--downsample", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = load_frames(args.recording, args.frames, args.width, args.height)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(args.frames)]
+    height, width = frames[0].shape[:2]
+    first = frames[0].copy()
+
+    config = rtg.GameConfig()
+    blur = config.flip_off_blur_config
+    blur.ksize = (args.ksize, args.ksize)
+    blur.sigmaX = blur.sigmaY = args.sigma
+    blur.downsample = args.downsample
+
+    # Work on copies so every case sees unblurred frames
+    work = [frame.copy() for frame in frames]
+    reference = previous_muddle(first.copy(), blur)
+
+    def restore(times):
+        for frame, source in zip(work, frames):
+            np.copyto(frame, source)
+        return times
+
+    times, _ = time_per_frame(work, lambda frame: previous_muddle(frame, blur))
+    previous_ms = restore(times).mean()
+    summarize("previous", times)
+
+    for mode in hv.BlurMode:
+        blur.mode = mode
+        hud = rtg.HUD(height, width)
+
+        result = rtg.HUD(height, width).muddle_frame(first.copy(), hv.HorizontalHalf.LEFT, config)
+        diff = cv.absdiff(reference, result)[:, :width // 2]
+        if mode == hv.BlurMode.CACHED:
+            times = paced_times(work, lambda frame: hud.muddle_frame(frame, hv.HorizontalHalf.LEFT, config))
+        else:
+            times, _ = time_per_frame(work, lambda frame: hud.muddle_frame(frame, hv.HorizontalHalf.LEFT, config))
+        restore(times)
+        summarize(mode.name, times)
+        print(
+            f"    speedup {previous_ms / times.mean():.2f}x, difference to previous "
+            f"mean {diff.mean():.2f} p99 {np.percentile(diff, 99):.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
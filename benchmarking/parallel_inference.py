@@ -0,0 +1,55 @@
+""" parallel_inference.py
+
+Sequential vs concurrent per-player engines (DUAL_ENGINE vs PARALLEL_DUAL_ENGINE).
+
+python parallel_inference.py path/to/session.mp4 [--frames 300]
+
+Reports per-frame time of both modes, the fan-out / fan-in overhead of the
+thread pool (wall time minus the slowest engine of each frame) and how often
+both modes agree on every player's (left, right) gestures. The speedup is
+bounded by the slower player's engine and needs at least two free cores.
+"""
+import argparse
+import os
+
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize, agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    frames = load_frames(args.recording, args.frames, args.width, args.height, mirror=False)
+    print(f"CPU cores: {os.cpu_count()}")
+
+    results = {}
+    for mode in (rtg.InferenceMode.DUAL_ENGINE, rtg.InferenceMode.PARALLEL_DUAL_ENGINE):
+        inference = rtg.create_inference(mode, mirror=True)
+        preprocessor = inference.create_preprocessor()
+
+        def process(frame):
+            inference.update(preprocessor.process_inputs(frame))
+            return inference.get_gesture_estimations()
+
+        times, outputs = time_per_frame(frames, process)
+        summarize(mode.name, times)
+        if mode == rtg.InferenceMode.PARALLEL_DUAL_ENGINE:
+            print(f"    {inference.fan_out_stats}")
+        results[mode] = (times, outputs)
+        inference.release()
+
+    seq_times, seq_out = results[rtg.InferenceMode.DUAL_ENGINE]
+    par_times, par_out = results[rtg.InferenceMode.PARALLEL_DUAL_ENGINE]
+
+    print(f"Speedup (mean): {seq_times.mean() / par_times.mean():.2f}x")
+    print(f"Gesture agreement (all four hands): {agreement(seq_out, par_out) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+""" preprocessing.py
+
+Per frame cost of preparing the camera frame for two player inference.
+
+python preprocessing.py [recording] [--frames 300] [--width 1280 --height 720]
+
+before: cv.flip copy, vertically_bisect_image views, bgr2rgb per half
+after:  hv.FramePreprocessor, mirror + split + convert into reused buffers
+
+Allocations are counted with tracemalloc (numpy and OpenCV outputs both
+allocate through numpy). A random frame is used if no recording is given.
+"""
+import argparse
+import tracemalloc
+
+import cv2 as cv
+import numpy as np
+import handyvision as hv
+
+from bench_utils import load_frames, time_per_frame, summarize
+
+
+def preprocess_before(frame):
+    """ Preprocessing as done by Game.run before FramePreprocessor
+    """
+    frame = cv.flip(frame, 1)
+    frame_p1, frame_p2, _, _ = hv.vertically_bisect_image(frame)
+    return frame, (hv.bgr2rgb(frame_p1), hv.bgr2rgb(frame_p2))
+
+
+def count_allocations(frames, process):
+    """ Mean (allocations, peak bytes) per frame, after one warmup frame
+
+    Outputs are held until after the snapshot so they are counted.
+    """
+    process(frames[0])
+    tracemalloc.start()
+    count, peak = 0, 0
+    for frame in frames:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        current_before, _ = tracemalloc.get_traced_memory()
+        outputs = process(frame)
+        _, peak_during = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        count += sum(max(0, stat.count_diff) for stat in after.compare_to(before, "lineno"))
+        peak += peak_during - current_before
+        del outputs
+    tracemalloc.stop()
+    return count / len(frames), peak / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = load_frames(args.recording, args.frames, args.width, args.height, mirror=False)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)] * args.frames
+
+    preprocessor = hv.FramePreprocessor(num_players=2, split=True)
+
+    # Outputs must match
+    before_display, before_inputs = preprocess_before(frames[0])
+    after_display, after_inputs = preprocessor.process(frames[0])
+    same = np.array_equal(before_display, after_display) \
+        and all(np.array_equal(a, b) for a, b in zip(before_inputs, after_inputs))
+    print(f"Outputs identical: {same}")
+
+    before_times, _ = time_per_frame(frames, preprocess_before)
+    after_times, _ = time_per_frame(frames, preprocessor.process)
+    summarize("before", before_times)
+    summarize("after (FramePreprocessor)", after_times)
+
+    alloc_frames = frames[:min(len(frames), 30)]
+    before_count, before_bytes = count_allocations(alloc_frames, preprocess_before)
+    after_count, after_bytes = count_allocations(alloc_frames, preprocessor.process)
+    print(f"before: {before_count:5.1f} allocations/frame, {before_bytes / 1e6:7.2f} MB allocated/frame")
+    print(f"after:  {after_count:5.1f} allocations/frame, {after_bytes / 1e6:7.2f} MB allocated/frame")
+    print(preprocessor.stats)
+
+
+if __name__ == "__main__":
+    main()
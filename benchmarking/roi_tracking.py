@@ -0,0 +1,86 @@
+""" roi_tracking.py
+
+Compare full frame inference with ROI tracking (HPEEConfig.roi_tracking),
+where landmarks are inferred on a crop around the previous frame's hands.
+
+python roi_tracking.py path/to/session.mp4 [--frames 300] [--redetect 15] [--padding 0.5]
+
+Runs the dual-engine (one HPEE per player half) setup both ways, reports
+per-frame time, how often ROI tracking agrees with full frame inference on
+every player's (left, right) gestures, and how the ROI engines processed
+their frames.
+"""
+import argparse
+
+import handyvision as hv
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize, agreement
+
+
+def check_roi_path(frame, config: hv.HPEEConfig):
+    """ Run a real frame through the ROI model, exit if that path fails
+
+    A recording without hands never starts ROI tracking, so a centred ROI is forced.
+    """
+    hpee = hv.HPEE(config)
+    hpee.roi = (0.25, 0.25, 0.75, 0.75)
+    hpee.update(frame)
+    if hpee.stats.roi != 1:
+        raise SystemExit(f"ROI path did not run: {hpee.stats}")
+    print(f"ROI path check passed: {hpee.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--redetect", type=int, default=15, help="full frame detection interval")
+    parser.add_argument("--padding", type=float, default=0.5, help="ROI padding, fraction of hand size")
+    args = parser.parse_args()
+
+    frames = load_frames(args.recording, args.frames, args.width, args.height, mirror=False)
+
+    configs = {
+        "full frame": hv.HPEEConfig(mirror=True),
+        "roi tracking": hv.HPEEConfig(
+            mirror=True,
+            roi_tracking=True,
+            roi_padding=args.padding,
+            redetect_interval=args.redetect
+        ),
+    }
+
+    check_roi_path(frames[0], configs["roi tracking"])
+
+    results = {}
+    for name, config in configs.items():
+        inference = rtg.DualEngineInference(config)
+        preprocessor = inference.create_preprocessor()
+
+        def process(frame):
+            inference.update(preprocessor.process_inputs(frame))
+            return inference.get_gesture_estimations()
+
+        times, outputs = time_per_frame(frames, process)
+        summarize(name, times)
+        if config.roi_tracking:
+            print(f"    P1 {inference.p1_hpee.stats}")
+            print(f"    P2 {inference.p2_hpee.stats}")
+        results[name] = (times, outputs)
+        inference.release()
+
+    full_times, full_out = results["full frame"]
+    roi_times, roi_out = results["roi tracking"]
+
+    print(f"Speedup (mean): {full_times.mean() / roi_times.mean():.2f}x")
+    print(f"FPS: {1.0 / full_times.mean():.1f} -> {1.0 / roi_times.mean():.1f}")
+    print(f"Gesture agreement (all four hands): {agreement(full_out, roi_out) * 100:.1f}%")
+    print(f"P1 agreement: {agreement([o[0] for o in full_out], [o[0] for o in roi_out]) * 100:.1f}%")
+    print(f"P2 agreement: {agreement([o[1] for o in full_out], [o[1] for o in roi_out]) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+""" searching_mode.py
+
+Cost of empty scenes and extra detection latency of searching mode
+(HPEEConfig.search_after / search_interval / search_scale).
+
+python searching_mode.py [recording] [--frames 300] [--after 15] [--interval 3] [--scale 1.0] [--fps 30]
+
+Runs the dual-engine setup at full rate and with searching mode. For every
+hand appearance after at least --after empty frames, the extra frames
+searching mode needed to report the hand are measured against the full
+rate engine. Latency in ms assumes a camera running at --fps. Without a
+recording, random frames (no hands) measure the empty scene cost only.
+"""
+import argparse
+
+import numpy as np
+import handyvision as hv
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize
+
+
+def hands_present(gestures) -> bool:
+    """ True if any hand of a player's (left, right) gestures is in frame
+    """
+    return any(g is not None and g != hv.Gesture.OUT_OF_FRAME for g in gestures)
+
+
+def detection_delays(reference, candidate, min_empty: int):
+    """ Extra frames candidate needed to see a hand after reference saw it appear
+
+    Only appearances following at least min_empty empty reference frames count.
+    """
+    delays = []
+    for player in range(2):
+        ref = [hands_present(out[player]) for out in reference]
+        cand = [hands_present(out[player]) for out in candidate]
+        empty_run = 0
+        for i, present in enumerate(ref):
+            if present and empty_run >= min_empty:
+                seen = next((j for j in range(i, len(cand)) if cand[j]), None)
+                if seen is not None:
+                    delays.append(seen - i)
+            empty_run = 0 if present else empty_run + 1
+    return delays
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--after", type=int, default=15, help="empty frames before searching")
+    parser.add_argument("--interval", type=int, default=3, help="detection interval while searching")
+    parser.add_argument("--scale", type=float, default=1.0, help="frame scale while searching")
+    parser.add_argument("--fps", type=float, default=30.0, help="camera fps for latency in ms")
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = load_frames(args.recording, args.frames, args.width, args.height, mirror=False)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(args.frames)]
+
+    options = {
+        "full rate": {},
+        "searching": {
+            "search_after": args.after,
+            "search_interval": args.interval,
+            "search_scale": args.scale,
+        },
+    }
+
+    results = {}
+    for name, engine_options in options.items():
+        inference = rtg.create_inference(rtg.InferenceMode.DUAL_ENGINE, mirror=True, **engine_options)
+        preprocessor = inference.create_preprocessor()
+
+        def process(frame):
+            inference.update(preprocessor.process_inputs(frame))
+            return inference.get_gesture_estimations()
+
+        times, outputs = time_per_frame(frames, process, warmup=0)
+        summarize(name, times)
+        for player, stats in zip(("P1", "P2"), inference.get_stats()):
+            print(f"    {player} {stats}")
+        results[name] = (times, outputs)
+        inference.release()
+
+    full_times, full_out = results["full rate"]
+    search_times, search_out = results["searching"]
+    print(f"Speedup (mean): {full_times.mean() / search_times.mean():.2f}x")
+
+    delays = detection_delays(full_out, search_out, args.after)
+    bound = args.interval - 1
+    print(f"Detection latency bound: {bound} frames ({bound * 1000.0 / args.fps:.0f}ms at {args.fps:.0f}fps)")
+    if delays:
+        delays = np.array(delays)
+        print(
+            f"Measured extra latency over {len(delays)} appearances: mean {delays.mean():.2f} frames, "
+            f"max {delays.max()} frames ({delays.max() * 1000.0 / args.fps:.0f}ms)"
+        )
+    else:
+        print("No hand appearances after an empty stretch in this recording")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+""" state_schedule.py
+
+Per game state cost of game-state-aware inference scheduling
+(GameConfig.inference_schedule, rtg.InferenceScheduler).
+
+python state_schedule.py [recording] [--frames 300] [--mode DUAL_ENGINE]
+
+Runs the recording through the game's preprocessing and inference once per
+game state, the way Game.run() does: engines only run for the players the
+state reads and on the state's interval. "always" runs every engine on every
+frame like before scheduling. Without a recording, random frames are used.
+"""
+import argparse
+
+import numpy as np
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--mode", default="DUAL_ENGINE", choices=[m.name for m in rtg.InferenceMode])
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = load_frames(args.recording, args.frames, args.width, args.height, mirror=False)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(args.frames)]
+
+    mode = rtg.InferenceMode[args.mode]
+    schedule = rtg.GameConfig().inference_schedule
+    inference = rtg.create_inference(mode, mirror=True)
+    preprocessor = inference.create_preprocessor()
+
+    always_times = None
+    for name, state in [("always", None)] + [(s.name, s) for s in rtg.GameState]:
+        scheduler = rtg.InferenceScheduler(schedule if state is not None else {})
+
+        def process(frame):
+            players = scheduler.players_due(state)
+            if scheduler.state_changed:
+                inference.refresh()
+            if any(players):
+                inference.update(preprocessor.process_inputs(frame), players)
+            return scheduler.mask(state, inference.get_gesture_estimations())
+
+        times, _ = time_per_frame(frames, process)
+        summarize(name, times)
+        if always_times is None:
+            always_times = times
+        else:
+            speedup = "no inference" if scheduler.skip_ratio() == 1.0 \
+                else f"speedup {always_times.mean() / times.mean():.2f}x"
+            print(f"    {scheduler.needs(state)}, engine frames skipped {scheduler.skip_ratio() * 100:.0f}%, {speedup}")
+    inference.release()
+
+
+if __name__ == "__main__":
+    main()
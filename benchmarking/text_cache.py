@@ -0,0 +1,80 @@
+""" text_cache.py
+
+HUD draw time with and without the text sprite cache (hv.TextCache).
+
+python text_cache.py [recording] [--frames 300] [--cache-size 256]
+
+Draws what Game.run() draws each frame while a round is on: the static HUD,
+scores, pose estimates, FPS, quality level and the countdown, with changing
+values so the cache sees a realistic mix of repeated and new strings.
+"uncached" measures and rasterizes every string with OpenCV, "cached" looks
+up sizes and blits sprites from the cache. Without a recording, random
+frames are used.
+"""
+import argparse
+
+import cv2 as cv
+import numpy as np
+import handyvision as hv
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--cache-size", type=int, default=256)
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = load_frames(args.recording, args.frames, args.width, args.height)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(args.frames)]
+    height, width = frames[0].shape[:2]
+    gestures = list(hv.Gesture)
+    first = frames[0].copy()
+
+    def draw(hud: rtg.HUD):
+        count = [0]
+
+        def process(frame):
+            i = count[0]
+            count[0] += 1
+            hud.draw_hud(frame)
+            hud.draw_player_scores(frame, i // 90, i // 120)
+            p1 = gestures[i // 15 % len(gestures)], gestures[i // 20 % len(gestures)]
+            p2 = gestures[i // 25 % len(gestures)], gestures[i // 30 % len(gestures)]
+            hud.draw_pose_estimates(frame, p1, p2)
+            hud.draw_fps(frame, 28 + i % 5)
+            hud.draw_quality_level(frame, "HIGH")
+            hud.draw_countdown_page(frame, 3, 3 - i // 30 % 3)
+            return frame
+        return process
+
+    results = {}
+    for name, cache in [("uncached", None), ("cached", hv.TextCache(args.cache_size))]:
+        hud = rtg.HUD(height, width)
+        hud.text_cache = cache
+        expected = draw(hud)(first.copy())
+        times, _ = time_per_frame(frames, draw(hud))
+        summarize(name, times)
+        results[name] = times, expected
+        if cache is not None:
+            print(f"    {cache.stats}, {len(cache.entries)} entries")
+
+    uncached_times, uncached_frame = results["uncached"]
+    cached_times, cached_frame = results["cached"]
+    diff = cv.absdiff(uncached_frame, cached_frame).max(axis=2)
+    print(
+        f"cached / uncached {cached_times.mean() / uncached_times.mean():.2f}, "
+        f"{np.count_nonzero(diff)} pixels differ (max {diff.max()})"
+    )
+
+
+if __name__ == "__main__":
+    main()
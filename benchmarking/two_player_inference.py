@@ -0,0 +1,52 @@
+""" two_player_inference.py
+
+Compare the dual-engine (one HPEE per player half) and shared-engine
+(one HPEE over the full frame, max_hands = 4) two player inference paths.
+
+python two_player_inference.py path/to/session.mp4 [--frames 300]
+
+Reports per-frame inference time for both modes and how often the shared
+engine agrees with the dual engine on every player's (left, right) gestures.
+"""
+import argparse
+
+import handyvision.rtgame as rtg
+
+from bench_utils import load_frames, time_per_frame, summarize, agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+
+    frames = load_frames(args.recording, args.frames, args.width, args.height, mirror=False)
+
+    results = {}
+    for mode in (rtg.InferenceMode.DUAL_ENGINE, rtg.InferenceMode.SHARED_ENGINE):
+        inference = rtg.create_inference(mode)
+        preprocessor = inference.create_preprocessor()
+
+        def process(frame):
+            inference.update(preprocessor.process_inputs(frame))
+            return inference.get_gesture_estimations()
+
+        times, outputs = time_per_frame(frames, process)
+        summarize(mode.name, times)
+        results[mode] = (times, outputs)
+        inference.release()
+
+    dual_times, dual_out = results[rtg.InferenceMode.DUAL_ENGINE]
+    shared_times, shared_out = results[rtg.InferenceMode.SHARED_ENGINE]
+
+    print(f"Speedup (mean): {dual_times.mean() / shared_times.mean():.2f}x")
+    print(f"Gesture agreement (all four hands): {agreement(dual_out, shared_out) * 100:.1f}%")
+    print(f"P1 agreement: {agreement([o[0] for o in dual_out], [o[0] for o in shared_out]) * 100:.1f}%")
+    print(f"P2 agreement: {agreement([o[1] for o in dual_out], [o[1] for o in shared_out]) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+""" worker_pool_scaling.py
+
+Throughput of HPEEWorkerPool from 1 to N worker processes.
+
+python worker_pool_scaling.py [recording] [--frames 120] [--streams 4] [--max-workers 4] [--crash]
+
+Every frame is submitted once per stream (a camera or player lane), as fast
+as the pool accepts them. Reports frames per second over all streams and
+submit-to-result latency for each worker count. Workers are warmed up
+(spawned, models loaded) before timing. --crash kills worker 0 halfway
+through each run to show restart cost and lost jobs. Without a recording,
+random frames (no hands) are used.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import handyvision as hv
+
+from bench_utils import load_frames
+
+
+def run(pool: hv.HPEEWorkerPool, frames, streams: int, crash: bool):
+    """ Push every frame through every stream, return (seconds, results)
+    """
+    results = []
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        if crash and i == len(frames) // 2:
+            pool.kill_worker(0)
+        for stream in range(streams):
+            while pool.submit(stream, frame) is None:
+                results.append(pool.get_result())
+    while pool.pending():
+        results.append(pool.get_result())
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", nargs="?", help="video file or image folder")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--slots", type=int, default=2, help="ring slots per worker")
+    parser.add_argument("--crash", action="store_true", help="kill worker 0 halfway through")
+    args = parser.parse_args()
+
+    if args.recording:
+        frames = load_frames(args.recording, args.frames, args.width, args.height, mirror=False)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(args.frames)]
+    frames = [hv.bgr2rgb(frame) for frame in frames]
+    print(f"CPU cores: {os.cpu_count()}, streams: {args.streams}")
+
+    base_fps = None
+    for workers in range(1, args.max_workers + 1):
+        pool = hv.HPEEWorkerPool(workers, hv.HPEEConfig(), frames[0].shape, args.slots)
+        run(pool, frames[:2], args.streams, crash=False)
+        pool.stats = hv.WorkerPoolStats()
+
+        elapsed_s, results = run(pool, frames, args.streams, args.crash)
+        latency_ms = np.array([r.latency_s() for r in results if r.ok()]) * 1000.0
+        fps = len(frames) * args.streams / elapsed_s
+        base_fps = base_fps or fps
+        print(
+            f"{workers} workers  {fps:7.1f} fps  scaling {fps / base_fps:4.2f}x  "
+            f"latency mean {latency_ms.mean():7.2f}ms  p95 {np.percentile(latency_ms, 95):7.2f}ms"
+        )
+        print(f"    {pool.stats}")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+""" build_icon_atlas.py
+
+Pack the left hand gesture icons listed in an asset folder's manifest.json
+into one atlas image, write it to asset_folder/gesture_icons/atlas.png and
+print the ATLAS block to add to the manifest's "gestures". Right hand icons
+are mirrored from the left ones when loaded (MIRROR_RIGHT).
+"""
+import sys
+import os
+import json
+
+import cv2 as cv
+import handyvision as hv
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Invalid number of args. Provide ONLY the asset folder path")
+        exit()
+
+    folder = os.path.normpath(sys.argv[1])
+    with open(os.path.join(folder, "manifest.json")) as f:
+        gesture_data = json.load(f)["gestures"]
+
+    images = {}
+    for mapping in gesture_data["PATH_GESTURE_MAPPING"]:
+        path = os.path.join(folder, gesture_data["LEFT_FOLDER"], mapping["File"])
+        images[mapping["Gesture"]] = cv.imread(path, cv.IMREAD_UNCHANGED)
+
+    atlas, rects = hv.pack_atlas(images)
+    atlas_file = "gesture_icons/atlas.png"
+    cv.imwrite(os.path.join(folder, atlas_file), atlas)
+    print(f"--- Wrote {atlas.shape[1]}x{atlas.shape[0]} atlas of {len(rects)} icons to {atlas_file}")
+
+    entries = ",\n".join(
+        f'                {{"Gesture": "{mapping["Gesture"]}", "Rect": {list(rects[mapping["Gesture"]])}}}'
+        for mapping in gesture_data["PATH_GESTURE_MAPPING"]
+    )
+    print(
+        '        "ATLAS":\n'
+        '        {\n'
+        f'            "File": "{atlas_file}",\n'
+        '            "MIRROR_RIGHT": true,\n'
+        '            "RECTS":\n'
+        '            [\n'
+        f'{entries}\n'
+        '            ]\n'
+        '        },'
+    )
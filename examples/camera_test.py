@@ -6,7 +6,7 @@ import handyvision as hv
 import cv2 as cv
 
 def main():
-    cam: hv.Camera = hv.Camera(0, "Webcam")
+    cam: hv.Camera = hv.Camera(0, "Webcam", threaded=True)
     
     # Check if camera is good
     if cam.good():
@@ -26,6 +26,7 @@ def main():
 
         # Wait on input
         if cv.waitKey(1) & 0xff == ord('q'):
+            print(cam.get_stats())
             cam.release()
             break
     
@@ -1,7 +1,12 @@
 """ hand_pose_engine_test.py
 
 Example usage of hand pose estimation engine (HPEE)
+
+Pass a video file or image folder to run on a recorded session:
+python hand_pose_engine_test.py path/to/session.mp4
 """
+import sys
+
 import cv2 as cv
 
 import handyvision as hv
@@ -13,7 +18,10 @@ def main():
     using HPEEE.
     """
     hpee = hv.HPEE()
-    cam = hv.Camera(0)
+    if len(sys.argv) > 1:
+        cam = hv.open_frame_source(sys.argv[1])
+    else:
+        cam = hv.Camera(0)
     if not cam.good():
         print("Error configuring camera!")
         return
@@ -25,6 +33,9 @@ def main():
 
         got_frame, frame = cam.get_frame()
         if not got_frame:
+            if not cam.good():
+                print("End of frame source")
+                break
             print("Failed to get frame!")
             continue
 
@@ -0,0 +1,32 @@
+""" network_game.py
+
+Host of a split-machine reaction game. The players run remote_player.py on
+their own machines, this machine only shows the game (its camera feed is
+the backdrop) and receives their gestures.
+
+python network_game.py [--port 5056] [--source path/to/backdrop.mp4]
+"""
+import argparse
+
+import handyvision as hv
+import handyvision.rtgame as rtg
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=hv.DEFAULT_LINK_PORT)
+    parser.add_argument("--source", help="video file or image folder instead of the camera")
+    parser.add_argument("--assets", default="assets")
+    args = parser.parse_args()
+
+    config = rtg.GameConfig()
+    config.inference_mode = rtg.InferenceMode.NETWORK
+    config.network_address = ("0.0.0.0", args.port)
+
+    frame_source = hv.open_frame_source(args.source, hv.PlaybackMode.REALTIME) if args.source else None
+    game = rtg.Game(asset_folder=args.assets, camera_idx=0, frame_source=frame_source, config=config)
+    game.run()
+
+
+if __name__ == "__main__":
+    main()
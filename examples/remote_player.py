@@ -0,0 +1,72 @@
+""" remote_player.py
+
+Player machine for a split-machine reaction game. Runs hand pose estimation
+on this machine's camera and streams gestures and landmarks to the host
+(see network_game.py).
+
+python remote_player.py HOST PLAYER [--port 5056] [--source path/to/session.mp4] [--show]
+
+PLAYER is 0 for the left player on the host, 1 for the right one. Both
+ends can run on one machine for testing, e.g. with recorded sessions:
+python network_game.py
+python remote_player.py 127.0.0.1 0 --source p1.mp4
+python remote_player.py 127.0.0.1 1 --source p2.mp4
+"""
+import argparse
+import time
+
+import cv2 as cv
+
+import handyvision as hv
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("host", help="address of the machine running the game")
+    parser.add_argument("player", type=int, choices=[0, 1])
+    parser.add_argument("--port", type=int, default=hv.DEFAULT_LINK_PORT)
+    parser.add_argument("--source", help="video file or image folder instead of the camera")
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument("--show", action="store_true", help="show the camera with landmarks")
+    args = parser.parse_args()
+
+    cam = hv.open_frame_source(args.source, hv.PlaybackMode.REALTIME) if args.source else hv.Camera(args.camera)
+    if not cam.good():
+        print("Error configuring camera!")
+        return
+    cam.set_auto_focus(False)
+
+    # Landmarks are mirrored by the engine to match the host's mirrored display
+    hpee = hv.HPEE(hv.HPEEConfig(mirror=True))
+    sender = hv.PlayerLinkSender((args.host, args.port), args.player)
+    fps_counter = hv.FPSCounter()
+    print(f"Streaming player {args.player} to {args.host}:{args.port}")
+
+    while True:
+        fps, frametime_ms = fps_counter.update()
+        got_frame, frame = cam.get_frame()
+        if not got_frame:
+            if not cam.good():
+                print("End of frame source")
+                break
+            continue
+        capture_s = time.perf_counter()
+
+        hpee.update(cv.cvtColor(frame, cv.COLOR_BGR2RGB))
+        sender.send_engine(hpee, capture_s)
+
+        if args.show:
+            frame = hpee.annotate_frame(cv.flip(frame, 1))
+            left_g, right_g = hpee.get_gesture_estimation_strings()
+            text = f"FPS: {fps:.0f} LEFT: {left_g} | RIGHT: {right_g}"
+            cv.putText(frame, text, (10, 30), cv.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+            cv.imshow("Remote player", frame)
+            if cv.waitKey(1) & 0xff == ord('q'):
+                break
+
+    sender.close()
+    cam.release()
+
+
+if __name__ == "__main__":
+    main()
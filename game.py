@@ -8,11 +8,22 @@ pip install -r requirements.txt
 pip install -e lib
 python game.py
 
+Or play back a recorded session (video file or image folder):
+
+python game.py path/to/session.mp4
+
 Note: Use a virtual environment if you don't want to 
 muddle your global install!
 """
+import sys
+
+import handyvision as hv
 import handyvision.rtgame as rtg
 
 if __name__=="__main__":
-    game = rtg.Game(asset_folder = "assets", camera_idx = 0)
+    frame_source = None
+    if len(sys.argv) > 1:
+        frame_source = hv.open_frame_source(sys.argv[1], hv.PlaybackMode.REALTIME)
+
+    game = rtg.Game(asset_folder = "assets", camera_idx = 0, frame_source = frame_source)
     game.run()
@@ -1,7 +1,13 @@
 from .camera import *
+from .frame_sources import *
 from .landmarks import *
 from .gesture import *
 from .img_utils import *
+from .quality import *
 from .hand_pose_estimation import *
+from .async_pose_estimation import *
+from .worker_pool import *
+from .inference_server import *
+from .player_link import *
 from .misc_utils import * 
 from .drawing_utils import *
@@ -0,0 +1,346 @@
+""" async_pose_estimation.py
+
+Asynchronous, pipelined hand pose estimation engine.
+
+API:
+ahpe = AsyncHPEE(config)
+ahpe.submit(frame)                      # never blocks
+ahpe.submit(frame, force=True)          # bypass skipping, drop older results
+result = ahpe.latest()                  # newest finished HPEEResult (or None)
+g_left, g_right = ahpe.get_gesture_estimations()
+ahpe.close()
+
+MediaPipe runs on a worker thread. Every processed frame publishes an
+immutable HPEEResult snapshot, the render loop reads whichever snapshot is
+the latest available. A frame whose inference raises publishes a result
+without hands and with error set, the worker keeps running. The drop
+policy decides what happens to frames that arrive while the worker is
+busy so inference latency does not build into a backlog.
+"""
+import threading
+import time
+
+import cv2 as cv
+
+from collections import deque
+from enum import IntEnum, unique
+from typing import NamedTuple, Tuple, Any
+
+from .gesture import *
+from .hand_pose_estimation import HPEE, HPEEConfig, draw_hand_landmarks, landmark_lists_for
+from .quality import QualityLevel
+
+
+@unique
+class DropPolicy(IntEnum):
+    """ What to do with frames submitted while the worker is busy
+
+    LATEST_ONLY: keep one pending frame, a newer frame replaces it
+    SKIP_WHILE_BUSY: reject new frames until the worker is idle
+    QUEUE: queue up to max_pending frames, drop frames older than max_age_s when dequeued
+    """
+    LATEST_ONLY = 0
+    SKIP_WHILE_BUSY = 1
+    QUEUE = 2
+
+
+class HPEEResult(NamedTuple):
+    """ Immutable snapshot of one processed frame
+
+    gestures / poses / hand_states are indexed [lane][hand_index(handedness)], 
+    gestures are gesture codes (see UNKNOWN_GESTURE_CODE).
+    Timestamps are time.perf_counter() values. error holds the exception of a 
+    failed frame, whose hands are all out of frame. inferred is False if the 
+    engine skipped the frame and kept its previous estimations.
+    """
+    frame_id: int
+    gestures: Tuple[Tuple[int, int], ...]
+    poses: Tuple[Tuple[Tuple[bool, ...], Tuple[bool, ...]], ...]
+    hand_states: Tuple[Tuple[HandState, HandState], ...]
+    raw_landmarks: Any
+    submitted_at: float
+    started_at: float
+    finished_at: float
+    error: str = None
+    inferred: bool = True
+
+    def ok(self) -> bool:
+        """ True if inference succeeded
+        """
+        return self.error is None
+
+    def get_gesture_estimations(self, lane: int = 0) -> Tuple[int, int]:
+        """ Return (left gesture, right gesture) codes for a lane
+        """
+        return self.gestures[lane]
+
+    def queue_wait_s(self) -> float:
+        """ Time the frame waited before inference started
+        """
+        return self.started_at - self.submitted_at
+
+    def inference_s(self) -> float:
+        """ Time spent in inference, pose detection and gesture mapping
+        """
+        return self.finished_at - self.started_at
+
+    def latency_s(self) -> float:
+        """ Time from submission to result
+        """
+        return self.finished_at - self.submitted_at
+
+    def landmark_lists(self):
+        """ Mediapipe landmark lists of the snapshot's hands, for drawing
+        """
+        return landmark_lists_for(self.raw_landmarks, self.hand_states)
+
+
+def snapshot_engine(
+        hpee: HPEE, 
+        frame_id: int, 
+        submitted_at: float, 
+        started_at: float, 
+        inferred: bool = True
+    ) -> HPEEResult:
+    """ Build an immutable HPEEResult from the current state of an engine
+    """
+    return HPEEResult(
+        frame_id=frame_id,
+        gestures=tuple(tuple(lane) for lane in hpee.hand_gestures),
+        poses=tuple(tuple(pose.get_tuple() for pose in lane) for lane in hpee.hand_poses),
+        hand_states=tuple(tuple(lane) for lane in hpee.hand_states),
+        raw_landmarks=hpee.raw_landmark_result,
+        submitted_at=submitted_at,
+        started_at=started_at,
+        finished_at=time.perf_counter(),
+        inferred=inferred
+    )
+
+
+def failed_result(hpee: HPEE, frame_id: int, submitted_at: float, started_at: float, error: str) -> HPEEResult:
+    """ HPEEResult for a frame whose inference raised, every hand out of frame
+    """
+    no_hands = hpee.gesture_table.out_of_frame_code
+    return HPEEResult(
+        frame_id=frame_id,
+        gestures=tuple((no_hands, no_hands) for _ in range(hpee.num_lanes)),
+        poses=(),
+        hand_states=tuple((None, None) for _ in range(hpee.num_lanes)),
+        raw_landmarks=None,
+        submitted_at=submitted_at,
+        started_at=started_at,
+        finished_at=time.perf_counter(),
+        error=error
+    )
+
+
+class AsyncHPEEStats:
+    """ Frame accounting for AsyncHPEE
+    """
+    def __init__(self):
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.replaced = 0
+        self.rejected_busy = 0
+        self.dropped_stale = 0
+
+    def dropped(self) -> int:
+        """ Total frames that were never processed
+        """
+        return self.replaced + self.rejected_busy + self.dropped_stale
+
+    def __repr__(self):
+        return (
+            f"AsyncHPEEStats(submitted={self.submitted}, processed={self.processed}, failed={self.failed}, "
+            f"replaced={self.replaced}, rejected_busy={self.rejected_busy}, "
+            f"dropped_stale={self.dropped_stale})"
+        )
+
+
+class AsyncHPEE:
+    """ Hand pose estimation engine running on a worker thread
+
+    copy_frames: copy submitted frames, required if the caller reuses its frame buffers
+    max_pending: queue length for DropPolicy.QUEUE
+    max_age_s: QUEUE frames older than this when dequeued are dropped (None = keep all)
+
+    Failed frames are counted in stats.failed, last_error keeps the newest exception.
+    """
+    def __init__(
+            self,
+            config: HPEEConfig = HPEEConfig(),
+            drop_policy: DropPolicy = DropPolicy.LATEST_ONLY,
+            max_pending: int = 2,
+            max_age_s: float = None,
+            copy_frames: bool = False,
+            name: str = "async_hpee"
+        ):
+        self.hpee = HPEE(config)
+        self.drop_policy = drop_policy
+        self.max_pending = max(1, max_pending)
+        self.max_age_s = max_age_s
+        self.copy_frames = copy_frames
+
+        self.stats = AsyncHPEEStats()
+        self.pending: deque = deque()
+        self.busy = False
+        self.running = True
+        self.next_frame_id = 0
+        self.fresh_from = 0
+        self.force_pending = False
+        self.result: HPEEResult = None
+        self.last_error: str = None
+        self.cond = threading.Condition()
+
+        self.worker = threading.Thread(target=self.__worker_loop, name=name, daemon=True)
+        self.worker.start()
+
+    def submit(self, frame: cv.Mat, frame_id: int = None, force: bool = False) -> bool:
+        """ Submit an RGB frame for processing without blocking
+
+        force: the engine runs inference on this frame (or a newer one replacing 
+        it) regardless of skipping, and results of older frames report no hands 
+        until it is processed. Forced frames are never rejected.
+        Returns False if the frame was rejected by the drop policy.
+        """
+        submitted_at = time.perf_counter()
+        with self.cond:
+            if frame_id is None:
+                frame_id = self.next_frame_id
+            self.next_frame_id = frame_id + 1
+            self.stats.submitted += 1
+            if force:
+                self.fresh_from = frame_id
+                self.force_pending = True
+
+            match self.drop_policy:
+                case DropPolicy.SKIP_WHILE_BUSY:
+                    if not force and (self.busy or self.pending):
+                        self.stats.rejected_busy += 1
+                        return False
+                case DropPolicy.QUEUE:
+                    if len(self.pending) >= self.max_pending:
+                        self.pending.popleft()
+                        self.stats.replaced += 1
+                case other:
+                    if self.pending:
+                        self.pending.clear()
+                        self.stats.replaced += 1
+
+            if self.copy_frames:
+                frame = frame.copy()
+            self.pending.append((frame, frame_id, submitted_at))
+            self.cond.notify_all()
+        return True
+
+    def latest(self) -> HPEEResult:
+        """ Newest finished result, None until the first frame is processed
+        """
+        return self.result
+
+    def wait_for_result(self, frame_id: int, timeout: float = None) -> HPEEResult:
+        """ Block until a result for frame_id (or a newer frame) is published
+        """
+        with self.cond:
+            self.cond.wait_for(
+                lambda: self.result is not None and self.result.frame_id >= frame_id,
+                timeout
+            )
+            return self.result
+
+    def idle(self) -> bool:
+        """ True if nothing is pending or being processed
+        """
+        with self.cond:
+            return not self.busy and not self.pending
+
+    def get_gesture_estimations(self, lane: int = 0) -> Tuple[int, int]:
+        """ Return (left gesture, right gesture) codes from the latest result
+
+        Out of frame before the first result and while a forced frame is pending.
+        """
+        result = self.result
+        if result is None or result.frame_id < self.fresh_from:
+            no_hands = self.hpee.gesture_table.out_of_frame_code
+            return no_hands, no_hands
+        return result.get_gesture_estimations(lane)
+
+    def set_quality(self, level: QualityLevel):
+        """ Switch quality level, applied by the worker before its next frame
+        """
+        self.hpee.set_quality(level)
+
+    def annotate_frame(self, frame: cv.Mat):
+        """ Annotate frame with the latest result's landmarks
+        """
+        result = self.result
+        return draw_hand_landmarks(frame, None if result is None else result.landmark_lists())
+
+    def close(self):
+        """ Stop the worker thread, pending frames are discarded
+        """
+        with self.cond:
+            self.running = False
+            self.pending.clear()
+            self.cond.notify_all()
+        self.worker.join(timeout=1.0)
+
+    def __next_job(self):
+        """
+        Private.
+        Wait for and pop the next frame to process, None when closing
+        """
+        with self.cond:
+            while True:
+                self.cond.wait_for(lambda: self.pending or not self.running)
+                if not self.running:
+                    return None
+
+                frame, frame_id, submitted_at = self.pending.popleft()
+                stale = self.max_age_s is not None \
+                    and time.perf_counter() - submitted_at > self.max_age_s
+                if self.drop_policy == DropPolicy.QUEUE and stale and self.pending:
+                    # Always keep the newest frame so results keep flowing
+                    self.stats.dropped_stale += 1
+                    continue
+
+                force = self.force_pending and frame_id >= self.fresh_from
+                if force:
+                    self.force_pending = False
+                self.busy = True
+                return frame, frame_id, submitted_at, force
+
+    def __worker_loop(self):
+        """
+        Private.
+        Run inference on pending frames and publish results
+        """
+        while True:
+            job = self.__next_job()
+            if job is None:
+                return
+
+            frame, frame_id, submitted_at, force = job
+            started_at = time.perf_counter()
+            result = None
+            try:
+                if force:
+                    self.hpee.force_next()
+                inferred = self.hpee.update(frame)
+                result = snapshot_engine(self.hpee, frame_id, submitted_at, started_at, inferred)
+            except Exception as e:
+                print(f"{self.worker.name}: inference failed on frame {frame_id}: {e!r}")
+                result = failed_result(self.hpee, frame_id, submitted_at, started_at, repr(e))
+            finally:
+                # Waiters are woken even if the worker dies, busy never sticks
+                with self.cond:
+                    if result is not None:
+                        self.result = result
+                        if result.ok():
+                            self.stats.processed += 1
+                        else:
+                            self.stats.failed += 1
+                            self.last_error = result.error
+                    self.busy = False
+                    self.cond.notify_all()
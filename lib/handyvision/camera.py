@@ -1,39 +1,244 @@
 """ camera.py
 
 Opencv camera wrapper.
+
+Optionally runs capture on a background thread (threaded=True). The
+capture thread keeps reading from the device into a small ring buffer
+and get_frame() hands back the newest frame without waiting on the sensor.
 """
 import cv2 as cv
 import numpy as np
-from typing import Tuple
+import threading
+import time
+
+from collections import deque
+from typing import Tuple, List
+
+
+class CapturedFrame:
+    """ Frame captured by a frame source
+
+    seq: monotonically increasing sequence number (starting at 0)
+    timestamp: time.perf_counter() at which the frame was read
+    """
+    __slots__ = ("frame", "seq", "timestamp")
+
+    def __init__(self, frame: np.ndarray, seq: int, timestamp: float):
+        self.frame = frame
+        self.seq = seq
+        self.timestamp = timestamp
+
+    def age(self) -> float:
+        """ Seconds since this frame was captured
+        """
+        return time.perf_counter() - self.timestamp
+
+
+class CaptureStats:
+    """ Capture counters, used to tell capture stalls from processing stalls
+
+    captured: frames read from the device
+    delivered: frames handed to callers (duplicates included)
+    dropped: frames captured but superseded before any caller saw them
+    duplicates: calls that returned the same frame as the previous call
+    failed_reads: device reads that returned no frame
+    """
+    def __init__(self):
+        self.captured = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.duplicates = 0
+        self.failed_reads = 0
+
+    def __repr__(self):
+        return (
+            f"CaptureStats(captured={self.captured}, delivered={self.delivered}, "
+            f"dropped={self.dropped}, duplicates={self.duplicates}, "
+            f"failed_reads={self.failed_reads})"
+        )
+
+
+class FrameRingBuffer:
+    """ Small thread safe ring buffer holding the most recent captured frames
+
+    Writers push frames, readers take the newest one. Keeps track of dropped
+    and duplicate frames from the readers point of view.
+    """
+    def __init__(self, size: int = 2):
+        self.frames: deque = deque(maxlen=max(1, size))
+        self.stats = CaptureStats()
+        self.next_seq = 0
+        self.last_delivered_seq = -1
+        self.cond = threading.Condition()
+
+    def push(self, frame: np.ndarray, timestamp: float = None, delivered: bool = False) -> CapturedFrame:
+        """ Push a new frame, return it wrapped as a CapturedFrame
+
+        delivered: the frame is handed to the caller straight away (reads on the caller's thread)
+        """
+        timestamp = time.perf_counter() if timestamp is None else timestamp
+        with self.cond:
+            captured = CapturedFrame(frame, self.next_seq, timestamp)
+            self.next_seq += 1
+            self.stats.captured += 1
+            self.frames.append(captured)
+            if delivered:
+                self.__record_delivery(captured.seq)
+            self.cond.notify_all()
+        return captured
+
+    def record_failed_read(self):
+        """ Count a device read that returned no frame
+        """
+        with self.cond:
+            self.stats.failed_reads += 1
+
+    def latest(self, timeout: float = 0.0) -> CapturedFrame:
+        """ Return the newest frame, or None if nothing has been captured yet
+
+        Waits up to timeout seconds for the first frame, never waits
+        once a frame is available.
+        """
+        with self.cond:
+            if not self.frames and timeout > 0:
+                self.cond.wait_for(lambda: len(self.frames) > 0, timeout)
+            if not self.frames:
+                return None
+
+            captured = self.frames[-1]
+            self.__record_delivery(captured.seq)
+            return captured
+
+    def wait_newer(self, seq: int, timeout: float = None) -> CapturedFrame:
+        """ Block until a frame newer than seq is available (or timeout)
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.next_seq > seq + 1, timeout)
+            if not self.frames or self.frames[-1].seq <= seq:
+                return None
+            captured = self.frames[-1]
+            self.__record_delivery(captured.seq)
+            return captured
+
+    def recent(self) -> List[CapturedFrame]:
+        """ Return the buffered frames, oldest first
+        """
+        with self.cond:
+            return list(self.frames)
+
+    def __record_delivery(self, seq: int):
+        """
+        Private.
+        Update dropped/duplicate counters for a delivered frame. Caller holds the lock.
+        """
+        self.stats.delivered += 1
+        if seq == self.last_delivered_seq:
+            self.stats.duplicates += 1
+        elif seq > self.last_delivered_seq:
+            self.stats.dropped += seq - self.last_delivered_seq - 1
+            self.last_delivered_seq = seq
+
 
 class Camera:
     """ Thin wrapper around cv.VideoCapture
+
+    threaded: read frames on a background thread, get_frame() returns the newest
+    buffer_size: number of frames held by the ring buffer in threaded mode
     """
-    def __init__(self, camera_idx: int = 0, name: str = None):
+    def __init__(
+            self,
+            camera_idx: int = 0,
+            name: str = None,
+            threaded: bool = False,
+            buffer_size: int = 2,
+            first_frame_timeout_s: float = 2.0
+        ):
         self.index = camera_idx
         self.name = f"CAM_{self.index}" if name is None else name
         self.camera: cv.VideoCapture  = cv.VideoCapture(self.index)
 
+        self.threaded = threaded
+        self.first_frame_timeout_s = first_frame_timeout_s
+        self.buffer = FrameRingBuffer(buffer_size)
+        self.capture_thread: threading.Thread = None
+        self.running = False
+        self.release_pending = False
+
     def good(self) -> bool:
-        """ Check if the camera was initialized succesfully 
+        """ Check if the camera was initialized succesfully
         """
         if self.camera is None:
                 return False
         if not self.camera.isOpened():
              return False
         return True
-        
+
     def get_frame(self) -> Tuple[bool, np.ndarray]:
-        """ Capture frame from camera object 
+        """ Capture frame from camera object
+
+        In threaded mode, return the newest buffered frame without blocking.
+        The same frame may be returned twice if the camera has not produced a new one.
+        """
+        captured = self.get_latest_frame()
+        if captured is None:
+            return False, None
+        return True, captured.frame
+
+    def get_latest_frame(self) -> CapturedFrame:
+        """ Return the newest frame with its sequence number and capture timestamp
+
+        Starts the capture thread on first use (threaded mode). Only blocks while
+        waiting for the very first frame. Returns None if no frame is available.
+        """
+        if not self.threaded:
+            got_frame, frame = self.camera.read()
+            if not got_frame:
+                self.buffer.record_failed_read()
+                return None
+            return self.buffer.push(frame, delivered=True)
+
+        self.start()
+        timeout = self.first_frame_timeout_s if self.buffer.next_seq == 0 else 0.0
+        return self.buffer.latest(timeout)
+
+    def get_stats(self) -> CaptureStats:
+        """ Capture counters (captured, delivered, dropped, duplicates)
+        """
+        return self.buffer.stats
+
+    def start(self):
+        """ Start the background capture thread (threaded mode only)
+        """
+        if not self.threaded or self.running:
+            return
+        self.running = True
+        self.capture_thread = threading.Thread(
+            target=self.__capture_loop,
+            name=f"{self.name}_capture",
+            daemon=True
+        )
+        self.capture_thread.start()
+
+    def stop(self) -> bool:
+        """ Stop the background capture thread
+
+        Returns False if the thread is still blocked in a read after the timeout.
         """
-        return self.camera.read()
-    
+        self.running = False
+        if self.capture_thread is None:
+            return True
+        self.capture_thread.join(timeout=1.0)
+        if self.capture_thread.is_alive():
+            return False
+        self.capture_thread = None
+        return True
+
     def set_auto_focus(self, on: bool):
         """ Set auto focus
         """
         af_value = 1 if on else 0
         self.camera.set(cv.CAP_PROP_AUTOFOCUS, af_value)
-    
+
     def set_resolution(self, width, height):
         """ Set resolution
         """
@@ -42,5 +247,30 @@ class Camera:
 
     def release(self):
         """ Release camera, also called when object is destroyed
+
+        If the capture thread is stuck in a read, it releases the camera 
+        itself once the read returns.
         """
+        self.release_pending = True
+        if not self.stop():
+            print(f"{self.name}: capture thread did not stop, camera is released when its read returns")
+            return
         self.camera.release()
+
+    def __capture_loop(self):
+        """
+        Private.
+        Read frames into the ring buffer until stopped
+        """
+        while self.running:
+            got_frame, frame = self.camera.read()
+            if not got_frame:
+                self.buffer.record_failed_read()
+                if not self.good():
+                    break
+                time.sleep(0.001)
+                continue
+            self.buffer.push(frame)
+        self.running = False
+        if self.release_pending:
+            self.camera.release()
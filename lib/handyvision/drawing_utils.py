@@ -2,9 +2,14 @@
 
 Opencv drawing utilities. 
 """
+import time
+
 import cv2 as cv
+import numpy as np
 
+from collections import OrderedDict
 from enum import IntEnum, unique
+from typing import Callable, Any, Tuple
 
 
 COLORS = {
@@ -43,11 +48,29 @@ class Line:
         self.thickness = thickness
 
 
+@unique
+class BlurMode(IntEnum):
+    """ How RegionBlur applies a GaussianConfig
+
+    FULL: blur at full resolution
+    DOWNSAMPLED: shrink by downsample, blur with the sigmas scaled down to 
+                 match, stretch back
+    CACHED: DOWNSAMPLED at most every refresh_s, the last result is reused 
+            in between
+    """
+    FULL = 0
+    DOWNSAMPLED = 1
+    CACHED = 2
+
+
 class GaussianConfig:
     def __init__(self):
         self.ksize = (3,3)
         self.sigmaX = 2
         self.sigmaY = 2
+        self.mode = BlurMode.FULL
+        self.downsample = 4
+        self.refresh_s = 1.0 / 15.0
 
 
 def draw_center_line(frame: cv.Mat, options: Line) -> cv.Mat:
@@ -59,11 +82,10 @@ def draw_center_line(frame: cv.Mat, options: Line) -> cv.Mat:
     return frame
 
 
-def draw_text_centered(frame: cv.Mat, text: str, font: Font):
+def draw_text_centered(frame: cv.Mat, text: str, font: Font, cache: "TextCache" = None):
     """ Draw text centered in the frame, return frame, text_size
     """
-    rows = frame.shape[0]
-    text_size, baseline = cv.getTextSize(text, font.face, font.scale, font.thickness)
+    text_size, baseline = get_text_size(text, font, cache)
     
     fh, fw, _ = frame.shape
     origin = fw // 2, fh // 2
@@ -71,96 +93,50 @@ def draw_text_centered(frame: cv.Mat, text: str, font: Font):
     text_left = origin[0] - text_size[0] // 2
     text_top = origin[1] + text_size[1] // 2 - baseline
 
-    frame = cv.putText(
-        frame, 
-        text, 
-        org=(text_left, text_top), 
-        fontFace=font.face,
-        fontScale=font.scale,
-        thickness=font.thickness,
-        color=font.color
-    )
-
+    frame = draw_text(frame, text, font, (text_left, text_top), cache)
     return frame, text_size
 
 
-def draw_text_bottom_left(frame: cv.Mat, text: str, font: Font):
+def draw_text_bottom_left(frame: cv.Mat, text: str, font: Font, cache: "TextCache" = None):
     """ Draw text anchored at bottom left of frame, return frame, text_size
     """
     rows = frame.shape[0]
-    text_size, baseline = cv.getTextSize(text, font.face, font.scale, font.thickness)
-    frame = cv.putText(
-        frame, 
-        text, 
-        org=(0, rows - 1 - baseline), 
-        fontFace=font.face,
-        fontScale=font.scale,
-        thickness=font.thickness,
-        color=font.color
-    )
-
+    text_size, baseline = get_text_size(text, font, cache)
+    frame = draw_text(frame, text, font, (0, rows - 1 - baseline), cache)
     return frame, text_size
 
 
-def draw_text_top_left(frame: cv.Mat, text: str, font: Font):
+def draw_text_top_left(frame: cv.Mat, text: str, font: Font, cache: "TextCache" = None):
     """ Draw text anchored at top left of frame, return frame, text_size
     """
-    rows = frame.shape[0]
-    text_size, baseline = cv.getTextSize(text, font.face, font.scale, font.thickness)
-    frame = cv.putText(
-        frame, 
-        text, 
-        org=(0, text_size[1] + baseline), 
-        fontFace=font.face,
-        fontScale=font.scale,
-        thickness=font.thickness,
-        color=font.color
-    )
-
+    text_size, baseline = get_text_size(text, font, cache)
+    frame = draw_text(frame, text, font, (0, text_size[1] + baseline), cache)
     return frame, text_size
 
 
-def draw_text_top_right(frame: cv.Mat, text: str, font: Font):
+def draw_text_top_right(frame: cv.Mat, text: str, font: Font, cache: "TextCache" = None):
     """ Draw text at the top right of the frame
     """
-    text_size, baseline = cv.getTextSize(text, font.face, font.scale, font.thickness)
+    text_size, baseline = get_text_size(text, font, cache)
     fh, fw, _ = frame.shape
 
     text_left =  fw - text_size[0] - 1
     text_bot = text_size[1] + baseline 
 
-    frame = cv.putText(
-        frame, 
-        text, 
-        org=(text_left, text_bot), 
-        fontFace=font.face,
-        fontScale=font.scale,
-        thickness=font.thickness,
-        color=font.color
-    )
-
+    frame = draw_text(frame, text, font, (text_left, text_bot), cache)
     return frame, text_size
 
 
-def draw_text_bottom_right(frame: cv.Mat, text: str, font: Font):
+def draw_text_bottom_right(frame: cv.Mat, text: str, font: Font, cache: "TextCache" = None):
     """ Draw text at the bottom right of the frame
     """
-    text_size, baseline = cv.getTextSize(text, font.face, font.scale, font.thickness)
+    text_size, baseline = get_text_size(text, font, cache)
     fh, fw, _ = frame.shape
 
     text_left = fw - text_size[0] - 1
     text_bot = fh - baseline 
 
-    frame = cv.putText(
-        frame, 
-        text, 
-        org=(text_left, text_bot), 
-        fontFace=font.face,
-        fontScale=font.scale,
-        thickness=font.thickness,
-        color=font.color
-    )
-
+    frame = draw_text(frame, text, font, (text_left, text_bot), cache)
     return frame, text_size
 
 
@@ -170,15 +146,22 @@ def get_text_bot_left(text_size, baseline, center):
     return center[0] - text_size[0] // 2, center[1] + text_size[1] // 2 - baseline
 
 
-def get_text_size(text: str, font: Font):
+def get_text_size(text: str, font: Font, cache: "TextCache" = None):
     """ Get prospective size of text box (and baseline)
     """
+    if cache is not None:
+        return cache.text_size(text, font)
     return cv.getTextSize(text, font.face, font.scale, font.thickness)
 
 
-def draw_text(frame: cv.Mat, text: str, font: Font, bottom_left):
+def draw_text(frame: cv.Mat, text: str, font: Font, bottom_left, cache: "TextCache" = None):
     """ Draw text at point (having already adjusted for size and baseline)
+
+    With a cache the text is blitted from its pre-rasterized sprite.
     """
+    if cache is not None:
+        return cache.blit(frame, text, font, bottom_left)
+
     frame = cv.putText(
         frame, 
         text, 
@@ -197,3 +180,310 @@ def draw_rectangle(frame: cv.Mat, rect: Rect, top_left):
     """
     bottom_right = top_left[0] + rect.width, top_left[1] + rect.height
     return cv.rectangle(frame, top_left, bottom_right, rect.color, rect.thickness, rect.line_type)
+
+
+def font_key(font: Font):
+    """ Hashable snapshot of a font's settings, for caches
+    """
+    return font.face, font.scale, font.thickness, tuple(font.color)
+
+
+class CachedLayer:
+    """ Static drawing rendered once and composited onto every frame
+
+    render: draws the layer onto a frame sized BGR canvas
+    blend_edges: blend anti-aliased edge pixels exactly, otherwise edge pixels 
+                 at least half covered join the opaque mask and the layer is 
+                 a single masked copy per frame
+
+    The layer is rendered over a black and a white canvas. Pixels that come 
+    out the same on both are opaque and composited with one masked copy, 
+    anti-aliased edge pixels get their coverage from the difference. Only the 
+    bounding box of the drawing is stored. The cache is rebuilt when the frame 
+    size or the key passed to composite() changes.
+    """
+    def __init__(self, render: Callable[[np.ndarray], Any], blend_edges: bool = True):
+        self.render = render
+        self.blend_edges = blend_edges
+        self.shape = None
+        self.key = None
+        self.bounds = None
+        self.overlay: np.ndarray = None
+        self.mask: np.ndarray = None
+        self.edges = None
+        self.flat_edges: np.ndarray = None
+        self.edge_color: np.ndarray = None
+        self.edge_alpha: np.ndarray = None
+        self.edge_keep: np.ndarray = None
+        self.rebuilds = 0
+
+    def composite(self, frame: cv.Mat, key=None) -> cv.Mat:
+        """ Draw the layer onto frame in place
+        """
+        if frame.shape != self.shape or key != self.key:
+            self.__build(frame.shape, key)
+        if self.bounds is None:
+            return frame
+
+        region = frame[self.bounds]
+        cv.copyTo(self.overlay, self.mask, region)
+        if self.edge_alpha is not None:
+            # Flat indices are cheaper when the region is whole frame rows
+            if region.flags.c_contiguous:
+                region, edges = region.reshape(-1, 3), self.flat_edges
+            else:
+                edges = self.edges
+            background = region[edges].astype(np.float32)
+            region[edges] = (background * self.edge_keep + self.edge_color).astype(np.uint8)
+        return frame
+
+    def invalidate(self):
+        """ Re-render on the next composite
+        """
+        self.shape = None
+
+    def __build(self, shape, key):
+        """ 
+        Private.
+        Render the layer and split it into opaque and edge pixels
+        """
+        self.shape = shape
+        self.key = key
+        self.rebuilds += 1
+
+        black = np.zeros(shape, dtype=np.uint8)
+        white = np.full(shape, 255, dtype=np.uint8)
+        self.render(black)
+        self.render(white)
+
+        painted = (black != 0).any(axis=2) | (white != 255).any(axis=2)
+        rows, cols = np.nonzero(painted)
+        if rows.size == 0:
+            self.bounds = None
+            return
+        self.bounds = np.s_[rows.min():rows.max() + 1, cols.min():cols.max() + 1]
+
+        black, white, painted = black[self.bounds], white[self.bounds], painted[self.bounds]
+        opaque = (black == white).all(axis=2)
+        self.overlay = np.ascontiguousarray(black)
+        self.mask = opaque.astype(np.uint8)
+
+        # Drawn = background * (1 - alpha) + color * alpha, black gives color * alpha
+        self.edges = np.nonzero(painted & ~opaque)
+        self.edge_color = None
+        self.edge_alpha = None
+        if not self.edges[0].size:
+            return
+        black_edges = black[self.edges].astype(np.float32)
+        white_edges = white[self.edges].astype(np.float32)
+        alpha = 1.0 - (white_edges - black_edges) / 255.0
+
+        if not self.blend_edges:
+            covered = alpha.min(axis=1) >= 0.5
+            solid = tuple(index[covered] for index in self.edges)
+            self.overlay[solid] = np.clip(black_edges[covered] / alpha[covered] + 0.5, 0, 255).astype(np.uint8)
+            self.mask[solid] = 1
+            return
+
+        self.edge_alpha = alpha
+        self.edge_keep = 1.0 - alpha
+        self.edge_color = black_edges + 0.5
+        self.flat_edges = np.ravel_multi_index(self.edges, opaque.shape)
+
+
+class TextSprite:
+    """ Measured size and (lazily) rasterized alpha sprite of one string in one font
+
+    offset: (x, y) of the text origin inside the sprite
+    keep, alpha: float32 per pixel blend weights of the background and the font color
+    color: sprite sized patch of the font color
+    """
+    def __init__(self, size: Tuple[int, int], baseline: int):
+        self.size = size
+        self.baseline = baseline
+        self.offset = (0, 0)
+        self.keep: np.ndarray = None
+        self.alpha: np.ndarray = None
+        self.color: np.ndarray = None
+
+
+class TextCacheStats:
+    """ TextCache counters
+
+    rasterized: sprites rendered, a sprite is only rendered the first time its text is blitted
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.rasterized = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return (
+            f"TextCacheStats(hits={self.hits}, misses={self.misses}, "
+            f"rasterized={self.rasterized}, evictions={self.evictions})"
+        )
+
+
+class TextCache:
+    """ LRU cache of text sizes and sprites keyed by (text, font settings)
+
+    max_entries: strings kept, the least recently used one is evicted
+
+    Pass it as cache= to get_text_size and the draw_text family. Sprites are 
+    the text rasterized onto a padded single channel canvas, blitting blends 
+    the font color through it with one cv.blendLinear call on the frame 
+    region, the result matches putText to one intensity level. Text that would 
+    run off the frame is drawn with putText. Font objects are mutable, the key 
+    is a snapshot of their settings so edited fonts get new entries.
+    """
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self.entries: OrderedDict = OrderedDict()
+        self.stats = TextCacheStats()
+
+    def get(self, text: str, font: Font) -> TextSprite:
+        """ Cache entry of text in font, measured on a miss
+        """
+        key = (text, font_key(font))
+        sprite = self.entries.get(key)
+        if sprite is not None:
+            self.stats.hits += 1
+            self.entries.move_to_end(key)
+            return sprite
+
+        self.stats.misses += 1
+        size, baseline = cv.getTextSize(text, font.face, font.scale, font.thickness)
+        sprite = TextSprite(size, baseline)
+        self.entries[key] = sprite
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats.evictions += 1
+        return sprite
+
+    def text_size(self, text: str, font: Font):
+        """ (size, baseline) like cv.getTextSize
+        """
+        sprite = self.get(text, font)
+        return sprite.size, sprite.baseline
+
+    def blit(self, frame: cv.Mat, text: str, font: Font, bottom_left) -> cv.Mat:
+        """ Draw text with its origin at bottom_left, like draw_text
+        """
+        sprite = self.get(text, font)
+        if sprite.alpha is None:
+            self.__rasterize(sprite, text, font)
+
+        ph, pw = sprite.alpha.shape
+        left, top = bottom_left[0] - sprite.offset[0], bottom_left[1] - sprite.offset[1]
+        if left < 0 or top < 0 or left + pw > frame.shape[1] or top + ph > frame.shape[0]:
+            return draw_text(frame, text, font, bottom_left)
+
+        region = frame[top:top + ph, left:left + pw]
+        cv.blendLinear(region, sprite.color, sprite.keep, sprite.alpha, dst=region)
+        return frame
+
+    def clear(self):
+        """ Drop every entry
+        """
+        self.entries.clear()
+
+    def __rasterize(self, sprite: TextSprite, text: str, font: Font):
+        """ 
+        Private.
+        Render the text coverage into the sprite
+        """
+        self.stats.rasterized += 1
+        width, height = sprite.size
+        pad = font.thickness + 2
+        sprite.offset = (pad, pad + height)
+
+        canvas = np.zeros((height + sprite.baseline + 2 * pad, width + 2 * pad), dtype=np.uint8)
+        cv.putText(canvas, text, sprite.offset, font.face, font.scale, 255, font.thickness)
+
+        # Crop to the covered pixels, the blend cost is per sprite pixel
+        x, y, w, h = cv.boundingRect(canvas)
+        if w and h:
+            canvas = canvas[y:y + h, x:x + w]
+            sprite.offset = (sprite.offset[0] - x, sprite.offset[1] - y)
+        sprite.alpha = canvas.astype(np.float32) / 255.0
+        sprite.keep = 1.0 - sprite.alpha
+        sprite.color = np.empty(canvas.shape + (3,), dtype=np.uint8)
+        sprite.color[:] = np.asarray(font.color[:3], dtype=np.uint8)
+
+
+class RegionBlur:
+    """ Gaussian blur of a frame region in place, the way a GaussianConfig asks
+
+    tint_channel: channel set to 255 before blurring (2 tints BGR red), or None
+
+    Results are written straight into the region (a view into the frame), the 
+    downsampled and cached paths keep their buffers between frames. Use one 
+    RegionBlur per region, a new region shape reallocates them.
+    """
+    def __init__(self, tint_channel: int = None):
+        self.tint_channel = tint_channel
+        self.shape = None
+        self.factor = None
+        self.small: np.ndarray = None
+        self.cached: np.ndarray = None
+        self.cached_at: float = None
+
+    def apply(self, region: np.ndarray, config: GaussianConfig) -> np.ndarray:
+        """ Tint and blur region in place
+        """
+        if config.mode == BlurMode.FULL:
+            if self.tint_channel is not None:
+                region[:, :, self.tint_channel] = 255
+            return cv.GaussianBlur(region, config.ksize, sigmaX=config.sigmaX, sigmaY=config.sigmaY, dst=region)
+
+        if region.shape != self.shape or config.downsample != self.factor:
+            self.__allocate(region.shape, config.downsample)
+
+        if config.mode == BlurMode.CACHED:
+            now = time.perf_counter()
+            if self.cached_at is not None and now - self.cached_at < config.refresh_s:
+                np.copyto(region, self.cached)
+                return region
+            self.__downsampled(region, config)
+            np.copyto(self.cached, region)
+            self.cached_at = now
+            return region
+
+        return self.__downsampled(region, config)
+
+    def __downsampled(self, region: np.ndarray, config: GaussianConfig) -> np.ndarray:
+        """ 
+        Private.
+        Shrink, tint and blur the small copy, stretch it back into region
+        """
+        h, w = region.shape[:2]
+        cv.resize(region, (self.small.shape[1], self.small.shape[0]), dst=self.small, interpolation=cv.INTER_LINEAR)
+        if self.tint_channel is not None:
+            self.small[:, :, self.tint_channel] = 255
+
+        # Kernel size follows from the scaled sigmas
+        sigma_x = gaussian_sigma(config.ksize[0], config.sigmaX) / self.factor
+        sigma_y = gaussian_sigma(config.ksize[1], config.sigmaY) / self.factor
+        cv.GaussianBlur(self.small, (0, 0), sigmaX=sigma_x, sigmaY=sigma_y, dst=self.small)
+        return cv.resize(self.small, (w, h), dst=region, interpolation=cv.INTER_LINEAR)
+
+    def __allocate(self, shape, factor: int):
+        """ 
+        Private.
+        (Re)allocate buffers for a new region shape or downsample factor
+        """
+        self.shape = shape
+        self.factor = max(1, factor)
+        small_h, small_w = max(1, shape[0] // self.factor), max(1, shape[1] // self.factor)
+        self.small = np.empty((small_h, small_w) + shape[2:], dtype=np.uint8)
+        self.cached = np.empty(shape, dtype=np.uint8)
+        self.cached_at = None
+
+
+def gaussian_sigma(ksize: int, sigma: float) -> float:
+    """ Sigma cv.GaussianBlur uses for ksize and sigma (derived from ksize when sigma <= 0)
+    """
+    if sigma > 0:
+        return sigma
+    return 0.3 * ((ksize - 1) * 0.5 - 1) + 0.8
@@ -0,0 +1,362 @@
+""" frame_sources.py
+
+Recorded frame sources that drop in for Camera.
+
+VideoFileSource and ImageFolderSource expose the same good()/get_frame()/release()
+interface as Camera, so HPEE, rtgame.Game, the examples and benchmarks can run
+on recorded sessions without a webcam. Frames are decoded ahead of time on a
+worker thread.
+
+Playback modes:
+    FAST: every frame is delivered in order, as fast as the caller consumes them
+    REALTIME: frames are paced at the source fps, late frames are dropped like a live camera
+"""
+import os
+import queue
+import threading
+import time
+
+import cv2 as cv
+import numpy as np
+
+from enum import IntEnum, unique
+from typing import Tuple, List
+
+from .camera import CapturedFrame, CaptureStats
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+
+@unique
+class PlaybackMode(IntEnum):
+    """ How a recorded source hands out frames
+    """
+    FAST = 0
+    REALTIME = 1
+
+
+class FrameSource:
+    """ Base class for recorded frame sources with a decode-ahead worker
+
+    Subclasses implement _open(), _read(), _rewind() and _close().
+    """
+    def __init__(
+            self,
+            name: str,
+            fps: float = 30.0,
+            playback: PlaybackMode = PlaybackMode.FAST,
+            prefetch: int = 8,
+            loop: bool = False
+        ):
+        self.name = name
+        self.fps = fps
+        self.playback = playback
+        self.prefetch = max(1, prefetch)
+        self.loop = loop
+        self.resolution: Tuple[int, int] = None
+
+        self.stats = CaptureStats()
+        self.frames: queue.Queue = queue.Queue(maxsize=self.prefetch)
+        self.opened = False
+        self.finished = False
+        self.running = False
+        self.started = False
+        self.worker: threading.Thread = None
+        self.start_time: float = None
+        self.last_frame: CapturedFrame = None
+
+    def good(self) -> bool:
+        """ Check if the source is open and has frames left
+        """
+        if not self.opened:
+            return False
+        if self.finished and self.frames.empty():
+            return False
+        return True
+
+    def get_frame(self) -> Tuple[bool, np.ndarray]:
+        """ Get next frame, (False, None) once the source is exhausted
+        """
+        captured = self.get_latest_frame()
+        if captured is None:
+            return False, None
+        return True, captured.frame
+
+    def get_latest_frame(self) -> CapturedFrame:
+        """ Get next frame with its sequence number and timestamp
+
+        FAST: blocks until the next decoded frame is ready.
+        REALTIME: waits for the frame's presentation time, skipping frames
+        whose presentation time has already passed.
+        """
+        if not self.opened:
+            return None
+        self.start()
+
+        captured = self.__next_decoded()
+        if captured is None or self.playback == PlaybackMode.FAST:
+            return self.__deliver(captured)
+
+        # Drop frames we are already too late for, keep the newest due one
+        due_index = int((time.perf_counter() - self.start_time) * self.fps)
+        while captured.seq < due_index:
+            try:
+                newer = self.frames.get_nowait()
+            except queue.Empty:
+                break
+            if newer is None:
+                self.finished = True
+                break
+            self.stats.dropped += 1
+            captured = newer
+
+        wait = captured.timestamp - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+
+        return self.__deliver(captured)
+
+    def get_stats(self) -> CaptureStats:
+        """ Capture counters (captured, delivered, dropped, duplicates)
+        """
+        return self.stats
+
+    def set_auto_focus(self, on: bool):
+        """ No-op, present to match Camera
+        """
+        pass
+
+    def set_resolution(self, width, height):
+        """ Resize decoded frames to (width, height)
+        """
+        self.resolution = (int(width), int(height))
+
+    def start(self):
+        """ Start the decode-ahead worker
+        """
+        if self.started or self.finished:
+            return
+        self.started = True
+        self.running = True
+        self.start_time = time.perf_counter()
+        self.worker = threading.Thread(
+            target=self.__decode_loop,
+            name=f"{self.name}_decode",
+            daemon=True
+        )
+        self.worker.start()
+
+    def release(self):
+        """ Stop the worker and close the underlying file(s)
+        """
+        self.running = False
+        # Unblock the worker if it is waiting on a full queue
+        while self.worker is not None and self.worker.is_alive():
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                pass
+            self.worker.join(timeout=0.05)
+        self.worker = None
+        if self.opened:
+            self._close()
+        self.opened = False
+
+    def _open(self) -> bool:
+        raise NotImplementedError
+
+    def _read(self) -> Tuple[bool, np.ndarray]:
+        raise NotImplementedError
+
+    def _rewind(self) -> bool:
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def __next_decoded(self) -> CapturedFrame:
+        """
+        Private.
+        Block for the next decoded frame, None at end of stream
+        """
+        if self.finished and self.frames.empty():
+            return None
+        captured = self.frames.get()
+        if captured is None:
+            self.finished = True
+        return captured
+
+    def __deliver(self, captured: CapturedFrame) -> CapturedFrame:
+        """
+        Private.
+        Update counters for a frame handed to the caller
+        """
+        if captured is None:
+            return None
+        self.stats.delivered += 1
+        self.last_frame = captured
+        return captured
+
+    def __decode_loop(self):
+        """
+        Private.
+        Decode frames into the prefetch queue until end of stream or release
+        """
+        seq = 0
+        while self.running:
+            got_frame, frame = self._read()
+            if not got_frame:
+                if self.loop and self._rewind():
+                    continue
+                break
+
+            if self.resolution is not None and (frame.shape[1], frame.shape[0]) != self.resolution:
+                frame = cv.resize(frame, self.resolution, interpolation=cv.INTER_AREA)
+
+            # Presentation time in perf_counter terms, used by REALTIME pacing
+            if self.playback == PlaybackMode.REALTIME:
+                timestamp = self.start_time + seq / self.fps
+            else:
+                timestamp = time.perf_counter()
+
+            captured = CapturedFrame(frame, seq, timestamp)
+            seq += 1
+            self.stats.captured += 1
+            if not self.__put(captured):
+                return
+
+        self.__put(None)
+        self.running = False
+
+    def __put(self, item) -> bool:
+        """
+        Private.
+        Put an item in the prefetch queue, giving up if the source is released
+        """
+        while self.running or item is None:
+            try:
+                self.frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if not self.running:
+                    return False
+        return False
+
+
+class VideoFileSource(FrameSource):
+    """ Frames from a video file (anything cv.VideoCapture can decode)
+    """
+    def __init__(
+            self,
+            path: str,
+            playback: PlaybackMode = PlaybackMode.FAST,
+            prefetch: int = 8,
+            loop: bool = False,
+            name: str = None
+        ):
+        self.path = os.path.normpath(path)
+        self.capture: cv.VideoCapture = None
+        super().__init__(
+            os.path.basename(self.path) if name is None else name,
+            playback=playback,
+            prefetch=prefetch,
+            loop=loop
+        )
+        self.opened = self._open()
+
+    def _open(self) -> bool:
+        self.capture = cv.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            print(f"Could not open video file: {self.path}")
+            return False
+        fps = self.capture.get(cv.CAP_PROP_FPS)
+        if fps is not None and fps > 0:
+            self.fps = fps
+        return True
+
+    def _read(self) -> Tuple[bool, np.ndarray]:
+        return self.capture.read()
+
+    def _rewind(self) -> bool:
+        return self.capture.set(cv.CAP_PROP_POS_FRAMES, 0)
+
+    def _close(self):
+        self.capture.release()
+
+    def frame_count(self) -> int:
+        """ Number of frames reported by the container (may be approximate)
+        """
+        return int(self.capture.get(cv.CAP_PROP_FRAME_COUNT))
+
+
+class ImageFolderSource(FrameSource):
+    """ Frames from a folder of images, played back in file name order
+    """
+    def __init__(
+            self,
+            folder: str,
+            fps: float = 30.0,
+            playback: PlaybackMode = PlaybackMode.FAST,
+            prefetch: int = 8,
+            loop: bool = False,
+            name: str = None
+        ):
+        self.folder = os.path.normpath(folder)
+        self.files: List[str] = []
+        self.next_file = 0
+        super().__init__(
+            os.path.basename(self.folder) if name is None else name,
+            fps=fps,
+            playback=playback,
+            prefetch=prefetch,
+            loop=loop
+        )
+        self.opened = self._open()
+
+    def _open(self) -> bool:
+        if not os.path.isdir(self.folder):
+            print(f"Could not open image folder: {self.folder}")
+            return False
+        self.files = sorted(
+            os.path.join(self.folder, f) for f in os.listdir(self.folder)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self.files:
+            print(f"No images found in: {self.folder}")
+            return False
+        return True
+
+    def _read(self) -> Tuple[bool, np.ndarray]:
+        while self.next_file < len(self.files):
+            path = self.files[self.next_file]
+            self.next_file += 1
+            frame = cv.imread(path, cv.IMREAD_COLOR)
+            if frame is not None:
+                return True, frame
+            print(f"Could not read image: {path}")
+        return False, None
+
+    def _rewind(self) -> bool:
+        self.next_file = 0
+        return True
+
+    def frame_count(self) -> int:
+        """ Number of images in the folder
+        """
+        return len(self.files)
+
+
+def open_frame_source(
+        path: str,
+        playback: PlaybackMode = PlaybackMode.FAST,
+        loop: bool = False,
+        fps: float = 30.0
+    ) -> FrameSource:
+    """ Open a video file or image folder as a frame source
+
+    fps is only used for image folders, videos use the container frame rate.
+    """
+    if os.path.isdir(path):
+        return ImageFolderSource(path, fps=fps, playback=playback, loop=loop)
+    return VideoFileSource(path, playback=playback, loop=loop)
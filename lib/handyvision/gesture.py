@@ -9,33 +9,40 @@ import numpy as np
 
 import json
 
+from collections import OrderedDict
 from typing import Dict
-from enum import Enum, unique
+from enum import IntEnum, unique
 from .landmarks import *
+from .img_utils import PremultipliedImage
 
 
 @unique
-class Gesture(str, Enum):
-    """ String enum representing gestures.
+class Gesture(IntEnum):
+    """ Enum representing gestures.
+
+    Values are the gesture codes used by DEFAULT_GESTURE_TABLE, so plain 
+    integer codes returned by HPEE compare equal to Gesture members. 
+    Use .name (or get_string_from_gesture) at the display boundary.
     """
-    FIST = "FIST"
-    POINT = "POINT"
-    PEACE = "PEACE"
-    THREE = "THREE"
-    FOUR = "FOUR"
-    SPREAD = "SPREAD"
-    THUMB = "THUMB"
-    ROCK = "ROCK"
-    LOVE = "LOVE"
-    GUN_DOUBLE = "GUN_DOUBLE"
-    GUN_SINGLE = "GUN_SINGLE"
-    SPLASH = "SPLASH"
-    CHEERIO = "CHEERIO"
-    HANG_LOOSE = "HANG_LOOSE"
-    FLIPOFF =  "FLIPOFF"
-    OUT_OF_FRAME = "OUT_OF_FRAME"
+    FIST = 0
+    POINT = 1
+    PEACE = 2
+    THREE = 3
+    FOUR = 4
+    SPREAD = 5
+    THUMB = 6
+    ROCK = 7
+    LOVE = 8
+    GUN_DOUBLE = 9
+    GUN_SINGLE = 10
+    SPLASH = 11
+    CHEERIO = 12
+    HANG_LOOSE = 13
+    FLIPOFF = 14
+    OUT_OF_FRAME = 15
 
 
+# Gesture definitions, compiled into DEFAULT_GESTURE_TABLE
 gesture_map = {
     (False, False, False, False, False): Gesture.FIST,
     (False, True , False, False, False): Gesture.POINT,
@@ -55,17 +62,171 @@ gesture_map = {
     (None , None , None , None , None): Gesture.OUT_OF_FRAME,
 }
 
+# Engines and results report gestures as int codes: Gesture values with the 
+# default table, UNKNOWN_GESTURE_CODE for hands no gesture matches and the 
+# out-of-frame code for missing hands (also before the first result).
+UNKNOWN_GESTURE_CODE = -1
+OUT_OF_FRAME_CODE = Gesture.OUT_OF_FRAME.value
+
+# Finger masks: bit i set when Finger(i) is extended. A hand that is not in 
+# the frame has no mask, it uses OUT_OF_FRAME_MASK so batches stay vectorized.
+NUM_FINGER_MASKS = 32
+OUT_OF_FRAME_MASK = NUM_FINGER_MASKS
+
+_DIGIT_WEIGHTS = 1 << np.arange(5, dtype=np.uint8)
+
+
+def digits_to_masks(digits: np.ndarray) -> np.ndarray:
+    """ Pack an (N, 5) bool digit-state array into (N,) 5-bit finger masks
+    """
+    return np.asarray(digits, dtype=np.uint8) @ _DIGIT_WEIGHTS
+
+
+def digits_to_mask(digits: Tuple[bool, bool, bool, bool, bool]) -> int:
+    """ Pack a digit-state tuple into a finger mask, OUT_OF_FRAME_MASK if any digit is None
+    """
+    mask = 0
+    for i, extended in enumerate(digits):
+        if extended is None:
+            return OUT_OF_FRAME_MASK
+        if extended:
+            mask |= 1 << i
+    return mask
+
+
+class GestureTable:
+    """ Finger mask -> gesture code lookup table
+
+    codes[mask] is the gesture code for each of the 32 finger masks, plus 
+    codes[OUT_OF_FRAME_MASK] for hands that are not in the frame. 
+    Unrecognized masks map to UNKNOWN_GESTURE_CODE. names[code] is the 
+    display name of a code.
+
+    Gestures named after a Gesture member keep that member's value as their 
+    code, new gestures (e.g. from a custom manifest) are numbered after Gesture.
+    """
+    def __init__(self, mapping: Dict[Tuple[bool, ...], str]):
+        """ 
+        mapping: digit-state tuple -> gesture name (or Gesture), the 
+        all-None tuple names the out-of-frame gesture.
+        """
+        self.codes = np.full(NUM_FINGER_MASKS + 1, UNKNOWN_GESTURE_CODE, dtype=np.int16)
+        names = {g.value: g.name for g in Gesture}
+
+        for digits, gesture in mapping.items():
+            name = gesture.name if isinstance(gesture, Gesture) else str(gesture).upper()
+            if name in Gesture.__members__:
+                code = Gesture[name].value
+            else:
+                code = next((c for c, n in names.items() if n == name), max(names) + 1)
+                names[code] = name
+            self.codes[digits_to_mask(digits)] = code
+
+        self.names: Tuple[str, ...] = tuple(names.get(c, "UNKNOWN") for c in range(max(names) + 1))
+        self.out_of_frame_code = int(self.codes[OUT_OF_FRAME_MASK])
+
+    def lookup(self, masks: np.ndarray) -> np.ndarray:
+        """ Gesture codes for an array of finger masks
+        """
+        return self.codes[masks]
+
+    def code_for_digits(self, digits: Tuple[bool, ...]) -> int:
+        """ Gesture code for a single digit-state tuple
+        """
+        return int(self.codes[digits_to_mask(digits)])
+
+    def name(self, code: int, unknown: str = "UNKNOWN") -> str:
+        """ Display name of a gesture code
+        """
+        if code is None or code < 0 or code >= len(self.names):
+            return unknown
+        return self.names[code]
+
+    @staticmethod
+    def from_manifest(manifest_path: str) -> "GestureTable":
+        """ Compile a custom gesture set from a manifest.json file
+
+        Expects a "GESTURE_SET" list inside "gestures", entries like:
+        {"Gesture": "FIST", "Digits": [0, 0, 0, 0, 0]}
+        Digits are in Finger order (thumb, index, middle, ring, pinky), 
+        the out-of-frame gesture uses null digits.
+        """
+        with open(manifest_path) as f:
+            gesture_set = json.load(f)["gestures"]["GESTURE_SET"]
+
+        mapping = {}
+        for entry in gesture_set:
+            digits = tuple(None if d is None else bool(d) for d in entry["Digits"])
+            if len(digits) != 5:
+                print(f"Skipping gesture {entry['Gesture']}, expected 5 digits")
+                continue
+            mapping[digits] = entry["Gesture"]
+        return GestureTable(mapping)
+
+
+DEFAULT_GESTURE_TABLE = GestureTable(gesture_map)
+
+
+def get_gesture_codes(digits: np.ndarray, table: GestureTable = DEFAULT_GESTURE_TABLE) -> np.ndarray:
+    """ Gesture codes for an (N, 5) bool digit-state array
+    """
+    return table.lookup(digits_to_masks(digits))
+
+
+class IconCacheStats:
+    """ IconManager counters
+
+    decodes: image files decoded (the atlas counts once)
+    hits, misses: scaled variant cache lookups
+    """
+    def __init__(self):
+        self.decodes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return (
+            f"IconCacheStats(decodes={self.decodes}, hits={self.hits}, "
+            f"misses={self.misses}, evictions={self.evictions})"
+        )
+
+
+class IconVariant:
+    """ One scaled icon, its premultiplied form is built on first use
+    """
+    def __init__(self, image: cv.Mat):
+        self.image = image
+        self.premultiplied: PremultipliedImage = None
+
+
 class IconManager:
     """ Icon manager 
 
     Pass a relative or absolute path to a folder containing a manifest.json file.
+
+    use_atlas: load every gesture from the manifest's ATLAS image (one decode) 
+               when the manifest has one, otherwise one file per gesture
+    cache_size: scaled variants kept, least recently used are evicted
+
+    Nothing is decoded until the first icon is requested. Atlas entries give 
+    the left hand "Rect" [x, y, w, h], with MIRROR_RIGHT set the right hand 
+    icons are the left ones mirrored at load time, otherwise each entry also 
+    gives a "RightRect". Scaled icons are cached per 
+    (handedness, gesture, scale), callers must not modify returned images.
     """
-    def __init__(self, asset_folder_path: str):
+    def __init__(self, asset_folder_path: str, use_atlas: bool = True, cache_size: int = 32):
         self.asset_folder = os.path.normpath(asset_folder_path)
         self.asset_manifest = os.path.join(self.asset_folder, "manifest.json")
+        self.use_atlas = use_atlas
+        self.cache_size = max(1, cache_size)
         self.gesture_icon_map_left = {}
         self.gesture_icon_map_right = {}
-        self.__load_assets()
+        self.gesture_files = {}
+        self.atlas = None
+        self.variants: OrderedDict = OrderedDict()
+        self.stats = IconCacheStats()
+        self.__load_manifest()
 
     def icon_for_gesture(self, handedness: Handedness, gesture: Gesture, scale: Tuple[int, int] = None) -> cv.Mat:
         """ Get image for handedness and gesture
@@ -73,35 +234,104 @@ class IconManager:
         Returns None if there is no icon for gesture.
         Size -> (width, height)
         """
-        if handedness == Handedness.LEFT and gesture in self.gesture_icon_map_left:
-            img = self.gesture_icon_map_left[gesture]
-            return img if scale is None else cv.resize(img, None, fx = scale[0], fy = scale[1])
-        elif handedness == Handedness.RIGHT and gesture in self.gesture_icon_map_right:
-            img = self.gesture_icon_map_right[gesture]
-            return img if scale is None else cv.resize(img, None, fx = scale[0], fy = scale[1])
-        else:
-            print(f"No icon for gesture: {gesture.name}")
+        variant = self.__variant(handedness, gesture, scale)
+        return None if variant is None else variant.image
+
+    def premultiplied_icon_for_gesture(self, handedness: Handedness, gesture: Gesture, scale: Tuple[int, int] = None) -> PremultipliedImage:
+        """ Like icon_for_gesture, ready for overlay_premultiplied
+        """
+        variant = self.__variant(handedness, gesture, scale)
+        if variant is None:
             return None
+        if variant.premultiplied is None:
+            variant.premultiplied = PremultipliedImage(variant.image)
+        return variant.premultiplied
 
-    def __load_assets(self):
-        """ Load assets from the provided manifest file 
+    def __variant(self, handedness: Handedness, gesture: Gesture, scale) -> IconVariant:
+        """
+        Private.
+        Cached scaled icon, decoded and scaled on a miss
+        """
+        key = (handedness, gesture, None if scale is None else tuple(scale))
+        variant = self.variants.get(key)
+        if variant is not None:
+            self.stats.hits += 1
+            self.variants.move_to_end(key)
+            return variant
+
+        img = self.__source(handedness, gesture)
+        if img is None:
+            print(f"No icon for gesture: {get_string_from_gesture(gesture)}")
+            return None
+
+        self.stats.misses += 1
+        variant = IconVariant(img if scale is None else cv.resize(img, None, fx = scale[0], fy = scale[1]))
+        self.variants[key] = variant
+        if len(self.variants) > self.cache_size:
+            self.variants.popitem(last=False)
+            self.stats.evictions += 1
+        return variant
+
+    def __source(self, handedness: Handedness, gesture: Gesture) -> cv.Mat:
+        """
+        Private.
+        Full size icon, decoding the atlas or the gesture's files on first use
+        """
+        icon_map = self.gesture_icon_map_left if handedness == Handedness.LEFT else self.gesture_icon_map_right
+        if gesture in icon_map:
+            return icon_map[gesture]
+
+        if self.atlas is not None:
+            self.__load_atlas()
+        elif gesture in self.gesture_files:
+            left_file, right_file = self.gesture_files[gesture]
+            self.gesture_icon_map_left[gesture] = self.__decode(left_file)
+            self.gesture_icon_map_right[gesture] = self.__decode(right_file)
+        return icon_map.get(gesture)
+
+    def __decode(self, file: str) -> cv.Mat:
+        """
+        Private.
+        Decode an image with its alpha channel
+        """
+        self.stats.decodes += 1
+        return cv.imread(os.path.join(self.asset_folder, file), cv.IMREAD_UNCHANGED)
+
+    def __load_atlas(self):
+        """
+        Private.
+        Cut every gesture out of the atlas image
+        """
+        atlas, self.atlas = self.atlas, None
+        image = self.__decode(atlas["File"])
+        for mapping in atlas["RECTS"]:
+            x, y, w, h = mapping["Rect"]
+            gesture = Gesture[mapping["Gesture"]]
+            self.gesture_icon_map_left[gesture] = image[y:y + h, x:x + w]
+            if atlas.get("MIRROR_RIGHT", False):
+                self.gesture_icon_map_right[gesture] = cv.flip(self.gesture_icon_map_left[gesture], 1)
+            else:
+                x, y, w, h = mapping["RightRect"]
+                self.gesture_icon_map_right[gesture] = image[y:y + h, x:x + w]
+
+    def __load_manifest(self):
+        """ Read the provided manifest file, images are decoded on first use
         """
         with open(self.asset_manifest) as f:
             data = json.load(f)
             gesture_data = data["gestures"]
 
+            if self.use_atlas and "ATLAS" in gesture_data:
+                self.atlas = gesture_data["ATLAS"]
+                return
+
             left_folder = gesture_data["LEFT_FOLDER"]
             right_folder = gesture_data["RIGHT_FOLDER"]
 
             for mapping in gesture_data["PATH_GESTURE_MAPPING"]:
                 file = mapping["File"]
                 gesture = mapping["Gesture"]
-                left_file = os.path.join(self.asset_folder, left_folder, file)
-                right_file = os.path.join(self.asset_folder, right_folder, file)
-                left_image = cv.imread(left_file, cv.IMREAD_UNCHANGED)
-                right_image = cv.imread(right_file, cv.IMREAD_UNCHANGED)
-                self.gesture_icon_map_left[Gesture[gesture]] = left_image
-                self.gesture_icon_map_right[Gesture[gesture]] = right_image
+                self.gesture_files[Gesture[gesture]] = os.path.join(left_folder, file), os.path.join(right_folder, file)
 
 
 def get_gesture(hand_pose: HandPose) -> Gesture:
@@ -109,13 +339,10 @@ def get_gesture(hand_pose: HandPose) -> Gesture:
 
     Return None if gesture is unrecognized.
     """
-    global gesture_map
-    finger_states = hand_pose.get_tuple()
-
-    if not finger_states in gesture_map:
+    code = DEFAULT_GESTURE_TABLE.codes[digits_to_mask(hand_pose.get_tuple())]
+    if code == UNKNOWN_GESTURE_CODE:
         return None
-    
-    return gesture_map[hand_pose.get_tuple()]
+    return Gesture(code)
 
 
 def get_gesture_string(hand_pose: HandPose) -> str:
@@ -130,13 +357,10 @@ def get_gesture_string(hand_pose: HandPose) -> str:
         return gesture.name
 
 
-def get_string_from_gesture(gesture: Gesture) -> str:
-    """ Get string from gesture
+def get_string_from_gesture(gesture: Gesture, table: GestureTable = DEFAULT_GESTURE_TABLE) -> str:
+    """ Get string from gesture or gesture code
     """
-    if gesture is None:
-        return "NONE"
-    else:
-        return gesture.name
+    return table.name(gesture, unknown="NONE")
 
 
 def get_random_gesture(exclude: List[Gesture] = []) -> Gesture:
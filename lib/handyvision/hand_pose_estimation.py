@@ -5,15 +5,39 @@ Hand pose estimation engine (hpee) client interface.
 API: 
 hpe = HPE(options)
 hpe.update(frame)
-g_left, g_right = hpe.gestures()
+g_left, g_right = hpe.get_gesture_estimations()
+
+Several players sharing one frame (one inference for everyone):
+hpe = HPEE(HPEEConfig(max_hands=4, num_lanes=2))
+hpe.update(frame)
+p1_left, p1_right = hpe.get_gesture_estimations(0)
+p2_left, p2_right = hpe.get_gesture_estimations(1)
+
+ROI tracking (landmark inference on a crop around the previous hands):
+hpe = HPEE(HPEEConfig(roi_tracking=True, redetect_interval=15))
+
+Motion gating (reuse the previous results while the frame is static):
+hpe = HPEE(HPEEConfig(motion_gate=True, motion_max_age_s=0.5))
+
+Searching mode (cheaper detection while nobody is in frame):
+hpe = HPEE(HPEEConfig(search_after=15, search_interval=3))
+
+Downscaled inference input (landmarks stay normalized to the full frame):
+hpe = HPEE(HPEEConfig(inference_scale=0.5))
+
+Adaptive quality (see quality.py):
+hpe.set_quality(QualityLevel(model_complexity=0, inference_scale=0.5, inference_interval=2))
 """
 
 import mediapipe as mp
 import cv2 as cv
+import numpy as np
 
-from typing import Tuple
+from typing import Tuple, List
 
 from .gesture import *
+from .img_utils import MotionGate
+from .quality import QualityLevel
 
 
 
@@ -30,14 +54,82 @@ def detect_digits(
     if hand is None: 
         return hand_pose
 
-    thumb_extended = is_thumb_extended(hand, opt.thumb_extended_angle_threshold)
-    hand_pose.set(Finger.THUMB, thumb_extended)
+    digits = detect_digits_batch(hand.points[np.newaxis], opt)[0]
+    hand_pose.set_digits(tuple(digits.tolist()))
+    return hand_pose
 
-    for finger in non_thumb_fingers():
-        extended = is_finger_extended(hand, finger, opt.wrist_finger_factor)
-        hand_pose.set(finger, extended)
 
-    return hand_pose
+# Landmarks used by the batched classifier, fingers in Finger order (index..pinky)
+_FINGER_KNUCKLES = [
+    HandLandmark.INDEX_FINGER_MCP, 
+    HandLandmark.MIDDLE_FINGER_MCP, 
+    HandLandmark.RING_FINGER_MCP, 
+    HandLandmark.PINKY_FINGER_MCP
+]
+_FINGER_TIPS = [
+    HandLandmark.INDEX_FINGER_TIP, 
+    HandLandmark.MIDDLE_FINGER_TIP, 
+    HandLandmark.RING_FINGER_TIP, 
+    HandLandmark.PINKY_FINGER_TIP
+]
+
+
+def detect_digits_batch(
+        points: np.ndarray, 
+        opt: DetectDigitOptions = DetectDigitOptions()
+    ) -> np.ndarray:
+    """ Vectorized detect_digits for a batch of hands
+
+    points: (N, 21, 2 or 3) landmark array, see HandState.points
+    Returns (N, 5) bool digit states in Finger order. 
+
+    Same rules as is_thumb_extended / is_finger_extended, in a handful of 
+    numpy ops for the whole batch.
+    """
+    xy = np.asarray(points)[..., :2]
+    digits = np.empty((xy.shape[0], 5), dtype=bool)
+
+    # Fingers: wrist-tip-dist > factor * wrist-knuckle-dist
+    wrist = xy[:, HandLandmark.WRIST, np.newaxis]
+    knuckle_dist = np.linalg.norm(xy[:, _FINGER_KNUCKLES] - wrist, axis=-1)
+    tip_dist = np.linalg.norm(xy[:, _FINGER_TIPS] - wrist, axis=-1)
+    np.greater(tip_dist, opt.wrist_finger_factor * knuckle_dist, out=digits[:, 1:])
+
+    # Thumb: tip further from pinky knuckle than the index knuckle is, 
+    # and angle between base->tip and base->index knuckle over threshold
+    thumb_base = xy[:, HandLandmark.THUMB_CMC]
+    thumb_tip = xy[:, HandLandmark.THUMB_TIP]
+    index_k = xy[:, HandLandmark.INDEX_FINGER_MCP]
+    pinky_k = xy[:, HandLandmark.PINKY_FINGER_MCP]
+
+    thumb_t_pinky_k_dist = np.linalg.norm(thumb_tip - pinky_k, axis=-1)
+    index_k_pinky_k_dist = np.linalg.norm(index_k - pinky_k, axis=-1)
+
+    tip_to_base = thumb_tip - thumb_base
+    index_to_base = index_k - thumb_base
+    cross = tip_to_base[:, 0] * index_to_base[:, 1] - tip_to_base[:, 1] * index_to_base[:, 0]
+    dot = np.einsum("ij,ij->i", tip_to_base, index_to_base)
+    thumb_angle_deg = np.degrees(np.arctan2(np.abs(cross), dot))
+
+    digits[:, Finger.THUMB] = (index_k_pinky_k_dist < thumb_t_pinky_k_dist) \
+        & (thumb_angle_deg > opt.thumb_extended_angle_threshold)
+
+    return digits
+
+
+def classify_hands_batch(
+        points: np.ndarray, 
+        opt: DetectDigitOptions = DetectDigitOptions(),
+        table: GestureTable = DEFAULT_GESTURE_TABLE
+    ) -> Tuple[np.ndarray, np.ndarray]:
+    """ Classify a batch of hands, e.g. thousands of recorded hands
+
+    points: (N, 21, 2 or 3) landmark array
+    Returns (digits, codes): (N, 5) bool digit states and (N,) gesture codes 
+    from table (UNKNOWN_GESTURE_CODE if unrecognized).
+    """
+    digits = detect_digits_batch(points, opt)
+    return digits, get_gesture_codes(digits, table)
 
 
 class HPEEConfig:
@@ -49,13 +141,124 @@ class HPEEConfig:
             max_hands: int = 2,
             min_detection_confidence: float = 0.5,
             min_tracking_confidence: float = 0.5,
-            detect_digit_params: DetectDigitOptions = DetectDigitOptions()
+            detect_digit_params: DetectDigitOptions = DetectDigitOptions(),
+            num_lanes: int = 1,
+            gesture_table: GestureTable = DEFAULT_GESTURE_TABLE,
+            mirror: bool = False,
+            roi_tracking: bool = False,
+            roi_padding: float = 0.5,
+            redetect_interval: int = 15,
+            motion_gate: bool = False,
+            motion_threshold: float = 0.002,
+            motion_max_age_s: float = 0.5,
+            search_after: int = 0,
+            search_interval: int = 3,
+            search_scale: float = 1.0,
+            inference_scale: float = 1.0
         ):
+        """ 
+        num_lanes: number of players sharing the frame. The frame is split into 
+        equal vertical strips (left to right) and each detected hand is assigned 
+        to a lane by its wrist x coordinate. Use max_hands = 2 * num_lanes.
+        gesture_table: finger mask -> gesture code table, e.g. a custom set 
+        from GestureTable.from_manifest()
+        mirror: input frames are not mirrored, mirror landmark x coordinates 
+        and handedness instead. Gives the same gestures and lanes as mirroring 
+        the frame before update() without touching the input pixels.
+        roi_tracking: run inference on a crop around the previous frame's hands 
+        instead of the whole frame. Falls back to full frame detection when a 
+        tracked hand is lost and every redetect_interval frames, so new hands 
+        are still picked up.
+        roi_padding: padding added on each side of the hands' bounding box, as 
+        a fraction of the hand size
+        motion_gate: skip inference and keep the previous hand states and gestures 
+        while the frame is static, see MotionGate. Each lane is checked separately.
+        motion_threshold: fraction of changed thumbnail pixels that counts as 
+        motion, lower is more sensitive
+        motion_max_age_s: longest time results are reused without inference
+        search_after: enter searching mode after this many consecutive frames 
+        without hands (0 disables). Searching runs detection on every 
+        search_interval-th frame only, on a frame downscaled by search_scale, 
+        and returns to every frame as soon as a hand is found. A hand entering 
+        the frame is detected at most search_interval - 1 frames later.
+        inference_scale: downscale frames by this factor before inference. 
+        Landmarks are normalized, so they stay in full frame coordinates. 
+        FramePreprocessor(input_scale=...) can apply it instead, fused with 
+        the lane split and colour conversion.
+        """
         self.max_hands = max_hands
         self.model_complexity = model_complexity
         self.min_detection_confidence = min_detection_confidence
         self.min_tracking_confidence = min_tracking_confidence
         self.detect_digit_params = detect_digit_params
+        self.num_lanes = max(1, num_lanes)
+        self.gesture_table = gesture_table
+        self.mirror = mirror
+        self.roi_tracking = roi_tracking
+        self.roi_padding = roi_padding
+        self.redetect_interval = max(1, redetect_interval)
+        self.motion_gate = motion_gate
+        self.motion_threshold = motion_threshold
+        self.motion_max_age_s = motion_max_age_s
+        self.search_after = max(0, search_after)
+        self.search_interval = max(1, search_interval)
+        self.search_scale = min(max(search_scale, 0.1), 1.0)
+        self.inference_scale = min(max(inference_scale, 0.1), 1.0)
+
+
+# Crops covering more of the frame than this are not worth tracking
+_ROI_MAX_AREA = 0.5
+
+
+def roi_to_pixels(roi: Tuple[float, float, float, float], width: int, height: int) -> Tuple[int, int, int, int]:
+    """ Normalized (x0, y0, x1, y1) box to a pixel box of a width x height frame
+    """
+    x0, y0, x1, y1 = roi
+    return (
+        max(int(np.floor(x0 * width)), 0), 
+        max(int(np.floor(y0 * height)), 0),
+        min(int(np.ceil(x1 * width)), width), 
+        min(int(np.ceil(y1 * height)), height)
+    )
+
+
+class InferenceStats:
+    """ How HPEE frames were processed
+
+    full_frame: frames run through full frame detection
+    roi: frames run on the tracked region of interest only
+    roi_lost: roi frames that lost a hand and were redone on the full frame
+    skipped: static frames that reused the previous results (motion gate)
+    searching: frames processed in searching mode, detection or not
+    search_skipped: searching frames that skipped detection
+    cadence_skipped: frames skipped by the quality level's inference interval
+    """
+    def __init__(self):
+        self.full_frame = 0
+        self.roi = 0
+        self.roi_lost = 0
+        self.skipped = 0
+        self.searching = 0
+        self.search_skipped = 0
+        self.cadence_skipped = 0
+
+    def frames(self) -> int:
+        """ Total frames passed to update()
+        """
+        return self.full_frame + self.roi + self.skipped + self.search_skipped + self.cadence_skipped
+
+    def skip_ratio(self) -> float:
+        """ Fraction of frames that skipped inference
+        """
+        return (self.skipped + self.search_skipped + self.cadence_skipped) / max(1, self.frames())
+
+    def __repr__(self):
+        return (
+            f"InferenceStats(full_frame={self.full_frame}, roi={self.roi}, "
+            f"roi_lost={self.roi_lost}, skipped={self.skipped}, "
+            f"searching={self.searching}, search_skipped={self.search_skipped}, "
+            f"cadence_skipped={self.cadence_skipped})"
+        )
 
 
 class HPEE:
@@ -64,43 +267,158 @@ class HPEE:
     def __init__(self, config: HPEEConfig = HPEEConfig()):
         self.__set_config(config)
 
-        # Configure model
-        self.model = mp.solutions.hands.Hands(
-            model_complexity = self.model_complexity,
-            max_num_hands = self.max_hands,
-            min_detection_confidence = self.min_detection_confidence,
-            min_tracking_confidence = self.min_tracking_confidence
-        )
-
-        # Left and right hand state
-        self.left_hand_gesture: Gesture = None
-        self.left_hand_pose: HandPose = None
-        self.left_hand_state: HandState= None
+        # Configure model, models are cached per complexity for quality changes
+        self.models = {}
+        self.roi_models = {}
+        self.model = self.__model_for(self.model_complexity)
 
-        self.right_hand_gesture: Gesture = None
-        self.right_hand_pose: HandPose = None
-        self.right_hand_state: HandState = None
+        # Left and right hand state per lane, indexed [lane][hand_index(handedness)]
+        # Gestures are gesture codes from gesture_table (Gesture values for the default table)
+        no_hands = self.gesture_table.out_of_frame_code
+        self.hand_gestures: List[List[int]] = [[no_hands, no_hands] for _ in range(self.num_lanes)]
+        self.hand_poses: List[List[HandPose]] = [[None, None] for _ in range(self.num_lanes)]
+        self.hand_states: List[List[HandState]] = [[None, None] for _ in range(self.num_lanes)]
 
         self.raw_landmark_result = None
 
-    def get_gesture_estimations(self) -> Tuple[Gesture, Gesture]:
-        """ Return (left gesture, right gesture)
+        # ROI tracking state, roi is a normalized box (x0, y0, x1, y1) or None
+        self.roi_model = None
+        self.roi: Tuple[float, float, float, float] = None
+        self.tracked_hands = 0
+        self.frames_since_detection = 0
+        self.stats = InferenceStats()
+
+        # Searching mode state
+        self.searching = False
+        self.empty_frames = 0
+        self.search_frames = 0
+        self.scaled_input: np.ndarray = None
+        self.roi_input: np.ndarray = None
+
+        # Quality level, changed with set_quality()
+        self.quality = QualityLevel(self.model_complexity)
+        self.quality_scale = self.quality.inference_scale
+        self.inference_interval = self.quality.inference_interval
+        self.pending_quality: QualityLevel = None
+        self.frame_index = 0
+        self.forced = False
+
+        self.gate: MotionGate = None
+        if self.motion_gate:
+            self.gate = MotionGate(
+                threshold=self.motion_threshold,
+                max_age_s=self.motion_max_age_s,
+                num_regions=self.num_lanes
+            )
+
+    @property
+    def left_hand_gesture(self) -> int:
+        return self.hand_gestures[0][LEFT_HAND]
+
+    @property
+    def right_hand_gesture(self) -> int:
+        return self.hand_gestures[0][RIGHT_HAND]
+
+    @property
+    def left_hand_pose(self) -> HandPose:
+        return self.hand_poses[0][LEFT_HAND]
+
+    @property
+    def right_hand_pose(self) -> HandPose:
+        return self.hand_poses[0][RIGHT_HAND]
+
+    @property
+    def left_hand_state(self) -> HandState:
+        return self.hand_states[0][LEFT_HAND]
+
+    @property
+    def right_hand_state(self) -> HandState:
+        return self.hand_states[0][RIGHT_HAND]
+
+    def get_gesture_estimations(self, lane: int = 0) -> Tuple[int, int]:
+        """ Return (left gesture, right gesture) codes for a lane
+
+        Codes compare equal to Gesture members with the default gesture table.
         """
-        return self.left_hand_gesture, self.right_hand_gesture
+        gestures = self.hand_gestures[lane]
+        return gestures[LEFT_HAND], gestures[RIGHT_HAND]
     
-    def get_gesture_estimation_strings(self) -> Tuple[Gesture, Gesture]:
-        """ Return (left gesture, right gesture)
+    def get_gesture_estimation_strings(self, lane: int = 0) -> Tuple[str, str]:
+        """ Return (left gesture, right gesture) names for a lane
         """
-        left = "UNKNOWN" if self.left_hand_gesture is None else self.left_hand_gesture.name
-        right = "UNKNOWN" if self.right_hand_gesture is None else self.right_hand_gesture.name
-        return left, right
+        left_g, right_g = self.get_gesture_estimations(lane)
+        return self.gesture_table.name(left_g), self.gesture_table.name(right_g)
 
-    def update(self, frame: cv.Mat):
+    def update(self, frame: cv.Mat) -> bool:
         """ Process RGB frame and update hand gesture estimations
+
+        With motion gating, static frames keep the previous estimations.
+        Returns True if inference ran, False if the frame was skipped (motion 
+        gate, inference interval or searching mode).
         """
-        self.__update_hand_states(frame)
+        if self.pending_quality is not None:
+            self.__apply_quality()
+
+        forced, self.forced = self.forced, False
+        if forced and self.gate is not None:
+            self.gate.reset()
+
+        if self.gate is not None and not self.gate.should_process(frame):
+            self.stats.skipped += 1
+            return False
+
+        self.frame_index += 1
+        if not forced and self.frame_index % self.inference_interval != 0:
+            self.stats.cadence_skipped += 1
+            return False
+
+        scale = self.inference_scale * self.quality_scale
+        if self.searching:
+            self.stats.searching += 1
+            self.search_frames += 1
+            if not forced and self.search_frames % self.search_interval != 0:
+                self.stats.search_skipped += 1
+                return False
+            scale *= self.search_scale
+
+        # Landmarks and the ROI are normalized, so scaled frames need no remapping
+        self.__update_hand_states(self.__downscale(frame, scale))
+
         self.__update_pose_estimation()
-        self.__update_hand_gesture()
+        self.__update_search_state()
+        return True
+
+    def force_next(self):
+        """ Run inference on the next update() regardless of skipping
+
+        The motion gate, the inference interval and searching mode are 
+        bypassed once, e.g. when stale estimations must not be reused.
+        """
+        self.forced = True
+
+    def set_quality(self, level: QualityLevel):
+        """ Switch model complexity, inference scale and inference interval
+
+        Takes effect at the start of the next update(), so it is safe to call 
+        while another thread is running update().
+        """
+        self.pending_quality = level
+
+    def __apply_quality(self):
+        """ 
+        Private.
+        Apply the pending quality level
+        """
+        level, self.pending_quality = self.pending_quality, None
+        if level.model_complexity != self.model_complexity:
+            self.model_complexity = level.model_complexity
+            self.model = self.__model_for(self.model_complexity)
+            # Tracking restarts on the new model
+            self.roi = None
+            self.roi_model = None
+        self.quality_scale = level.inference_scale
+        self.inference_interval = level.inference_interval
+        self.quality = level
 
     def __set_config(self, config: HPEEConfig):
         """ 
@@ -112,17 +430,177 @@ class HPEE:
         self.min_detection_confidence = config.min_detection_confidence
         self.min_tracking_confidence = config.min_tracking_confidence
         self.detect_digit_params = config.detect_digit_params
+        self.num_lanes = config.num_lanes
+        self.gesture_table = config.gesture_table
+        self.mirror = config.mirror
+        self.roi_tracking = config.roi_tracking
+        self.roi_padding = config.roi_padding
+        self.redetect_interval = config.redetect_interval
+        self.motion_gate = config.motion_gate
+        self.motion_threshold = config.motion_threshold
+        self.motion_max_age_s = config.motion_max_age_s
+        self.search_after = config.search_after
+        self.search_interval = config.search_interval
+        self.search_scale = config.search_scale
+        self.inference_scale = config.inference_scale
+
+    def __update_search_state(self):
+        """ 
+        Private.
+        Enter searching mode after search_after empty frames, leave it on the first hand
+        """
+        if self.search_after == 0:
+            return
+        if any(hand is not None for lane in self.hand_states for hand in lane):
+            self.empty_frames = 0
+            self.searching = False
+            return
+        self.empty_frames += 1
+        if not self.searching and self.empty_frames >= self.search_after:
+            self.searching = True
+            self.search_frames = 0
+
+    def __downscale(self, frame: cv.Mat, scale: float) -> cv.Mat:
+        """ 
+        Private.
+        Frame downscaled by scale into a reused buffer, landmarks stay normalized
+        """
+        if scale >= 1.0:
+            return frame
+        h, w = frame.shape[:2]
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        if self.scaled_input is None or self.scaled_input.shape[:2] != (size[1], size[0]):
+            self.scaled_input = np.empty((size[1], size[0], frame.shape[2]), dtype=frame.dtype)
+        cv.resize(frame, size, dst=self.scaled_input, interpolation=cv.INTER_AREA)
+        return self.scaled_input
+
+    def __crop(self, frame: cv.Mat, roi) -> cv.Mat:
+        """ 
+        Private.
+        Copy the pixel roi into a reused contiguous buffer, mediapipe only 
+        takes contiguous images by reference
+        """
+        x0, y0, x1, y1 = roi
+        shape = (y1 - y0, x1 - x0) + frame.shape[2:]
+        if self.roi_input is None or self.roi_input.shape != shape:
+            self.roi_input = np.empty(shape, dtype=frame.dtype)
+        np.copyto(self.roi_input, frame[y0:y1, x0:x1])
+        return self.roi_input
+
+    def __model_for(self, model_complexity: int):
+        """ 
+        Private.
+        Cached full frame model for a model complexity
+        """
+        if model_complexity not in self.models:
+            self.models[model_complexity] = self.__create_model(model_complexity)
+        return self.models[model_complexity]
+
+    def __roi_model_for(self, model_complexity: int):
+        """ 
+        Private.
+        Cached ROI model for a model complexity
+        """
+        if model_complexity not in self.roi_models:
+            self.roi_models[model_complexity] = self.__create_model(model_complexity)
+        return self.roi_models[model_complexity]
+
+    def __create_model(self, model_complexity: int):
+        """ 
+        Private.
+        Create a mediapipe hands model with the engine's parameters
+        """
+        return mp.solutions.hands.Hands(
+            model_complexity = model_complexity,
+            max_num_hands = self.max_hands,
+            min_detection_confidence = self.min_detection_confidence,
+            min_tracking_confidence = self.min_tracking_confidence
+        )
+
+    def __process(self, model, frame: cv.Mat):
+        """ 
+        Private.
+        Run a model on a frame, read-only input lets mediapipe take it by reference
+        """
+        writeable = frame.flags.writeable
+        frame.flags.writeable = False
+        frame_hands = model.process(frame)
+        frame.flags.writeable = writeable
+        return frame_hands
+
+    def __run_model(self, frame: cv.Mat):
+        """ 
+        Private.
+        Run inference on the tracked ROI if possible, otherwise on the full frame.
+        Returns (mediapipe results, pixel roi the results are relative to or None)
+        """
+        if self.roi is not None and self.frames_since_detection < self.redetect_interval:
+            roi = roi_to_pixels(self.roi, frame.shape[1], frame.shape[0])
+            if self.roi_model is None:
+                self.roi_model = self.__roi_model_for(self.model_complexity)
+            frame_hands = self.__process(self.roi_model, self.__crop(frame, roi))
+            found = 0 if frame_hands.multi_hand_landmarks is None else len(frame_hands.multi_hand_landmarks)
+            if found >= self.tracked_hands:
+                self.frames_since_detection += 1
+                self.stats.roi += 1
+                return frame_hands, roi
+            self.stats.roi_lost += 1
+
+        self.frames_since_detection = 0
+        self.stats.full_frame += 1
+        return self.__process(self.model, frame), None
+
+    def __update_roi(self, points: np.ndarray, width: int, height: int):
+        """ 
+        Private.
+        Track the padded bounding box of all hands, computed in pixels and 
+        stored normalized. The box is kept while the hands stay well inside it 
+        so mediapipe's own tracking inside the crop stays valid, the crop model 
+        is reset whenever the box moves.
+        """
+        self.tracked_hands = len(points)
+        xy = points[..., :2] * (width, height)
+        lo = xy.min(axis=(0, 1))
+        hi = xy.max(axis=(0, 1))
+        hand_size = (xy.max(axis=1) - xy.min(axis=1)).max()
+        pad = self.roi_padding * hand_size
+
+        if self.roi is not None:
+            x0, y0, x1, y1 = roi_to_pixels(self.roi, width, height)
+            margin = 0.5 * pad
+            inside = lo[0] - margin >= x0 and lo[1] - margin >= y0 \
+                and hi[0] + margin <= x1 and hi[1] + margin <= y1
+            wanted_area = np.prod(hi - lo + 2.0 * pad)
+            too_large = (x1 - x0) * (y1 - y0) > 2.0 * wanted_area
+            if inside and not too_large:
+                return
+
+        x0, y0 = np.maximum(lo - pad, 0.0)
+        x1, y1 = np.minimum(hi + pad, (width, height))
+        if x1 <= x0 or y1 <= y0 or (x1 - x0) * (y1 - y0) > _ROI_MAX_AREA * width * height:
+            self.roi = None
+            return
+
+        self.roi = (float(x0 / width), float(y0 / height), float(x1 / width), float(y1 / height))
+        if self.roi_model is None:
+            self.roi_model = self.__roi_model_for(self.model_complexity)
+        self.roi_model.reset()
 
     def __update_hand_states(self, frame: cv.Mat):
         """ 
         Private.
         Pass frame through mediapipe and update current hand state
         """
-        frame_hands = self.model.process(frame)
+        if self.roi_tracking:
+            frame_hands, roi = self.__run_model(frame)
+        else:
+            self.stats.full_frame += 1
+            frame_hands, roi = self.__process(self.model, frame), None
 
         # Clear previous state
-        self.left_hand_state = None
-        self.right_hand_state = None 
+        for lane_states in self.hand_states:
+            lane_states[LEFT_HAND] = None
+            lane_states[RIGHT_HAND] = None
         self.raw_landmark_result = None
 
         if frame is None or frame.size == 0:
@@ -133,57 +611,106 @@ class HPEE:
 
         # Question: does multi_hand_landmarks == None -> multi_handedness == None    
         if frame_hands.multi_hand_landmarks is None:
+            self.roi = None
+            self.tracked_hands = 0
             return
         
         self.raw_landmark_result = frame_hands.multi_hand_landmarks
 
-        for mp_landmark, mp_handedness in zip(
-                frame_hands.multi_hand_landmarks, 
-                frame_hands.multi_handedness
-            ):
-            hand = HandState(mp_landmark.landmark, mp_handedness)
-            if hand.handedness == Handedness.LEFT:
-                self.left_hand_state = hand
-            else:
-                self.right_hand_state = hand
+        points, handedness, scores = hand_results_to_arrays(
+            frame_hands.multi_hand_landmarks, 
+            frame_hands.multi_handedness
+        )
+
+        height, width = frame.shape[:2]
+        if roi is not None:
+            # Crop coordinates back to frame coordinates, z scales with x
+            x0, y0, x1, y1 = roi
+            points[..., 0] = (x0 + points[..., 0] * (x1 - x0)) / width
+            points[..., 1] = (y0 + points[..., 1] * (y1 - y0)) / height
+            points[..., 2] *= (x1 - x0) / width
+            self.raw_landmark_result = None
+        if self.roi_tracking:
+            self.__update_roi(points, width, height)
+
+        if self.mirror:
+            # Landmarks no longer match the raw result, drawing uses the hand states
+            self.raw_landmark_result = None
+        for hand_points, hand_handedness, score in zip(points, handedness, scores.tolist()):
+            hand = HandState(hand_points, hand_handedness, score)
+            if self.mirror:
+                hand.mirror()
+            self.hand_states[self.__lane_for(hand)][hand_index(hand.handedness)] = hand
+
+    def __lane_for(self, hand: HandState) -> int:
+        """ 
+        Private.
+        Player lane of a hand, from its wrist x coordinate
+        """
+        if self.num_lanes == 1:
+            return 0
+        wrist_x = hand.points[HandLandmark.WRIST, 0]
+        return min(max(int(wrist_x * self.num_lanes), 0), self.num_lanes - 1)
     
     def __update_pose_estimation(self):
         """ 
         Private.
-        Process hand states and generate pose estimations
+        Process hand states and generate pose and gesture estimations, 
+        all detected hands are classified in one batch
         """
-        self.left_hand_pose = detect_digits(
-            self.left_hand_state, 
-            self.detect_digit_params
-        )
-        self.right_hand_pose = detect_digits(
-            self.right_hand_state, 
-            self.detect_digit_params
-        )
+        # One finger mask per (lane, hand) slot, missing hands stay out of frame
+        masks = np.full((self.num_lanes, 2), OUT_OF_FRAME_MASK, dtype=np.uint8)
+        present = []
+        for lane, lane_states in enumerate(self.hand_states):
+            for i, hand in enumerate(lane_states):
+                self.hand_poses[lane][i] = HandPose()
+                if hand is not None:
+                    present.append((lane, i, hand))
 
-    def __update_hand_gesture(self):
-        """ 
-        Private.
-        Update hand gestures
+        if present:
+            points = np.stack([hand.points for _, _, hand in present])
+            digits = detect_digits_batch(points, self.detect_digit_params)
+            hand_masks = digits_to_masks(digits)
+            for (lane, i, _), hand_digits, mask in zip(present, digits.tolist(), hand_masks):
+                self.hand_poses[lane][i] = HandPose(tuple(hand_digits))
+                masks[lane, i] = mask
+
+        self.hand_gestures = self.gesture_table.lookup(masks).tolist()
+
+    def get_landmark_lists(self):
+        """ Mediapipe landmark lists of the current hands, for drawing
         """
-        self.left_hand_gesture = get_gesture(self.left_hand_pose)
-        self.right_hand_gesture = get_gesture(self.right_hand_pose)
+        return landmark_lists_for(self.raw_landmark_result, self.hand_states)
 
     def annotate_frame(self, frame: cv.Mat):
         """ Annotate frame with current landmarks
         """
-        mp_drawing = mp.solutions.drawing_utils
-        mp_drawing_styles = mp.solutions.drawing_styles
-        mp_hands = mp.solutions.hands
-
-        if self.raw_landmark_result is not None:
-            for hand_landmarks in self.raw_landmark_result:
-                mp_drawing.draw_landmarks(
-                    frame,
-                    hand_landmarks,
-                    mp_hands.HAND_CONNECTIONS,
-                    mp_drawing_styles.get_default_hand_landmarks_style(),
-                    mp_drawing_styles.get_default_hand_connections_style()
-                )
-        
-        return frame
+        return draw_hand_landmarks(frame, self.get_landmark_lists())
+
+
+def landmark_lists_for(raw_landmark_result, hand_states: List[List[HandState]]):
+    """ Raw mediapipe landmark lists if available, otherwise built from hand states
+    """
+    if raw_landmark_result is not None:
+        return raw_landmark_result
+    return [hand.landmark_list() for lane in hand_states for hand in lane if hand is not None]
+
+
+def draw_hand_landmarks(frame: cv.Mat, landmark_lists) -> cv.Mat:
+    """ Draw mediapipe hand landmark lists on frame (None draws nothing)
+    """
+    mp_drawing = mp.solutions.drawing_utils
+    mp_drawing_styles = mp.solutions.drawing_styles
+    mp_hands = mp.solutions.hands
+
+    if landmark_lists is not None:
+        for hand_landmarks in landmark_lists:
+            mp_drawing.draw_landmarks(
+                frame,
+                hand_landmarks,
+                mp_hands.HAND_CONNECTIONS,
+                mp_drawing_styles.get_default_hand_landmarks_style(),
+                mp_drawing_styles.get_default_hand_connections_style()
+            )
+    
+    return frame
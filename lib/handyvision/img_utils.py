@@ -2,29 +2,86 @@
 
 Misc. image processing utilities.
 """
+import time
+
 import cv2 as cv
 import numpy as np
-from typing import Tuple
+from typing import Tuple, List, Dict
 
 
-def overlay_transparent_image(background: cv.Mat, overlay: cv.Mat, top_left: np.array):
-    """ Overlay an image with a transparency channel over an image without one
+class PremultipliedImage:
+    """ BGRA image preprocessed once for repeated compositing
 
-    Note: does not handle blending, just binary transparency. 
+    color: BGR premultiplied by alpha (uint8)
+    inverse_alpha: 255 - alpha repeated over the three channels (uint8)
+
+    Compositing is then dst = dst * inverse_alpha / 255 + color, two 
+    saturating uint8 OpenCV ops on the destination region. Build one when an 
+    icon is picked and reuse it every frame it is drawn.
     """
-    overlay_alpha = overlay[:,:,3] / 255.0
-    image_alpha = 1 - overlay_alpha 
+    def __init__(self, image: cv.Mat):
+        alpha = image[:, :, 3:4].astype(np.uint16)
+        self.shape = image.shape[:2]
+        self.color = ((image[:, :, :3] * alpha + 127) // 255).astype(np.uint8)
+        self.inverse_alpha = np.repeat(255 - image[:, :, 3:4], 3, axis=2)
+
 
-    overlay_size = np.array([overlay.shape[0], overlay.shape[1]])
-    bot_right = top_left + overlay_size
+def overlay_premultiplied(background: cv.Mat, overlay: PremultipliedImage, top_left) -> cv.Mat:
+    """ Composite a PremultipliedImage onto a BGR image in place, top_left is (row, col)
 
-    background[top_left[0]:bot_right[0], top_left[1]:bot_right[1], 0:3] = \
-        np.dstack([image_alpha, image_alpha, image_alpha]) * background[top_left[0]:bot_right[0], top_left[1]:bot_right[1], 0:3] \
-        + np.dstack([overlay_alpha, overlay_alpha, overlay_alpha]) * overlay[: , : , 0:3] \
+    Parts of the overlay outside the background are clipped.
+    """
+    h, w = overlay.shape
+    bh, bw = background.shape[:2]
+    top, left = int(top_left[0]), int(top_left[1])
+    rows = np.s_[max(0, -top):min(h, bh - top)]
+    cols = np.s_[max(0, -left):min(w, bw - left)]
+    if rows.start >= rows.stop or cols.start >= cols.stop:
+        return background
 
+    region = background[top + rows.start:top + rows.stop, left + cols.start:left + cols.stop]
+    cv.multiply(region, overlay.inverse_alpha[rows, cols], dst=region, scale=1.0 / 255.0)
+    cv.add(region, overlay.color[rows, cols], dst=region)
     return background
 
 
+def overlay_transparent_image(background: cv.Mat, overlay, top_left: np.array):
+    """ Overlay an image with a transparency channel over an image without one
+
+    overlay: BGRA image or PremultipliedImage, prefer the latter for an image 
+    drawn on many frames. top_left is (row, col), parts of the overlay outside 
+    the background are clipped.
+    """
+    if not isinstance(overlay, PremultipliedImage):
+        overlay = PremultipliedImage(overlay)
+    return overlay_premultiplied(background, overlay, top_left)
+
+
+def pack_atlas(images: Dict[str, np.ndarray], width: int = 1024, padding: int = 2) -> Tuple[np.ndarray, Dict[str, Tuple[int, int, int, int]]]:
+    """ Pack images into one atlas image with shelf packing, return (atlas, {name: (x, y, w, h)})
+
+    Images are placed tallest first, left to right in rows (shelves) no wider 
+    than width, padding pixels apart. All images need the same channel count.
+    """
+    rects = {}
+    x, y, shelf_h = 0, 0, 0
+    for name in sorted(images, key=lambda n: images[n].shape[0], reverse=True):
+        h, w = images[name].shape[:2]
+        if x > 0 and x + w > width:
+            x, y, shelf_h = 0, y + shelf_h + padding, 0
+        rects[name] = (x, y, w, h)
+        x += w + padding
+        shelf_h = max(shelf_h, h)
+
+    atlas_w = max(x + w for x, _, w, _ in rects.values())
+    atlas_h = max(y + h for _, y, _, h in rects.values())
+    first = next(iter(images.values()))
+    atlas = np.zeros((atlas_h, atlas_w) + first.shape[2:], dtype=first.dtype)
+    for name, (x, y, w, h) in rects.items():
+        atlas[y:y + h, x:x + w] = images[name]
+    return atlas, rects
+
+
 def vertically_bisect_image(img: cv.Mat) -> Tuple[cv.Mat, cv.Mat]:
     """ Return the left and right halves of a 2D image
     """
@@ -32,7 +89,7 @@ def vertically_bisect_image(img: cv.Mat) -> Tuple[cv.Mat, cv.Mat]:
     w = img.shape[1]
 
     left_s = np.s_[:, 0 : w//2]
-    right_s = np.s_[:, w//2:w-1]
+    right_s = np.s_[:, w//2:w]
 
     left_half = img[left_s]
     right_half = img[right_s]
@@ -61,3 +118,288 @@ def flip(img: cv.Mat, flip_code: int):
     """ Wrapper around cv.flip
     """
     return cv.flip(img, flip_code)
+
+
+def lane_slices(width: int, num_lanes: int) -> List[slice]:
+    """ Column slices splitting a frame of width into equal vertical lanes, left to right
+    """
+    bounds = [i * width // num_lanes for i in range(num_lanes + 1)]
+    return [np.s_[:, bounds[i]:bounds[i + 1]] for i in range(num_lanes)]
+
+
+class PreprocessStats:
+    """ Per frame preprocessing counters
+
+    allocations: buffer allocations since creation (only on first frame or resolution change)
+    last_allocations: buffer allocations made by the last frame
+    """
+    def __init__(self):
+        self.frames = 0
+        self.allocations = 0
+        self.last_allocations = 0
+        self.last_ms = 0.0
+        self.total_ms = 0.0
+
+    def mean_ms(self) -> float:
+        """ Mean preprocessing time per frame
+        """
+        return self.total_ms / max(1, self.frames)
+
+    def __repr__(self):
+        return (
+            f"PreprocessStats(frames={self.frames}, allocations={self.allocations}, "
+            f"last_ms={self.last_ms:.3f}, mean_ms={self.mean_ms():.3f})"
+        )
+
+
+class FramePreprocessor:
+    """ Mirror, split and BGR -> RGB convert camera frames for the players
+
+    Writes into preallocated buffers that are reused every frame:
+    display: mirrored BGR frame for drawing and display
+    inputs: contiguous RGB inference input, one per player lane (split=True) 
+            or one for the full frame (split=False)
+
+    mirror_inputs: mirror the inference inputs like the display. Disable when 
+    the engines mirror landmarks instead (HPEEConfig.mirror), inputs are then 
+    converted straight from the camera frame and the display flip is not 
+    needed before inference. Lanes stay in display order (inputs[0] is the 
+    player on the left of the display either way).
+    input_scale: downscale the inference inputs by this factor. Lanes are 
+    resized before the colour conversion so it runs on the smaller image.
+
+    Buffers are overwritten by the next frame, copy them if they need 
+    to outlive the frame.
+    """
+    def __init__(
+            self, 
+            num_players: int = 2, 
+            split: bool = True, 
+            mirror_inputs: bool = True, 
+            input_scale: float = 1.0
+        ):
+        self.num_players = num_players
+        self.split = split
+        self.mirror_inputs = mirror_inputs
+        self.input_scale = min(max(input_scale, 0.1), 1.0)
+        self.stats = PreprocessStats()
+        self.shape = None
+        self.display: np.ndarray = None
+        self.display_ready = False
+        self.inputs: List[np.ndarray] = []
+        self.scaled: List[np.ndarray] = []
+        self.slices: List[slice] = []
+        self.source_slices: List[slice] = []
+
+    def process(self, frame: cv.Mat) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """ Preprocess BGR camera frame, return (display, inputs)
+        """
+        inputs = self.process_inputs(frame)
+        return self.process_display(frame), inputs
+
+    def process_inputs(self, frame: cv.Mat) -> List[np.ndarray]:
+        """ Prepare RGB inference inputs from a BGR camera frame
+        """
+        start = time.perf_counter()
+        self.stats.last_allocations = 0
+        if frame.shape != self.shape:
+            self.__allocate(frame.shape)
+
+        if self.mirror_inputs:
+            # Mirror once into the display buffer, then convert each lane 
+            # straight into its contiguous input buffer
+            cv.flip(frame, 1, dst=self.display)
+            self.display_ready = True
+            source, slices = self.display, self.slices
+        else:
+            # Lanes read unmirrored pixels, the engines mirror landmarks
+            self.display_ready = False
+            source, slices = frame, self.source_slices
+
+        lanes = [source[lane] for lane in slices] if self.split else [source]
+        if self.scaled:
+            for lane, scaled, buffer in zip(lanes, self.scaled, self.inputs):
+                cv.resize(lane, (scaled.shape[1], scaled.shape[0]), dst=scaled, interpolation=cv.INTER_AREA)
+                cv.cvtColor(scaled, cv.COLOR_BGR2RGB, dst=buffer)
+        else:
+            for lane, buffer in zip(lanes, self.inputs):
+                cv.cvtColor(lane, cv.COLOR_BGR2RGB, dst=buffer)
+
+        self.__record_time(start)
+        return self.inputs
+
+    def process_display(self, frame: cv.Mat) -> np.ndarray:
+        """ Mirrored BGR display frame (reuses the flip done by process_inputs if any)
+        """
+        if self.display_ready:
+            self.display_ready = False
+            return self.display
+
+        start = time.perf_counter()
+        if frame.shape != self.shape:
+            self.__allocate(frame.shape)
+        cv.flip(frame, 1, dst=self.display)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        self.stats.last_ms += elapsed_ms
+        self.stats.total_ms += elapsed_ms
+        return self.display
+
+    def __record_time(self, start: float):
+        """ 
+        Private.
+        Record per frame timing
+        """
+        self.stats.frames += 1
+        self.stats.last_ms = (time.perf_counter() - start) * 1000.0
+        self.stats.total_ms += self.stats.last_ms
+
+    def __allocate(self, shape):
+        """ 
+        Private.
+        (Re)allocate buffers for a new frame shape
+        """
+        h, w = shape[0], shape[1]
+        self.shape = shape
+        self.display = np.empty(shape, dtype=np.uint8)
+        self.slices = lane_slices(w, self.num_players)
+
+        # Display lane i is camera columns [w - stop, w - start) mirrored
+        self.source_slices = [np.s_[:, w - s[1].stop : w - s[1].start] for s in self.slices]
+
+        widths = [s[1].stop - s[1].start for s in self.slices] if self.split else [w]
+        if self.input_scale < 1.0:
+            h = max(1, int(h * self.input_scale))
+            widths = [max(1, int(lane_w * self.input_scale)) for lane_w in widths]
+            self.scaled = [np.empty((h, lane_w, 3), dtype=np.uint8) for lane_w in widths]
+        self.inputs = [np.empty((h, lane_w, 3), dtype=np.uint8) for lane_w in widths]
+
+        allocations = 1 + len(self.inputs) + len(self.scaled)
+        self.stats.last_allocations += allocations
+        self.stats.allocations += allocations
+
+
+class MotionGateStats:
+    """ Motion gate counters
+
+    frames: frames checked
+    passed: frames let through to inference
+    skipped: frames whose previous results were reused
+    expired: frames let through only because the last results were too old
+    """
+    def __init__(self):
+        self.frames = 0
+        self.passed = 0
+        self.skipped = 0
+        self.expired = 0
+
+    def skip_ratio(self) -> float:
+        """ Fraction of checked frames that skipped inference
+        """
+        return self.skipped / max(1, self.frames)
+
+    def __repr__(self):
+        return (
+            f"MotionGateStats(frames={self.frames}, passed={self.passed}, "
+            f"skipped={self.skipped}, expired={self.expired})"
+        )
+
+
+class MotionGate:
+    """ Cheap change detector in front of inference
+
+    Frames are converted to greyscale, shrunk by downsample and compared with 
+    the thumbnail of the last frame that was let through. A region has changed 
+    when more than threshold of its thumbnail pixels differ by more than 
+    pixel_threshold grey levels. The frame needs inference if any region 
+    changed or the last inference is older than max_age_s.
+
+    threshold: fraction of changed pixels that counts as motion, lower is more sensitive
+    pixel_threshold: grey level difference of a changed pixel, above sensor noise
+    max_age_s: longest time results are reused without inference
+    num_regions: vertical strips checked separately, e.g. one per player lane
+    rgb: frames are RGB (inference inputs) rather than BGR
+    """
+    def __init__(
+            self,
+            threshold: float = 0.002,
+            pixel_threshold: int = 12,
+            max_age_s: float = 0.5,
+            num_regions: int = 1,
+            downsample: int = 8,
+            rgb: bool = True
+        ):
+        self.threshold = threshold
+        self.pixel_threshold = pixel_threshold
+        self.max_age_s = max_age_s
+        self.num_regions = max(1, num_regions)
+        self.downsample = max(1, downsample)
+        self.conversion = cv.COLOR_RGB2GRAY if rgb else cv.COLOR_BGR2GRAY
+        self.stats = MotionGateStats()
+
+        self.shape = None
+        self.grey: np.ndarray = None
+        self.thumb: np.ndarray = None
+        self.reference: np.ndarray = None
+        self.diff: np.ndarray = None
+        self.regions: List[slice] = []
+        self.last_passed: float = None
+
+    def should_process(self, frame: cv.Mat) -> bool:
+        """ Check a frame, True if it needs inference
+
+        A frame that is let through becomes the new reference.
+        """
+        now = time.perf_counter()
+        self.stats.frames += 1
+        if frame.shape != self.shape:
+            self.__allocate(frame.shape)
+
+        cv.cvtColor(frame, self.conversion, dst=self.grey)
+        cv.resize(self.grey, (self.thumb.shape[1], self.thumb.shape[0]), dst=self.thumb, interpolation=cv.INTER_AREA)
+
+        if self.last_passed is None:
+            return self.__pass(now)
+
+        cv.absdiff(self.thumb, self.reference, dst=self.diff)
+        cv.threshold(self.diff, self.pixel_threshold, 1, cv.THRESH_BINARY, dst=self.diff)
+        for region in self.regions:
+            changed = self.diff[region]
+            if cv.countNonZero(changed) > self.threshold * changed.size:
+                return self.__pass(now)
+
+        if now - self.last_passed > self.max_age_s:
+            self.stats.expired += 1
+            return self.__pass(now)
+
+        self.stats.skipped += 1
+        return False
+
+    def reset(self):
+        """ Forget the reference frame, the next frame is always let through
+        """
+        self.last_passed = None
+
+    def __pass(self, now: float) -> bool:
+        """ 
+        Private.
+        Let the current frame through and make it the reference
+        """
+        self.thumb, self.reference = self.reference, self.thumb
+        self.last_passed = now
+        self.stats.passed += 1
+        return True
+
+    def __allocate(self, shape):
+        """ 
+        Private.
+        (Re)allocate buffers for a new frame shape
+        """
+        h, w = shape[0], shape[1]
+        th, tw = max(1, h // self.downsample), max(1, w // self.downsample)
+        self.shape = shape
+        self.grey = np.empty((h, w), dtype=np.uint8)
+        self.thumb = np.empty((th, tw), dtype=np.uint8)
+        self.reference = np.empty((th, tw), dtype=np.uint8)
+        self.diff = np.empty((th, tw), dtype=np.uint8)
+        self.regions = lane_slices(tw, self.num_regions)
+        self.last_passed = None
@@ -0,0 +1,445 @@
+""" inference_server.py
+
+Local hand pose estimation service over a Unix socket or localhost TCP.
+
+API:
+server = InferenceServer("/tmp/handyvision.sock", HPEEConfig(), num_models=2)
+server.start()                          # or serve_forever() in the foreground
+...
+client = InferenceClient("/tmp/handyvision.sock")   # or ("127.0.0.1", 5055)
+result = client.infer(frame)            # BGR frame, sent as JPEG by default
+if result.ok():
+    p_left, p_right = result.get_gesture_estimations()
+client.close()
+server.close()
+
+python -m handyvision.inference_server [--unix PATH | --port 5055] [--models 2]
+
+Each client connection is a session of request / response pairs. Sessions
+are pinned to one of num_models engines when they connect (the one with
+the fewest sessions), so with no more sessions than engines each engine's
+tracking state follows one camera. Every engine has a
+bounded queue of max_queue requests, a request arriving at a full queue is
+answered BUSY at once instead of waiting, which is the client's cue to
+back off or drop the frame. Responses report queue wait (time waiting for
+the engine) and service time (inference) separately.
+
+MediaPipe runs one frame per call, so requests are interleaved over the
+engines rather than batched into one inference.
+
+Wire format, network byte order:
+request:  header !BIHH (encoding, payload bytes, height, width) + payload
+response: header !BBdd (status, lanes, queue wait s, service s) + payload
+          payload (OK only): int16 gestures (lanes, 2) + float32 points (lanes, 2, 21, 3)
+"""
+import argparse
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import cv2 as cv
+import numpy as np
+
+from enum import IntEnum, unique
+from typing import NamedTuple, Tuple, List
+
+from .gesture import *
+from .hand_pose_estimation import HPEE, HPEEConfig
+
+
+@unique
+class FrameEncoding(IntEnum):
+    """ Request payload encoding
+    """
+    RAW = 0     # BGR uint8, height * width * 3 bytes
+    JPEG = 1
+
+
+@unique
+class ResponseStatus(IntEnum):
+    """ Response status
+    """
+    OK = 0
+    BUSY = 1            # engine queue full, retry later or drop the frame
+    BAD_REQUEST = 2     # undecodable frame
+    ERROR = 3           # inference failed
+
+
+REQUEST_HEADER = struct.Struct("!BIHH")
+RESPONSE_HEADER = struct.Struct("!BBdd")
+MAX_PAYLOAD_BYTES = 64 * 1024 * 1024
+
+
+class ServerResult(NamedTuple):
+    """ Decoded response
+
+    gestures: gesture codes indexed [engine lane][hand_index(handedness)]
+    points: (engine lanes, 2, 21, 3) float32 landmarks, NaN where there is no hand
+    queue_wait_s / service_s: measured by the server
+    round_trip_s: measured by the client, includes encoding and transfer
+    """
+    status: ResponseStatus
+    gestures: Tuple[Tuple[int, int], ...]
+    points: np.ndarray
+    queue_wait_s: float
+    service_s: float
+    round_trip_s: float
+
+    def ok(self) -> bool:
+        """ True if the frame was processed
+        """
+        return self.status == ResponseStatus.OK
+
+    def get_gesture_estimations(self, lane: int = 0) -> Tuple[int, int]:
+        """ Return (left gesture, right gesture) codes for an engine lane, out of frame without results
+        """
+        if not self.gestures:
+            return OUT_OF_FRAME_CODE, OUT_OF_FRAME_CODE
+        return self.gestures[lane]
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytearray:
+    """ Read exactly size bytes, None if the peer closed the connection
+    """
+    data = bytearray(size)
+    view = memoryview(data)
+    while view:
+        count = sock.recv_into(view)
+        if count == 0:
+            return None
+        view = view[count:]
+    return data
+
+
+def encode_response(status: ResponseStatus, queue_wait_s: float = 0.0, service_s: float = 0.0, hpee: HPEE = None) -> bytes:
+    """ Response bytes, with the engine's gestures and landmarks if given
+    """
+    if hpee is None:
+        return RESPONSE_HEADER.pack(status, 0, queue_wait_s, service_s)
+
+    gestures = np.array(hpee.hand_gestures, dtype=">i2")
+    points = np.full((hpee.num_lanes, 2, 21, 3), np.nan, dtype=">f4")
+    for lane, lane_states in enumerate(hpee.hand_states):
+        for hand, state in enumerate(lane_states):
+            if state is not None:
+                points[lane, hand] = state.points
+    header = RESPONSE_HEADER.pack(status, hpee.num_lanes, queue_wait_s, service_s)
+    return header + gestures.tobytes() + points.tobytes()
+
+
+def decode_frame(encoding: int, payload: bytes, height: int, width: int) -> np.ndarray:
+    """ BGR frame from a request payload, None if it can not be decoded
+    """
+    if encoding == FrameEncoding.JPEG:
+        return cv.imdecode(np.frombuffer(payload, dtype=np.uint8), cv.IMREAD_COLOR)
+    if encoding == FrameEncoding.RAW and len(payload) == height * width * 3:
+        return np.frombuffer(payload, dtype=np.uint8).reshape(height, width, 3)
+    return None
+
+
+class ServerStats:
+    """ Request accounting, times are totals in seconds over OK requests
+    """
+    def __init__(self):
+        self.requests = 0
+        self.ok = 0
+        self.busy = 0
+        self.bad_requests = 0
+        self.errors = 0
+        self.total_queue_wait_s = 0.0
+        self.total_service_s = 0.0
+        self.lock = threading.Lock()
+
+    def mean_queue_wait_ms(self) -> float:
+        """ Mean time requests waited for their engine
+        """
+        return self.total_queue_wait_s * 1000.0 / max(1, self.ok)
+
+    def mean_service_ms(self) -> float:
+        """ Mean inference time per request
+        """
+        return self.total_service_s * 1000.0 / max(1, self.ok)
+
+    def __repr__(self):
+        return (
+            f"ServerStats(requests={self.requests}, ok={self.ok}, busy={self.busy}, "
+            f"bad_requests={self.bad_requests}, errors={self.errors}, "
+            f"mean_queue_wait_ms={self.mean_queue_wait_ms():.2f}, mean_service_ms={self.mean_service_ms():.2f})"
+        )
+
+
+class InferenceJob:
+    """ One request waiting for an engine
+    """
+    def __init__(self, frame: np.ndarray):
+        self.frame = frame
+        self.enqueued_at = time.perf_counter()
+        self.response: bytes = None
+        self.done = threading.Event()
+
+
+class ModelWorker:
+    """ One engine with its bounded request queue and thread
+    """
+    def __init__(self, config: HPEEConfig, max_queue: int, stats: ServerStats, name: str):
+        self.hpee = HPEE(config)
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.stats = stats
+        self.sessions = 0
+        self.thread = threading.Thread(target=self.__run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, job: InferenceJob) -> bool:
+        """ Queue a job, False if the queue is full
+        """
+        try:
+            self.jobs.put_nowait(job)
+            return True
+        except queue.Full:
+            return False
+
+    def stop(self):
+        """ Stop the thread after the queued jobs
+        """
+        self.jobs.put(None)
+        self.thread.join(timeout=1.0)
+
+    def __run(self):
+        """
+        Private.
+        Run queued jobs until stopped
+        """
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+
+            started_at = time.perf_counter()
+            queue_wait_s = started_at - job.enqueued_at
+            try:
+                self.hpee.update(cv.cvtColor(job.frame, cv.COLOR_BGR2RGB))
+                service_s = time.perf_counter() - started_at
+                job.response = encode_response(ResponseStatus.OK, queue_wait_s, service_s, self.hpee)
+                with self.stats.lock:
+                    self.stats.ok += 1
+                    self.stats.total_queue_wait_s += queue_wait_s
+                    self.stats.total_service_s += service_s
+            except Exception as e:
+                print(f"Inference failed: {e!r}")
+                job.response = encode_response(ResponseStatus.ERROR, queue_wait_s, time.perf_counter() - started_at)
+                with self.stats.lock:
+                    self.stats.errors += 1
+            job.done.set()
+
+
+class SessionHandler(socketserver.BaseRequestHandler):
+    """ Serve request / response pairs of one client connection on its pinned engine
+    """
+    def handle(self):
+        server: InferenceServer = self.server.owner
+        worker = server.pin_session()
+        try:
+            while True:
+                header = recv_exact(self.request, REQUEST_HEADER.size)
+                if header is None:
+                    return
+                encoding, size, height, width = REQUEST_HEADER.unpack(header)
+                if size > MAX_PAYLOAD_BYTES:
+                    self.request.sendall(encode_response(ResponseStatus.BAD_REQUEST))
+                    return
+                payload = recv_exact(self.request, size)
+                if payload is None:
+                    return
+                self.request.sendall(server.handle_request(worker, encoding, payload, height, width))
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            server.unpin_session(worker)
+
+
+class ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class InferenceServer:
+    """ Serve HPEE inference to local clients
+
+    address: Unix socket path, or (host, port) for TCP (port 0 picks a free port)
+    config: engine config of every model instance
+    num_models: engine instances, requests of different sessions run in parallel on them
+    max_queue: requests an engine queues before answering BUSY
+    """
+    def __init__(
+            self,
+            address,
+            config: HPEEConfig = HPEEConfig(),
+            num_models: int = 2,
+            max_queue: int = 2
+        ):
+        self.stats = ServerStats()
+        self.workers: List[ModelWorker] = [
+            ModelWorker(config, max(1, max_queue), self.stats, f"inference_model_{i}")
+            for i in range(max(1, num_models))
+        ]
+        self.session_lock = threading.Lock()
+
+        if isinstance(address, str):
+            self.server = ThreadingUnixServer(address, SessionHandler)
+        else:
+            self.server = ThreadingTCPServer(tuple(address), SessionHandler)
+        self.server.owner = self
+        self.address = self.server.server_address
+        self.thread: threading.Thread = None
+        self.serving = False
+
+    def start(self):
+        """ Serve on a background thread
+        """
+        self.thread = threading.Thread(target=self.serve_forever, name="inference_server", daemon=True)
+        self.thread.start()
+
+    def serve_forever(self):
+        """ Serve until close() is called
+        """
+        self.serving = True
+        self.server.serve_forever()
+
+    def close(self):
+        """ Stop serving and stop the engines
+        """
+        if self.serving:
+            self.server.shutdown()
+        self.server.server_close()
+        for worker in self.workers:
+            worker.stop()
+        if isinstance(self.address, str):
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+    def pin_session(self) -> ModelWorker:
+        """ Engine for a new session, the one with the fewest sessions
+        """
+        with self.session_lock:
+            worker = min(self.workers, key=lambda w: w.sessions)
+            worker.sessions += 1
+            return worker
+
+    def unpin_session(self, worker: ModelWorker):
+        """ Release a session's engine
+        """
+        with self.session_lock:
+            worker.sessions -= 1
+
+    def handle_request(self, worker: ModelWorker, encoding: int, payload: bytes, height: int, width: int) -> bytes:
+        """ Decode a frame, run it on the session's engine and return the response bytes
+        """
+        with self.stats.lock:
+            self.stats.requests += 1
+
+        frame = decode_frame(encoding, payload, height, width)
+        if frame is None:
+            with self.stats.lock:
+                self.stats.bad_requests += 1
+            return encode_response(ResponseStatus.BAD_REQUEST)
+
+        job = InferenceJob(frame)
+        if not worker.submit(job):
+            with self.stats.lock:
+                self.stats.busy += 1
+            return encode_response(ResponseStatus.BUSY)
+
+        job.done.wait()
+        return job.response
+
+
+class InferenceClient:
+    """ Blocking client for InferenceServer, one request at a time
+
+    address: Unix socket path, or (host, port) for TCP
+    encoding: default frame encoding, JPEG is much smaller on the wire
+    jpeg_quality: JPEG quality 0 - 100
+    """
+    def __init__(self, address, encoding: FrameEncoding = FrameEncoding.JPEG, jpeg_quality: int = 80):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.connect(address if isinstance(address, str) else tuple(address))
+        self.encoding = encoding
+        self.jpeg_params = [cv.IMWRITE_JPEG_QUALITY, jpeg_quality]
+
+    def infer(self, frame: cv.Mat, encoding: FrameEncoding = None) -> ServerResult:
+        """ Send a BGR frame and wait for the result
+        """
+        start = time.perf_counter()
+        encoding = self.encoding if encoding is None else encoding
+        height, width = frame.shape[0], frame.shape[1]
+        if encoding == FrameEncoding.JPEG:
+            _, payload = cv.imencode(".jpg", frame, self.jpeg_params)
+        else:
+            payload = np.ascontiguousarray(frame)
+        payload = memoryview(payload).cast("B")
+
+        self.sock.sendall(REQUEST_HEADER.pack(encoding, len(payload), height, width))
+        self.sock.sendall(payload)
+
+        header = recv_exact(self.sock, RESPONSE_HEADER.size)
+        if header is None:
+            raise ConnectionError("Inference server closed the connection")
+        status, lanes, queue_wait_s, service_s = RESPONSE_HEADER.unpack(header)
+
+        gestures, points = (), None
+        if status == ResponseStatus.OK:
+            body = recv_exact(self.sock, lanes * 2 * 2 + lanes * 2 * 21 * 3 * 4)
+            if body is None:
+                raise ConnectionError("Inference server closed the connection")
+            codes = np.frombuffer(body, dtype=">i2", count=lanes * 2).reshape(lanes, 2)
+            gestures = tuple(tuple(int(c) for c in lane) for lane in codes)
+            points = np.frombuffer(body, dtype=">f4", offset=lanes * 2 * 2).reshape(lanes, 2, 21, 3).astype(np.float32)
+
+        return ServerResult(
+            ResponseStatus(status), gestures, points, queue_wait_s, service_s, time.perf_counter() - start
+        )
+
+    def close(self):
+        """ Close the connection
+        """
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local hand pose estimation server")
+    parser.add_argument("--unix", help="Unix socket path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--models", type=int, default=2, help="engine instances")
+    parser.add_argument("--max-queue", type=int, default=2, help="queued requests per engine before BUSY")
+    parser.add_argument("--max-hands", type=int, default=2)
+    args = parser.parse_args()
+
+    address = args.unix if args.unix else (args.host, args.port)
+    server = InferenceServer(address, HPEEConfig(max_hands=args.max_hands), args.models, args.max_queue)
+    print(f"Serving hand pose estimation on {server.address} with {args.models} models")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(server.stats)
+
+
+if __name__ == "__main__":
+    main()
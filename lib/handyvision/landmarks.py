@@ -8,8 +8,6 @@ import numpy as np
 from typing import Tuple, List
 from enum import Enum, IntEnum, auto, unique
 
-from google.protobuf.json_format import MessageToDict
-
 
 @unique
 class Handedness(str, Enum):
@@ -71,12 +69,80 @@ class Finger(IntEnum):
     PINKY = auto()
 
 
+# Index of each hand in (left, right) pairs
+LEFT_HAND = 0
+RIGHT_HAND = 1
+
+
+def hand_index(handedness: Handedness) -> int:
+    """ Index of a hand in (left, right) pairs
+    """
+    return LEFT_HAND if handedness == Handedness.LEFT else RIGHT_HAND
+
+
+_HANDEDNESS_LABELS = {"Left": Handedness.LEFT, "Right": Handedness.RIGHT}
+
+
 def get_handedness(mp_handedness) -> Handedness:
     """ Extract handedness from media pipe handedness output 
     """
-    label: str = MessageToDict(mp_handedness)["classification"][0]["label"]
-    label = label.upper()
-    return Handedness[label]
+    label: str = mp_handedness.classification[0].label
+    handedness = _HANDEDNESS_LABELS.get(label)
+    if handedness is None:
+        handedness = Handedness[label.upper()]
+    return handedness
+
+
+def mirror_handedness(handedness: Handedness) -> Handedness:
+    """ Handedness of a hand seen in a horizontally mirrored image
+    """
+    return Handedness.RIGHT if handedness == Handedness.LEFT else Handedness.LEFT
+
+
+def get_handedness_score(mp_handedness) -> float:
+    """ Extract handedness confidence from media pipe handedness output
+    """
+    return mp_handedness.classification[0].score
+
+
+def hand_results_to_arrays(multi_hand_landmarks, multi_handedness) -> Tuple[np.ndarray, List[Handedness], np.ndarray]:
+    """ Convert mediapipe multi hand results to numpy in one pass
+
+    Returns (points, handedness, scores):
+    points: (N, 21, 3) float32 landmark array
+    handedness: list of N Handedness
+    scores: (N,) float32 handedness confidence
+    """
+    points = np.array(
+        [[(lmark.x, lmark.y, lmark.z) for lmark in hand.landmark] for hand in multi_hand_landmarks],
+        dtype=np.float32
+    )
+    classifications = [hand.classification[0] for hand in multi_handedness]
+    handedness = [
+        _HANDEDNESS_LABELS.get(c.label) or Handedness[c.label.upper()] for c in classifications
+    ]
+    scores = np.array([c.score for c in classifications], dtype=np.float32)
+    return points, handedness, scores
+
+
+NUM_LANDMARKS = len(HandLandmark)
+
+
+def landmarks_to_array(landmarks) -> np.ndarray:
+    """ Convert mediapipe landmarks (output.landmark) to a contiguous (21, 3) float32 array of [x, y, z]
+    """
+    return np.array([(lmark.x, lmark.y, lmark.z) for lmark in landmarks], dtype=np.float32)
+
+
+def array_to_landmarks(points: np.ndarray):
+    """ Convert a (21, 3) landmark array back to a mediapipe NormalizedLandmarkList
+    """
+    from mediapipe.framework.formats import landmark_pb2
+
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in points.tolist():
+        landmark_list.landmark.add(x=x, y=y, z=z)
+    return landmark_list
 
 
 class HandState:
@@ -84,12 +150,41 @@ class HandState:
     Struct representing all hand landmarks generated 
     by mediapipe.
 
-    landmarks: output.landmark 
-    handedness: output.handedness
+    landmarks: output.landmark or a (21, 3) array of [x, y, z]
+    handedness: output.handedness or Handedness
+    score: handedness confidence, read from handedness output if not given
+
+    Landmarks are converted once into points, a contiguous (21, 3) float32 
+    array. The mediapipe landmarks are only needed for drawing and are 
+    rebuilt from points on demand when the state was created from an array.
     """
-    def __init__(self, landmarks, handedness):
-        self.handedness = get_handedness(handedness)
-        self.landmarks = landmarks
+    def __init__(self, landmarks, handedness, score: float = None):
+        if isinstance(handedness, Handedness):
+            self.handedness = handedness
+            self.handedness_score = score
+        else:
+            self.handedness = get_handedness(handedness)
+            self.handedness_score = get_handedness_score(handedness) if score is None else score
+
+        if isinstance(landmarks, np.ndarray):
+            self.points: np.ndarray = np.ascontiguousarray(landmarks, dtype=np.float32)
+            self.__landmarks = None
+        else:
+            self.points: np.ndarray = landmarks_to_array(landmarks)
+            self.__landmarks = landmarks
+
+    @property
+    def landmarks(self):
+        """ Mediapipe landmarks (output.landmark), built lazily from points if needed
+        """
+        if self.__landmarks is None:
+            self.__landmarks = array_to_landmarks(self.points).landmark
+        return self.__landmarks
+
+    def landmark_list(self):
+        """ Landmarks as a mediapipe NormalizedLandmarkList, for drawing
+        """
+        return array_to_landmarks(self.points)
 
     def get(self, index: int):
         """ Get landmark from index
@@ -97,11 +192,16 @@ class HandState:
         return self.landmarks[index]
 
     def get_point(self, index: int) -> np.ndarray:
-        """ Get landmark from index as [x, y]
+        """ Get landmark from index as [x, y] (view into points)
+        """
+        return self.points[index, :2]
+
+    def mirror(self):
+        """ Mirror horizontally in place: x -> 1 - x and handedness swapped
         """
-        lmark = self.get(index)
-        point = np.array([lmark.x, lmark.y])
-        return point
+        self.points[:, 0] = 1.0 - self.points[:, 0]
+        self.handedness = mirror_handedness(self.handedness)
+        self.__landmarks = None
 
     def is_left(self):
         """ Return true if these landmarks are for a left hand
@@ -0,0 +1,370 @@
+""" player_link.py
+
+Stream gestures and landmarks from player machines to a game host.
+
+Player machine (runs its own HPEE with HPEEConfig(mirror=True)):
+sender = PlayerLinkSender(("192.168.1.10", DEFAULT_LINK_PORT), player=0)
+hpee.update(frame)
+sender.send_engine(hpee, capture_s)     # capture_s: time.perf_counter() at capture
+sender.close()
+
+Host:
+receiver = PlayerLinkReceiver(("0.0.0.0", DEFAULT_LINK_PORT), num_players=2)
+state = receiver.latest(0)              # newest RemotePlayerState of player 0 (or None)
+receiver.close()
+
+States travel as single UDP datagrams, newest wins, late or reordered
+datagrams are dropped. Landmarks are quantized to int16 (1/8192 of the
+frame, sub-pixel at 1280 wide). A state is a 17 byte header plus 126 bytes
+per hand, 269 bytes with two hands.
+
+The host pings every sender it has heard from. Each pong gives a clock
+offset sample, offset = remote clock - (host send + host receive) / 2, and
+the sample with the smallest round trip of the recent ones is used, so
+capture times arrive on the host clock and players on different machines
+can be compared. Both ends may run on localhost.
+"""
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from collections import deque
+from enum import IntEnum, unique
+from typing import NamedTuple, Tuple, List
+
+from .gesture import *
+
+
+DEFAULT_LINK_PORT = 5056
+LANDMARK_SCALE = 8192.0
+
+
+@unique
+class LinkMessage(IntEnum):
+    """ Datagram types
+    """
+    STATE = 1
+    PING = 2
+    PONG = 3
+
+
+# type, player, sequence, capture time (sender clock), left gesture, right gesture, hands present mask
+STATE_HEADER = struct.Struct("!BBIdbbB")
+# type, sequence, host send time
+PING_MESSAGE = struct.Struct("!BId")
+# type, sequence, host send time, sender time
+PONG_MESSAGE = struct.Struct("!BIdd")
+
+
+class RemotePlayerState(NamedTuple):
+    """ One state received from a player machine
+
+    gestures: (left, right) gesture codes, see UNKNOWN_GESTURE_CODE
+    points: (2, 21, 3) float32 landmarks [left, right], NaN where there is no hand
+    capture_s: capture time on the host's time.perf_counter() clock (arrival
+               time until the sender's clock offset is known)
+    arrived_s: host time the state arrived
+    """
+    player: int
+    seq: int
+    gestures: Tuple[int, int]
+    points: np.ndarray
+    capture_s: float
+    arrived_s: float
+
+    def get_gesture_estimations(self) -> Tuple[int, int]:
+        """ Return (left gesture, right gesture)
+        """
+        return self.gestures
+
+    def hand_states(self) -> List[HandState]:
+        """ [left, right] HandStates (None where there is no hand), e.g. for drawing
+        """
+        return [
+            None if np.isnan(points[0, 0]) else HandState(points, handedness)
+            for points, handedness in zip(self.points, (Handedness.LEFT, Handedness.RIGHT))
+        ]
+
+
+def encode_state(player: int, seq: int, capture_s: float, gestures, hand_states) -> bytes:
+    """ STATE datagram for (left, right) gestures and HandStates
+    """
+    present = [state is not None for state in hand_states]
+    mask = sum(1 << i for i, p in enumerate(present) if p)
+    codes = [UNKNOWN_GESTURE_CODE if g is None else int(g) for g in gestures]
+    header = STATE_HEADER.pack(LinkMessage.STATE, player, seq, capture_s, codes[0], codes[1], mask)
+
+    points = [state.points for state in hand_states if state is not None]
+    if not points:
+        return header
+    quantized = np.clip(np.rint(np.stack(points) * LANDMARK_SCALE), -32768, 32767).astype(">i2")
+    return header + quantized.tobytes()
+
+
+def decode_state(data: bytes, clock_offset_s: float, arrived_s: float) -> RemotePlayerState:
+    """ RemotePlayerState from a STATE datagram, None if malformed
+
+    clock_offset_s: sender clock - host clock, None if unknown
+    """
+    if len(data) < STATE_HEADER.size:
+        return None
+    _, player, seq, capture_s, left, right, mask = STATE_HEADER.unpack_from(data)
+    present = [bool(mask & (1 << i)) for i in range(2)]
+    count = sum(present)
+    if len(data) != STATE_HEADER.size + count * 21 * 3 * 2:
+        return None
+
+    points = np.full((2, 21, 3), np.nan, dtype=np.float32)
+    if count:
+        quantized = np.frombuffer(data, dtype=">i2", offset=STATE_HEADER.size).reshape(count, 21, 3)
+        points[present] = quantized / LANDMARK_SCALE
+
+    gestures = (left, right)
+    capture_s = arrived_s if clock_offset_s is None else capture_s - clock_offset_s
+    return RemotePlayerState(player, seq, gestures, points, capture_s, arrived_s)
+
+
+class ClockOffsetEstimator:
+    """ Remote clock offset from ping / pong round trips
+
+    Keeps the last window samples and trusts the one with the smallest round
+    trip, its offset error is at most half that round trip.
+    """
+    def __init__(self, window: int = 16):
+        self.samples: deque = deque(maxlen=window)
+
+    def add(self, host_send_s: float, remote_s: float, host_receive_s: float):
+        """ Add a round trip sample
+        """
+        rtt_s = host_receive_s - host_send_s
+        offset_s = remote_s - (host_send_s + host_receive_s) / 2.0
+        self.samples.append((rtt_s, offset_s))
+
+    def offset_s(self) -> float:
+        """ Remote clock - host clock, None without samples
+        """
+        if not self.samples:
+            return None
+        return min(self.samples)[1]
+
+    def rtt_s(self) -> float:
+        """ Smallest recent round trip, None without samples
+        """
+        if not self.samples:
+            return None
+        return min(self.samples)[0]
+
+
+class PlayerLinkSender:
+    """ Player machine end, sends states to the host and answers its pings
+
+    host_address: (host, port) of the PlayerLinkReceiver
+    player: player index on the host
+    """
+    def __init__(self, host_address: Tuple[str, int], player: int):
+        self.host_address = host_address
+        self.player = player
+        self.seq = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("0.0.0.0", 0))
+        self.sock.settimeout(0.2)
+        self.running = True
+        self.thread = threading.Thread(target=self.__answer_pings, name=f"player_link_{player}", daemon=True)
+        self.thread.start()
+
+    def send(self, gestures: Tuple[int, int], hand_states: List[HandState], capture_s: float = None):
+        """ Send (left, right) gestures and HandStates captured at capture_s (time.perf_counter())
+        """
+        if capture_s is None:
+            capture_s = time.perf_counter()
+        self.seq += 1
+        self.sock.sendto(encode_state(self.player, self.seq, capture_s, gestures, hand_states), self.host_address)
+
+    def send_engine(self, hpee, capture_s: float = None, lane: int = 0):
+        """ Send the current results of an HPEE lane
+        """
+        self.send(hpee.get_gesture_estimations(lane), hpee.hand_states[lane], capture_s)
+
+    def close(self):
+        """ Stop answering pings and close the socket
+        """
+        self.running = False
+        self.thread.join(timeout=1.0)
+        self.sock.close()
+
+    def __answer_pings(self):
+        """
+        Private.
+        Reply to host pings with the local clock
+        """
+        while self.running:
+            try:
+                data, address = self.sock.recvfrom(64)
+            except (socket.timeout, ConnectionResetError):
+                # Windows reports unreachable peers of earlier sends here
+                continue
+            except OSError:
+                return
+            if len(data) == PING_MESSAGE.size and data[0] == LinkMessage.PING:
+                _, seq, host_send_s = PING_MESSAGE.unpack(data)
+                reply = PONG_MESSAGE.pack(LinkMessage.PONG, seq, host_send_s, time.perf_counter())
+                try:
+                    self.sock.sendto(reply, address)
+                except OSError:
+                    return
+
+
+class RemotePlayer:
+    """ Host side bookkeeping of one player machine
+    """
+    def __init__(self, history: int):
+        self.address = None
+        self.clock = ClockOffsetEstimator()
+        self.states: deque = deque(maxlen=history)
+        self.last_seq = None
+        self.latency_s: float = None
+        self.dropped = 0
+
+
+class PlayerLinkReceiver:
+    """ Host end, receives player states and estimates each sender's clock offset
+
+    address: (host, port) to listen on
+    ping_interval_s: how often senders are pinged for clock samples
+    history: states kept per player for latest(max_capture_s=...)
+    """
+    def __init__(
+            self,
+            address: Tuple[str, int] = ("0.0.0.0", DEFAULT_LINK_PORT),
+            num_players: int = 2,
+            ping_interval_s: float = 0.5,
+            history: int = 32
+        ):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(address)
+        self.sock.settimeout(0.05)
+        self.address = self.sock.getsockname()
+        self.ping_interval_s = ping_interval_s
+        self.players = [RemotePlayer(history) for _ in range(num_players)]
+        self.lock = threading.Lock()
+        self.ping_seq = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.__receive_loop, name="player_link_receiver", daemon=True)
+        self.thread.start()
+
+    def latest(self, player: int, max_capture_s: float = None) -> RemotePlayerState:
+        """ Newest state of a player, optionally the newest captured at or before max_capture_s
+        """
+        with self.lock:
+            states = self.players[player].states
+            if max_capture_s is None:
+                return states[-1] if states else None
+            return next((s for s in reversed(states) if s.capture_s <= max_capture_s), None)
+
+    def connected(self, player: int) -> bool:
+        """ True once a player's sender has been heard from
+        """
+        return self.players[player].address is not None
+
+    def clock_offset_s(self, player: int) -> float:
+        """ Player clock - host clock, None until estimated
+        """
+        return self.players[player].clock.offset_s()
+
+    def latency_s(self, player: int) -> float:
+        """ Smoothed capture to arrival time of a player's states, None until the clock offset is known
+        """
+        return self.players[player].latency_s
+
+    def close(self):
+        """ Stop receiving and close the socket
+        """
+        self.running = False
+        self.thread.join(timeout=1.0)
+        self.sock.close()
+
+    def __receive_loop(self):
+        """
+        Private.
+        Receive states and pongs, ping senders every ping_interval_s
+        """
+        next_ping = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            if now >= next_ping:
+                self.__ping_all(now)
+                next_ping = now + self.ping_interval_s
+
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except (socket.timeout, ConnectionResetError):
+                # Windows reports unreachable peers of earlier sends here
+                continue
+            except OSError:
+                return
+            arrived_s = time.perf_counter()
+
+            if not data:
+                continue
+            if data[0] == LinkMessage.STATE:
+                self.__on_state(data, address, arrived_s)
+            elif data[0] == LinkMessage.PONG and len(data) == PONG_MESSAGE.size:
+                self.__on_pong(data, address, arrived_s)
+
+    def __on_state(self, data: bytes, address, arrived_s: float):
+        """
+        Private.
+        Store a state, drop late or reordered ones
+        """
+        player_index = data[1] if len(data) > 1 else None
+        if player_index is None or player_index >= len(self.players):
+            return
+        player = self.players[player_index]
+        with self.lock:
+            # A new sender address is a new (or restarted) sender with its own clock
+            if player.address != address:
+                player.address = address
+                player.clock = ClockOffsetEstimator()
+                player.last_seq = None
+                player.latency_s = None
+
+            state = decode_state(data, player.clock.offset_s(), arrived_s)
+            if state is None:
+                return
+            if player.last_seq is not None and state.seq <= player.last_seq:
+                player.dropped += 1
+                return
+            player.last_seq = state.seq
+            player.states.append(state)
+            if player.clock.offset_s() is not None:
+                latency_s = arrived_s - state.capture_s
+                player.latency_s = latency_s if player.latency_s is None \
+                    else player.latency_s + 0.1 * (latency_s - player.latency_s)
+
+    def __on_pong(self, data: bytes, address, arrived_s: float):
+        """
+        Private.
+        Add a clock sample for the player at address
+        """
+        _, _, host_send_s, remote_s = PONG_MESSAGE.unpack(data)
+        with self.lock:
+            for player in self.players:
+                if player.address == address:
+                    player.clock.add(host_send_s, remote_s, arrived_s)
+
+    def __ping_all(self, now: float):
+        """
+        Private.
+        Ping every known sender
+        """
+        self.ping_seq += 1
+        message = PING_MESSAGE.pack(LinkMessage.PING, self.ping_seq, now)
+        for player in self.players:
+            if player.address is not None:
+                try:
+                    self.sock.sendto(message, player.address)
+                except OSError:
+                    pass
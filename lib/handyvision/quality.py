@@ -0,0 +1,166 @@
+""" quality.py
+
+Adaptive inference quality.
+
+API:
+qc = QualityController(target_fps=30)
+hpe.set_quality(qc.level)
+...
+if qc.update(frame_time_s):     # once per frame
+    hpe.set_quality(qc.level)
+
+The controller walks a ladder of QualityLevels, from best quality (index 0)
+to cheapest, to keep the smoothed frame time inside the target budget.
+"""
+from typing import List
+
+
+class QualityLevel:
+    """ One rung of the quality ladder
+
+    model_complexity: mediapipe hands model complexity (0 or 1)
+    inference_scale: inference input downscale factor, landmarks stay normalized
+    inference_interval: run inference on every n-th frame, reuse results in between
+    """
+    def __init__(self, model_complexity: int = 0, inference_scale: float = 1.0, inference_interval: int = 1):
+        self.model_complexity = model_complexity
+        self.inference_scale = inference_scale
+        self.inference_interval = max(1, inference_interval)
+
+    def short_name(self) -> str:
+        """ Compact description for the HUD, e.g. "c0 x0.75 1/2"
+        """
+        return f"c{self.model_complexity} x{self.inference_scale:g} 1/{self.inference_interval}"
+
+    def __repr__(self):
+        return (
+            f"QualityLevel(model_complexity={self.model_complexity}, "
+            f"inference_scale={self.inference_scale}, inference_interval={self.inference_interval})"
+        )
+
+
+# Best quality first. Complexity is dropped first, then resolution, then cadence
+DEFAULT_QUALITY_LADDER = [
+    QualityLevel(1, 1.0, 1),
+    QualityLevel(0, 1.0, 1),
+    QualityLevel(0, 0.75, 1),
+    QualityLevel(0, 0.5, 1),
+    QualityLevel(0, 0.5, 2),
+    QualityLevel(0, 0.5, 3),
+]
+
+
+class QualityController:
+    """ Move along a quality ladder to hold a target frame rate
+
+    Frame times are smoothed with an exponential moving average. Quality drops
+    one level when the average is over budget * degrade_ratio and rises one
+    level when it is under budget * upgrade_ratio. The gap between the two
+    ratios, a minimum dwell time between changes and a growing backoff on
+    upgrades that had to be undone soon after keep it from oscillating.
+
+    target_fps: frame rate to hold, the budget is 1 / target_fps
+    start_level: index into ladder to start from
+    smoothing: EMA weight of the newest frame time
+    min_dwell_frames: frames to stay on a level before changing again
+    """
+    def __init__(
+            self,
+            target_fps: float = 30.0,
+            ladder: List[QualityLevel] = DEFAULT_QUALITY_LADDER,
+            start_level: int = 1,
+            smoothing: float = 0.1,
+            degrade_ratio: float = 1.1,
+            upgrade_ratio: float = 0.7,
+            min_dwell_frames: int = 30
+        ):
+        self.target_fps = target_fps
+        self.budget_s = 1.0 / target_fps
+        self.ladder = ladder
+        self.level_index = min(max(start_level, 0), len(ladder) - 1)
+        self.smoothing = smoothing
+        self.degrade_ratio = degrade_ratio
+        self.upgrade_ratio = upgrade_ratio
+        self.min_dwell_frames = min_dwell_frames
+
+        self.frame_time_s: float = None
+        self.frames_on_level = 0
+        self.upgrade_backoff = 1
+        self.last_change_was_upgrade = False
+        self.changes = 0
+
+    @property
+    def level(self) -> QualityLevel:
+        """ Current quality level
+        """
+        return self.ladder[self.level_index]
+
+    def update(self, frame_time_s: float) -> bool:
+        """ Add a frame time measurement, return True if the level changed
+        """
+        if self.frame_time_s is None:
+            self.frame_time_s = frame_time_s
+        else:
+            self.frame_time_s += self.smoothing * (frame_time_s - self.frame_time_s)
+        self.frames_on_level += 1
+
+        # An upgrade that held for a while was not a mistake, forget earlier ones
+        if self.last_change_was_upgrade and self.frames_on_level >= self.__settle_frames():
+            self.upgrade_backoff = 1
+
+        if self.frames_on_level < self.min_dwell_frames:
+            return False
+
+        if self.frame_time_s > self.budget_s * self.degrade_ratio:
+            return self.__degrade()
+
+        if self.frame_time_s < self.budget_s * self.upgrade_ratio \
+                and self.frames_on_level >= self.min_dwell_frames * self.upgrade_backoff:
+            return self.__upgrade()
+
+        return False
+
+    def describe(self) -> str:
+        """ Level summary for the HUD, e.g. "Q1 c0 x1 1/1"
+        """
+        return f"Q{self.level_index} {self.level.short_name()}"
+
+    def __degrade(self) -> bool:
+        """
+        Private.
+        Drop one quality level, back off further upgrades if the last upgrade did not hold
+        """
+        if self.level_index == len(self.ladder) - 1:
+            return False
+        if self.last_change_was_upgrade and self.frames_on_level < self.__settle_frames():
+            self.upgrade_backoff = min(self.upgrade_backoff * 2, 32)
+        self.__set_level(self.level_index + 1, upgrade=False)
+        return True
+
+    def __upgrade(self) -> bool:
+        """
+        Private.
+        Raise quality one level
+        """
+        if self.level_index == 0:
+            return False
+        self.__set_level(self.level_index - 1, upgrade=True)
+        return True
+
+    def __settle_frames(self) -> int:
+        """
+        Private.
+        Frames after which an upgrade counts as having held
+        """
+        return 4 * self.min_dwell_frames
+
+    def __set_level(self, index: int, upgrade: bool):
+        """
+        Private.
+        Switch level, the smoothed frame time restarts from the new level's first frame
+        """
+        self.level_index = index
+        self.frames_on_level = 0
+        self.frame_time_s = None
+        self.last_change_was_upgrade = upgrade
+        self.changes += 1
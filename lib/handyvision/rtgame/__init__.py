@@ -3,5 +3,6 @@
 Contains utilities for Reaction Time Game (RTG).
 """
 from .utils import *
+from .inference import *
 from .hud import *
 from .game import *
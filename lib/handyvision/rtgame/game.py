@@ -9,12 +9,32 @@ import time
 
 
 class Game:
-    def __init__(self, asset_folder, camera_idx, width = 1280, height=720):
+    def __init__(
+            self, 
+            asset_folder, 
+            camera_idx, 
+            width = 1280, 
+            height=720, 
+            threaded_capture = False, 
+            frame_source = None,
+            display = True,
+            config = None
+        ):
+        """ 
+        frame_source: optional hv.FrameSource (or anything with the Camera interface) 
+                      used instead of the camera, e.g. a recorded session
+        display: show the game window, disable to run headless on recorded sessions
+        config: optional rtg.GameConfig, defaults are used if not provided
+        """
         self.init_success = False
         self.asset_folder = asset_folder
         self.camera_idx = camera_idx
+        self.display = display
         
-        self.cam = hv.Camera(self.camera_idx)
+        if frame_source is None:
+            self.cam = hv.Camera(self.camera_idx, threaded=threaded_capture)
+        else:
+            self.cam = frame_source
         self.cam.set_auto_focus(False)
         self.cam.set_resolution(width, height)
 
@@ -26,18 +46,36 @@ class Game:
         self.frame_height, self.frame_width, _ = frame.shape 
         self.init_success = True
 
-        # Set up hand pose estimate engines 
-        self.p1_hpee = hv.HPEE() 
-        self.p2_hpee = hv.HPEE()
+        # Game config
+        if config is None:
+            config = rtg.GameConfig()
+            config.gesture_icon_scale = (0.5, 0.5)
+            config.flip_off_blur_config.ksize = (7,7)
+            config.flip_off_blur_config.sigmaX = 5
+            config.flip_off_blur_config.sigmaY = 5
+        self.config = config
 
-        self.icons = hv.IconManager(self.asset_folder) 
+        # Set up hand pose estimation for both players
+        self.inference = rtg.create_inference(
+            self.config.inference_mode,
+            network_address=self.config.network_address,
+            mirror=self.config.mirror_landmarks,
+            motion_gate=self.config.motion_gate,
+            motion_max_age_s=self.config.motion_max_age_s,
+            search_after=self.config.search_after,
+            search_interval=self.config.search_interval,
+            inference_scale=self.config.inference_scale
+        )
+        self.preprocessor = self.inference.create_preprocessor()
+        self.scheduler = rtg.InferenceScheduler(self.config.inference_schedule)
 
-        # Game config
-        self.config = rtg.GameConfig()
-        self.config.gesture_icon_scale = (0.5, 0.5)
-        self.config.flip_off_blur_config.ksize = (7,7)
-        self.config.flip_off_blur_config.sigmaX = 5
-        self.config.flip_off_blur_config.sigmaY = 5
+        # Adaptive quality, trades inference quality for frame rate
+        self.quality = None
+        if self.config.adaptive_quality:
+            self.quality = hv.QualityController(target_fps=self.config.target_fps)
+            self.inference.set_quality(self.quality.level)
+
+        self.icons = hv.IconManager(self.asset_folder) 
 
         # FPS
         self.fps = 0
@@ -72,21 +110,29 @@ class Game:
             self.fps, self.frametime_ms = self.fps_counter.update()
             got_frame, frame = self.cam.get_frame()        
             if not got_frame:
+                if not self.cam.good():
+                    print("Frame source closed")
+                    self.cam.release()
+                    self.inference.release()
+                    break
                 print("Missed frame..")
                 continue
+            frame_start = time.perf_counter()
 
-            # Set frame as read-only to pass by reference
-            frame = cv.flip(frame, 1)
-            frame.flags.writeable = False
-            frame_p1, frame_p2, slice_p1, slice_p2 = hv.vertically_bisect_image(frame)
+            # Only run the engines the current state reads, on the state's cadence
+            players_due = self.scheduler.players_due(self.state)
+            if self.scheduler.state_changed:
+                # Gates and held results of the previous state must not answer for this one
+                self.inference.refresh()
+            if any(players_due):
+                # Split and convert into reused buffers, inference never sees the display frame
+                inputs = self.preprocessor.process_inputs(frame) if self.inference.needs_inputs else None
+                self.inference.update(inputs, players_due)
+            estimations = self.scheduler.mask(self.state, self.inference.get_gesture_estimations())
+            (p1_left_g, p1_right_g), (p2_left_g, p2_right_g) = estimations
 
-            self.p1_hpee.update(hv.bgr2rgb(frame_p1))
-            self.p2_hpee.update(hv.bgr2rgb(frame_p2))
-
-            p1_left_g, p1_right_g = self.p1_hpee.get_gesture_estimations()
-            p2_left_g, p2_right_g = self.p2_hpee.get_gesture_estimations()
-
-            frame.flags.writeable = True
+            # Mirrored display frame, flipped here unless the inputs already needed it
+            frame = self.preprocessor.process_display(frame)
             
             # Check both players for FLIPOFF 
             if  p1_left_g == hv.Gesture.FLIPOFF or p1_right_g == hv.Gesture.FLIPOFF:
@@ -95,9 +141,8 @@ class Game:
             if  p2_left_g == hv.Gesture.FLIPOFF or p2_right_g == hv.Gesture.FLIPOFF:
                 frame  = self.hud.muddle_frame(frame, hv.HorizontalHalf.LEFT, self.config)
 
-            if self.draw_hand_landmarks:
-                frame[slice_p1] = self.p1_hpee.annotate_frame(frame_p1)
-                frame[slice_p2] = self.p2_hpee.annotate_frame(frame_p2)
+            if self.draw_hand_landmarks and any(self.scheduler.needs(self.state).players()):
+                frame = self.inference.annotate_frame(frame)
 
             # Draw all consistent UI
             frame = self.hud.draw_hud(frame)
@@ -108,6 +153,8 @@ class Game:
 
             if self.show_fps: 
                 self.hud.draw_fps(frame, self.fps)
+                if self.quality is not None:
+                    self.hud.draw_quality_level(frame, self.quality.describe())
 
             # Draw help on top of other hid items
             if self.show_help:
@@ -144,12 +191,13 @@ class Game:
                     target_gest_left = hv.get_random_gesture([hv.Gesture.FLIPOFF, hv.Gesture.OUT_OF_FRAME])
                     target_gest_right = hv.get_random_gesture([hv.Gesture.FLIPOFF, hv.Gesture.OUT_OF_FRAME])
                     
-                    left_icon = self.icons.icon_for_gesture(
+                    # Premultiplied once per icon and scale, composited every CHECK_GESTURE frame
+                    left_icon = self.icons.premultiplied_icon_for_gesture(
                         hv.Handedness.LEFT, 
                         target_gest_left, 
                         self.config.gesture_icon_scale
                     )
-                    right_icon = self.icons.icon_for_gesture(
+                    right_icon = self.icons.premultiplied_icon_for_gesture(
                         hv.Handedness.RIGHT, 
                         target_gest_right, 
                         self.config.gesture_icon_scale
@@ -209,6 +257,18 @@ class Game:
                     if winscreen_currenttime - winscreen_starttime > 5:
                         self.state = rtg.GameState.IDLE
             
+            # Async inference runs beside the loop, the slower of the two sets the pace.
+            # Frames without inference, skipped by the scheduler or by the engines' own 
+            # gates (inference_time_s() is None), would make quality look cheaper than it is
+            inference_time_s = self.inference.inference_time_s()
+            if self.quality is not None and any(players_due) and inference_time_s is not None:
+                frame_time_s = max(time.perf_counter() - frame_start, inference_time_s)
+                if self.quality.update(frame_time_s):
+                    self.inference.set_quality(self.quality.level)
+
+            if not self.display:
+                continue
+
             cv.imshow("HandyVision!", frame)
 
             key = cv.waitKey(1)
@@ -226,6 +286,7 @@ class Game:
                 self.show_fps = not self.show_fps
             if key & 0xff == ord('q'):
                 self.cam.release()
+                self.inference.release()
                 break
 
     
\ No newline at end of file
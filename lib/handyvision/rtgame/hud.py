@@ -11,6 +11,14 @@ import textwrap
 
 class HUD:
     """ Track and draw game HUD elements on camera frame
+
+    The static HUD (bars, divider, HUD box, player labels) and the help box 
+    are pre-rendered into cached layers, the static HUD is one masked copy 
+    per frame. Layers are re-rendered when the resolution or the theme 
+    (colors, fonts, labels, sizes) changes. Scores, FPS, quality level and 
+    countdown are drawn directly, short anti-aliased text is cheaper to draw 
+    than to blend from a cached patch. Set text_cache to an hv.TextCache to 
+    measure and blit the dynamic text from cached sprites instead.
     """
     def __init__(self, frame_height, frame_width):
 
@@ -109,9 +117,39 @@ class HUD:
             line_type=cv.LINE_AA
         )
 
+        # Pre-rendered static layers
+        self.static_layer = hv.CachedLayer(self.render_static_hud, blend_edges=False)
+        self.help_layer = hv.CachedLayer(self.render_help_box)
+
+        # Per half blur buffers for muddle_frame, tinting red
+        self.muddle_blurs = {half: hv.RegionBlur(tint_channel=2) for half in hv.HorizontalHalf}
+
+        # Optional sprite cache for the dynamic text (hv.TextCache)
+        self.text_cache: hv.TextCache = None
+
+    def theme_key(self):
+        """ Everything the static layers are rendered from, a change triggers a re-render
+        """
+        rects = (self.hud_box, self.bottom_rect, self.top_left_rect, self.top_right_rect)
+        return (
+            self.player1_str,
+            self.player2_str,
+            tuple(self.primary_hud_color),
+            tuple(self.vertical_divider.color),
+            self.vertical_divider.thickness,
+            hv.font_key(self.player_label_font),
+            hv.font_key(self.help_text_font),
+            tuple((r.width, r.height, tuple(r.color), r.thickness, r.line_type) for r in rects)
+        )
+
     def draw_hud(self, frame: cv.Mat):
         """ Draw persistent HUD
         """
+        return self.static_layer.composite(frame, self.theme_key())
+
+    def render_static_hud(self, frame: cv.Mat):
+        """ Draw the static HUD elements, rendered once into static_layer
+        """
         self.draw_hud_box(frame)
         self.draw_vertical_divider(frame)
         self.draw_bottom_bar(frame)
@@ -169,23 +207,28 @@ class HUD:
         """
         # P1
         padding = 10
-        size, baseline = hv.get_text_size(self.player1_str, self.player_label_font)
+        size, baseline = hv.get_text_size(self.player1_str, self.player_label_font, self.text_cache)
         p1_left = size[0] + padding
         p1_bot = size[1] + baseline
 
-        hv.draw_text(frame, f" | {p1_score}", self.player_label_font, (p1_left, p1_bot))
+        hv.draw_text(frame, f" | {p1_score}", self.player_label_font, (p1_left, p1_bot), self.text_cache)
 
         # P2 
-        size, baseline = hv.get_text_size(self.player2_str, self.player_label_font)
-        score_size, _ = hv.get_text_size(f"{p2_score} | ", self.player_label_font)
+        size, baseline = hv.get_text_size(self.player2_str, self.player_label_font, self.text_cache)
+        score_size, _ = hv.get_text_size(f"{p2_score} | ", self.player_label_font, self.text_cache)
 
         p2_left = frame.shape[1] - size[0] - score_size[0] - padding
         p2_bot = size[1] + baseline
-        hv.draw_text(frame, f"{p2_score} | ", self.player_label_font, (p2_left, p2_bot))
+        hv.draw_text(frame, f"{p2_score} | ", self.player_label_font, (p2_left, p2_bot), self.text_cache)
 
     def draw_help_box(self, frame: cv.Mat):
         """ Draw big old help box explaining the app usage
         """
+        return self.help_layer.composite(frame, self.theme_key())
+
+    def render_help_box(self, frame: cv.Mat):
+        """ Draw the help box, rendered once into help_layer
+        """
         # Draw big ass rectanle
         # Draw text inside
         h, w, _ = frame.shape
@@ -223,6 +266,7 @@ class HUD:
         for line in lines:
             hv.draw_text(frame, line, self.help_text_font, (line_left, line_bot))
             line_bot += padding
+        return frame
 
     def draw_player_wins_text(self, frame: cv.Mat, winner):
         """ Draw winner message in HUD box
@@ -240,21 +284,31 @@ class HUD:
         sub_text = f"H for Help"
         centre_hud = self.get_hud_box_centre(frame)
         centre = centre_hud[0], centre_hud[1] + padding
-        size, baseline = hv.get_text_size(sub_text, self.idle_subtext_font)
+        size, baseline = hv.get_text_size(sub_text, self.idle_subtext_font, self.text_cache)
         bot_left = hv.get_text_bot_left(size, baseline, centre)
-        hv.draw_text(frame, sub_text, self.idle_subtext_font, bot_left)
+        hv.draw_text(frame, sub_text, self.idle_subtext_font, bot_left, self.text_cache)
 
     def draw_fps(self, frame: cv.Mat, fps: float) -> cv.Mat:
         """ Draw FPS
         """
         fps_string = f"{fps:0.0f}"
-        return hv.draw_text_bottom_right(frame, fps_string, self.fps_font)
+        return hv.draw_text_bottom_right(frame, fps_string, self.fps_font, self.text_cache)
         
+    def draw_quality_level(self, frame: cv.Mat, level: str) -> cv.Mat:
+        """ Draw the adaptive quality level left of the FPS counter
+        """
+        padding = 20
+        fps_size, _ = hv.get_text_size("000", self.fps_font, self.text_cache)
+        size, baseline = hv.get_text_size(level, self.fps_font, self.text_cache)
+        h, w, _ = frame.shape
+        bot_left = w - 1 - fps_size[0] - padding - size[0], h - baseline
+        return hv.draw_text(frame, level, self.fps_font, bot_left, self.text_cache)
+
     def draw_countdown_page(self, frame: cv.Mat, rounds: int, count: int) -> cv.Mat:
         """ Draw countdown page on frame
         """
         countdown_display_str = f"Starting game with {rounds} rounds..."
-        frame, _ = hv.draw_text_bottom_left(frame, countdown_display_str, self.countdown_text_font)
+        frame, _ = hv.draw_text_bottom_left(frame, countdown_display_str, self.countdown_text_font, self.text_cache)
         frame = self.draw_text_centered_in_hud_box(frame, f"{count}", self.countdown_number_font)
         return frame
 
@@ -262,9 +316,9 @@ class HUD:
         """ Draw text at center of hud box
         """
         hud_centre = self.get_hud_box_centre(frame)
-        text_size, baseline = hv.get_text_size(text, font)
+        text_size, baseline = hv.get_text_size(text, font, self.text_cache)
         text_bot_left = hv.get_text_bot_left(text_size, baseline, hud_centre)
-        return hv.draw_text(frame, text, font, text_bot_left)
+        return hv.draw_text(frame, text, font, text_bot_left, self.text_cache)
 
     def draw_pose_estimates(self, frame, p1_gs, p2_gs):
         """ Draw the current pose estimates (left gesture, right gesture)
@@ -273,18 +327,18 @@ class HUD:
         p1_str = f"L: {p1_l} | R: {p1_r}"
 
         h, w, _ = frame.shape
-        p1_size, p1_baseline = hv.get_text_size(p1_str, self.fps_font)
+        p1_size, p1_baseline = hv.get_text_size(p1_str, self.fps_font, self.text_cache)
         bot_left = w // 4 - p1_size[0] // 2, h - p1_size[1] - 1 + p1_baseline
-        hv.draw_text(frame, p1_str, self.fps_font, bot_left)
+        hv.draw_text(frame, p1_str, self.fps_font, bot_left, self.text_cache)
 
         p2_l, p2_r = hv.get_string_from_gesture(p2_gs[0]), hv.get_string_from_gesture(p2_gs[1])
         p2_str = f"L: {p2_l} | R: {p2_r}"
-        p2_size, p2_baseline = hv.get_text_size(p2_str, self.fps_font)
+        p2_size, p2_baseline = hv.get_text_size(p2_str, self.fps_font, self.text_cache)
         bot_left = 3 * w // 4 - p1_size[0] // 2, h - p1_size[1] - 1 + p1_baseline
-        hv.draw_text(frame, p2_str, self.fps_font, bot_left)
+        hv.draw_text(frame, p2_str, self.fps_font, bot_left, self.text_cache)
 
-    def draw_gesture_icons(self, frame: cv.Mat, left: cv.Mat, right: cv.Mat) -> cv.Mat:
-        """ Draw left and right gesture icons on the frame
+    def draw_gesture_icons(self, frame: cv.Mat, left, right) -> cv.Mat:
+        """ Draw left and right gesture icons (BGRA images or hv.PremultipliedImage) on the frame
         """
         center_col = frame.shape[1] // 2
         overlay_w = left.shape[1]
@@ -309,21 +363,14 @@ class HUD:
     def muddle_frame(self, frame: cv.Mat, half: hv.HorizontalHalf, config: rtg.GameConfig):
         """ Muddle one half of the frame 
 
-        Applies a gaussian filter and tints the screen frame red
+        Applies a gaussian filter and tints the screen frame red, in place 
+        and with the mode of config.flip_off_blur_config
         """
         _, cols, _ = frame.shape
-
-        # Tint + Blur
-        blur_options =config.flip_off_blur_config
-        ksize = blur_options.ksize
-        sx = blur_options.sigmaX
-        sy = blur_options.sigmaY
-
         if half == hv.HorizontalHalf.LEFT:
-            frame[:, 0:cols//2, 2] = 255
-            frame[:, 0:cols//2, :] = cv.GaussianBlur(frame[:, 0:cols//2, :], ksize, sx, sy)
+            region = frame[:, 0:cols//2]
         else:
-            frame[:, cols//2:cols, 2] = 255
-            frame[:, cols//2:cols, :] = cv.GaussianBlur(frame[:, cols//2:cols, :], ksize, sx, sy)
+            region = frame[:, cols//2:cols]
 
+        self.muddle_blurs[half].apply(region, config.flip_off_blur_config)
         return frame
@@ -0,0 +1,613 @@
+""" inference.py
+
+Per-player hand pose inference for the reaction time game (RTG).
+
+Every strategy takes preprocessed RGB inputs from hv.FramePreprocessor and
+produces a (left gesture, right gesture) tuple for each player. split_input
+says which input layout a strategy expects (one buffer per player, or one
+full frame buffer). mirror_landmarks says whether the engines mirror the
+landmarks themselves, in which case the inputs are left unmirrored and
+only the display frame is flipped. create_preprocessor() builds the
+matching preprocessor. A configured inference_scale is applied by the
+preprocessor (fused with the split and colour conversion) rather than by
+the engines, input_scale holds it.
+
+Engine options (mirror, roi_tracking, motion_gate, ...) are HPEEConfig
+arguments, create_inference(mode, mirror=True, motion_gate=True) applies
+them to the mode's default engine config.
+
+DUAL_ENGINE: one HPEE per player half, two inferences per frame
+SHARED_ENGINE: one HPEE over the full frame with max_hands = 4, hands are
+               assigned to players by wrist x and to left/right by handedness
+ASYNC_DUAL_ENGINE: DUAL_ENGINE with each engine on its own worker thread,
+                   the game reads the latest available results without waiting
+ASYNC_SHARED_ENGINE: SHARED_ENGINE on a worker thread
+PARALLEL_DUAL_ENGINE: DUAL_ENGINE with both engines run concurrently on a 
+                      thread pool, results of a frame are gathered before 
+                      update() returns
+NETWORK: every player runs an engine on their own machine and streams 
+         gestures and landmarks to the host (hv.PlayerLinkSender, see 
+         examples/remote_player.py), the host camera is only displayed
+
+update() takes the players whose engines should run this frame, engines of
+the other players keep their last results. InferenceScheduler decides that
+from what the current game state reads (InferenceNeeds). refresh() makes the
+next update() infer regardless of the engines' own skipping (motion gate,
+interval, searching mode) and drops older async results, the game calls it
+when the state changes so a new state never reads the previous one's gestures.
+"""
+import handyvision as hv
+import cv2 as cv
+import copy
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from enum import unique, IntEnum, auto
+from typing import Tuple, List, Dict, Any
+
+
+# (left, right) gesture codes, see hv.UNKNOWN_GESTURE_CODE
+PlayerGestures = Tuple[int, int]
+PlayerFlags = Tuple[bool, bool]
+
+
+@unique
+class InferenceMode(IntEnum):
+    """ How the game runs hand pose estimation for the two players
+    """
+    DUAL_ENGINE = 0
+    SHARED_ENGINE = auto()
+    ASYNC_DUAL_ENGINE = auto()
+    ASYNC_SHARED_ENGINE = auto()
+    PARALLEL_DUAL_ENGINE = auto()
+    NETWORK = auto()
+
+
+class PlayerInference:
+    """ Interface for per-player inference strategies
+    """
+    split_input = True
+    mirror_landmarks = False
+    input_scale = 1.0
+    needs_inputs = True
+
+    def update(self, inputs: List[cv.Mat], players: PlayerFlags = (True, True)):
+        """ Process preprocessed RGB buffers matching split_input
+
+        players: (p1, p2) whose hands are needed, engines only serving 
+        other players skip the frame
+        """
+        raise NotImplementedError
+
+    def get_gesture_estimations(self) -> Tuple[PlayerGestures, PlayerGestures]:
+        """ Return ((p1 left, p1 right), (p2 left, p2 right))
+        """
+        raise NotImplementedError
+
+    def refresh(self):
+        """ Make the next update() of each engine produce fresh results
+        """
+        pass
+
+    def annotate_frame(self, frame: cv.Mat) -> cv.Mat:
+        """ Draw current hand landmarks on the mirrored game frame
+        """
+        return frame
+
+    def get_stats(self) -> List[hv.InferenceStats]:
+        """ Inference counters of each engine
+        """
+        return []
+
+    def set_quality(self, level: hv.QualityLevel):
+        """ Apply a quality level to every engine
+        """
+        pass
+
+    def inference_time_s(self) -> float:
+        """ Time the last inference took, None if the last update ran no inference
+
+        Frames every engine skipped (motion gate, interval, searching mode) 
+        cost next to nothing and are reported as None.
+        """
+        return None
+
+    def create_preprocessor(self) -> hv.FramePreprocessor:
+        """ Frame preprocessor producing the inputs this strategy expects
+        """
+        return hv.FramePreprocessor(
+            num_players=2,
+            split=self.split_input,
+            mirror_inputs=not self.mirror_landmarks,
+            input_scale=self.input_scale
+        )
+
+    def release(self):
+        """ Release any resources held by the strategy
+        """
+        pass
+
+
+def default_engine_config(mode: InferenceMode, **options) -> hv.HPEEConfig:
+    """ Default engine config for a mode, options are passed on to HPEEConfig
+    """
+    if mode in (InferenceMode.SHARED_ENGINE, InferenceMode.ASYNC_SHARED_ENGINE):
+        return hv.HPEEConfig(max_hands=4, num_lanes=2, **options)
+    return hv.HPEEConfig(**options)
+
+
+def preprocessor_scaled_config(config: hv.HPEEConfig) -> Tuple[hv.HPEEConfig, float]:
+    """ Move a config's inference_scale to the preprocessor
+
+    Returns (engine config without downscaling, input scale for the preprocessor).
+    """
+    if config.inference_scale == 1.0:
+        return config, 1.0
+    engine_config = copy.copy(config)
+    engine_config.inference_scale = 1.0
+    return engine_config, config.inference_scale
+
+
+def annotate_halves(frame: cv.Mat, p1_engine, p2_engine) -> cv.Mat:
+    """ Annotate each half of the game frame with its player's engine
+    """
+    frame_p1, frame_p2, slice_p1, slice_p2 = hv.vertically_bisect_image(frame)
+    frame[slice_p1] = p1_engine.annotate_frame(frame_p1)
+    frame[slice_p2] = p2_engine.annotate_frame(frame_p2)
+    return frame
+
+
+class DualEngineInference(PlayerInference):
+    """ One engine per player, each run on its half of the frame
+    """
+    def __init__(self, config: hv.HPEEConfig = None):
+        if config is None:
+            config = default_engine_config(InferenceMode.DUAL_ENGINE)
+        self.mirror_landmarks = config.mirror
+        config, self.input_scale = preprocessor_scaled_config(config)
+        self.p1_hpee = hv.HPEE(config)
+        self.p2_hpee = hv.HPEE(config)
+        self.last_inference_s: float = None
+
+    def update(self, inputs: List[cv.Mat], players: PlayerFlags = (True, True)):
+        start = time.perf_counter()
+        inferred = False
+        if players[0]:
+            inferred |= self.p1_hpee.update(inputs[0])
+        if players[1]:
+            inferred |= self.p2_hpee.update(inputs[1])
+        self.last_inference_s = time.perf_counter() - start if inferred else None
+
+    def get_gesture_estimations(self) -> Tuple[PlayerGestures, PlayerGestures]:
+        return self.p1_hpee.get_gesture_estimations(), self.p2_hpee.get_gesture_estimations()
+
+    def refresh(self):
+        self.p1_hpee.force_next()
+        self.p2_hpee.force_next()
+
+    def annotate_frame(self, frame: cv.Mat) -> cv.Mat:
+        return annotate_halves(frame, self.p1_hpee, self.p2_hpee)
+
+    def get_stats(self) -> List[hv.InferenceStats]:
+        return [self.p1_hpee.stats, self.p2_hpee.stats]
+
+    def set_quality(self, level: hv.QualityLevel):
+        self.p1_hpee.set_quality(level)
+        self.p2_hpee.set_quality(level)
+
+    def inference_time_s(self) -> float:
+        return self.last_inference_s
+
+
+class SharedEngineInference(PlayerInference):
+    """ One engine over the full frame, hands assigned to player lanes
+    """
+    split_input = False
+
+    def __init__(self, config: hv.HPEEConfig = None):
+        if config is None:
+            config = default_engine_config(InferenceMode.SHARED_ENGINE)
+        self.mirror_landmarks = config.mirror
+        config, self.input_scale = preprocessor_scaled_config(config)
+        self.hpee = hv.HPEE(config)
+        self.last_inference_s: float = None
+
+    def update(self, inputs: List[cv.Mat], players: PlayerFlags = (True, True)):
+        self.last_inference_s = None
+        if not any(players):
+            return
+        start = time.perf_counter()
+        if self.hpee.update(inputs[0]):
+            self.last_inference_s = time.perf_counter() - start
+
+    def get_gesture_estimations(self) -> Tuple[PlayerGestures, PlayerGestures]:
+        return self.hpee.get_gesture_estimations(0), self.hpee.get_gesture_estimations(1)
+
+    def refresh(self):
+        self.hpee.force_next()
+
+    def annotate_frame(self, frame: cv.Mat) -> cv.Mat:
+        return self.hpee.annotate_frame(frame)
+
+    def get_stats(self) -> List[hv.InferenceStats]:
+        return [self.hpee.stats]
+
+    def set_quality(self, level: hv.QualityLevel):
+        self.hpee.set_quality(level)
+
+    def inference_time_s(self) -> float:
+        return self.last_inference_s
+
+
+class FanOutStats:
+    """ Cost of running engines concurrently and gathering their results
+
+    wall: time from fan-out to the last result being gathered
+    slowest engine: longest single engine update of the frame
+    overhead: wall - slowest engine, what scheduling and gathering add
+    """
+    def __init__(self):
+        self.frames = 0
+        self.total_wall_s = 0.0
+        self.total_engine_s = 0.0
+        self.last_overhead_s = 0.0
+
+    def add(self, wall_s: float, slowest_engine_s: float):
+        """ Record one frame
+        """
+        self.frames += 1
+        self.total_wall_s += wall_s
+        self.total_engine_s += slowest_engine_s
+        self.last_overhead_s = wall_s - slowest_engine_s
+
+    def mean_overhead_ms(self) -> float:
+        """ Mean fan-out / fan-in overhead per frame
+        """
+        return (self.total_wall_s - self.total_engine_s) * 1000.0 / max(1, self.frames)
+
+    def __repr__(self):
+        frames = max(1, self.frames)
+        return (
+            f"FanOutStats(frames={self.frames}, mean_wall_ms={self.total_wall_s * 1000.0 / frames:.2f}, "
+            f"mean_slowest_engine_ms={self.total_engine_s * 1000.0 / frames:.2f}, "
+            f"mean_overhead_ms={self.mean_overhead_ms():.3f})"
+        )
+
+
+def timed_update(hpee: hv.HPEE, frame: cv.Mat) -> Tuple[float, bool]:
+    """ Update an engine, return the seconds it took and whether inference ran
+    """
+    start = time.perf_counter()
+    inferred = hpee.update(frame)
+    return time.perf_counter() - start, inferred
+
+
+class ParallelDualEngineInference(DualEngineInference):
+    """ One engine per player, both updated concurrently on a thread pool
+
+    Each engine is only used by one pool job at a time and all jobs of a frame 
+    finish before update() returns, so reads see the results of the same frame 
+    for both players. MediaPipe does its work in native code, so threads 
+    overlap the two inferences on machines with spare cores.
+    """
+    def __init__(self, config: hv.HPEEConfig = None):
+        if config is None:
+            config = default_engine_config(InferenceMode.PARALLEL_DUAL_ENGINE)
+        super().__init__(config)
+        self.pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="player_hpee")
+        self.fan_out_stats = FanOutStats()
+
+    def update(self, inputs: List[cv.Mat], players: PlayerFlags = (True, True)):
+        start = time.perf_counter()
+        engines = (self.p1_hpee, self.p2_hpee)
+        jobs = [
+            self.pool.submit(timed_update, engine, frame)
+            for engine, frame, run in zip(engines, inputs, players) if run
+        ]
+        self.last_inference_s = None
+        if not jobs:
+            return
+
+        results = [job.result() for job in jobs]
+        wall_s = time.perf_counter() - start
+        self.fan_out_stats.add(wall_s, max(engine_s for engine_s, _ in results))
+        if any(inferred for _, inferred in results):
+            self.last_inference_s = wall_s
+
+    def release(self):
+        self.pool.shutdown(wait=True)
+
+
+class NetworkInference(PlayerInference):
+    """ Gestures streamed from the players' own machines
+
+    Capture times are on the host clock (see hv.PlayerLinkReceiver), both 
+    players are read at a common playout delay: the larger of the two 
+    players' latencies plus margin_s, capped at max_delay_s. The player with 
+    the faster link is shown slightly late instead of getting a head start, 
+    so reaction times stay comparable.
+
+    A player that is not connected, or whose newest state arrived more than 
+    stale_s ago, reports both hands out of frame like an empty camera lane.
+    """
+    needs_inputs = False
+
+    def __init__(
+            self, 
+            address: Tuple[str, int] = ("0.0.0.0", hv.DEFAULT_LINK_PORT),
+            margin_s: float = 0.01,
+            max_delay_s: float = 0.25,
+            stale_s: float = 0.5
+        ):
+        self.receiver = hv.PlayerLinkReceiver(address, num_players=2)
+        self.margin_s = margin_s
+        self.max_delay_s = max_delay_s
+        self.stale_s = stale_s
+
+    def update(self, inputs: List[cv.Mat], players: PlayerFlags = (True, True)):
+        pass
+
+    def playout_delay_s(self) -> float:
+        """ Common delay both players are read at
+        """
+        latencies = [self.receiver.latency_s(p) for p in range(2)]
+        latencies = [latency for latency in latencies if latency is not None]
+        if not latencies:
+            return 0.0
+        return min(max(latencies) + self.margin_s, self.max_delay_s)
+
+    def get_gesture_estimations(self) -> Tuple[PlayerGestures, PlayerGestures]:
+        no_hands = hv.OUT_OF_FRAME_CODE, hv.OUT_OF_FRAME_CODE
+        return tuple(no_hands if state is None else state.gestures for state in self.__playout_states())
+
+    def annotate_frame(self, frame: cv.Mat) -> cv.Mat:
+        frame_p1, frame_p2, slice_p1, slice_p2 = hv.vertically_bisect_image(frame)
+        for state, half, half_slice in zip(self.__playout_states(), (frame_p1, frame_p2), (slice_p1, slice_p2)):
+            if state is not None:
+                hands = [hand.landmark_list() for hand in state.hand_states() if hand is not None]
+                frame[half_slice] = hv.draw_hand_landmarks(half, hands)
+        return frame
+
+    def release(self):
+        self.receiver.close()
+
+    def __playout_states(self) -> List[hv.RemotePlayerState]:
+        """
+        Private.
+        Each player's newest state captured before now - playout delay, None 
+        for players without one or whose link went quiet for stale_s
+        """
+        now = time.perf_counter()
+        cutoff = now - self.playout_delay_s()
+        states = []
+        for player in range(2):
+            newest = self.receiver.latest(player)
+            fresh = newest is not None and now - newest.arrived_s <= self.stale_s
+            states.append(self.receiver.latest(player, cutoff) if fresh else None)
+        return states
+
+
+def latest_inference_s(*engines: hv.AsyncHPEE) -> float:
+    """ Longest inference time among the latest results of async engines
+
+    None if no latest result ran inference (none yet, or the engines skipped them).
+    """
+    results = [engine.latest() for engine in engines]
+    return max(
+        (result.inference_s() for result in results if result is not None and result.inferred), 
+        default=None
+    )
+
+
+class AsyncDualEngineInference(PlayerInference):
+    """ One asynchronous engine per player half
+
+    Frames are submitted without waiting, gestures come from the latest
+    finished result of each engine. Submitted frames are copied since
+    preprocessed inputs are reused by the next frame.
+    """
+    def __init__(
+            self,
+            config: hv.HPEEConfig = None,
+            drop_policy: hv.DropPolicy = hv.DropPolicy.LATEST_ONLY
+        ):
+        if config is None:
+            config = default_engine_config(InferenceMode.ASYNC_DUAL_ENGINE)
+        self.mirror_landmarks = config.mirror
+        config, self.input_scale = preprocessor_scaled_config(config)
+        self.p1_hpee = hv.AsyncHPEE(config, drop_policy, copy_frames=True, name="p1_hpee")
+        self.p2_hpee = hv.AsyncHPEE(config, drop_policy, copy_frames=True, name="p2_hpee")
+        self.force = [False, False]
+
+    def update(self, inputs: List[cv.Mat], players: PlayerFlags = (True, True)):
+        engines = (self.p1_hpee, self.p2_hpee)
+        for player, (engine, frame, run) in enumerate(zip(engines, inputs, players)):
+            if run:
+                engine.submit(frame, force=self.force[player])
+                self.force[player] = False
+
+    def get_gesture_estimations(self) -> Tuple[PlayerGestures, PlayerGestures]:
+        return self.p1_hpee.get_gesture_estimations(), self.p2_hpee.get_gesture_estimations()
+
+    def refresh(self):
+        self.force = [True, True]
+
+    def annotate_frame(self, frame: cv.Mat) -> cv.Mat:
+        return annotate_halves(frame, self.p1_hpee, self.p2_hpee)
+
+    def get_stats(self) -> List[hv.InferenceStats]:
+        return [self.p1_hpee.hpee.stats, self.p2_hpee.hpee.stats]
+
+    def set_quality(self, level: hv.QualityLevel):
+        self.p1_hpee.set_quality(level)
+        self.p2_hpee.set_quality(level)
+
+    def inference_time_s(self) -> float:
+        return latest_inference_s(self.p1_hpee, self.p2_hpee)
+
+    def release(self):
+        self.p1_hpee.close()
+        self.p2_hpee.close()
+
+
+class AsyncSharedEngineInference(PlayerInference):
+    """ One asynchronous engine over the full frame, hands assigned to player lanes
+    """
+    split_input = False
+
+    def __init__(
+            self,
+            config: hv.HPEEConfig = None,
+            drop_policy: hv.DropPolicy = hv.DropPolicy.LATEST_ONLY
+        ):
+        if config is None:
+            config = default_engine_config(InferenceMode.ASYNC_SHARED_ENGINE)
+        self.mirror_landmarks = config.mirror
+        config, self.input_scale = preprocessor_scaled_config(config)
+        self.hpee = hv.AsyncHPEE(config, drop_policy, copy_frames=True, name="shared_hpee")
+        self.force = False
+
+    def update(self, inputs: List[cv.Mat], players: PlayerFlags = (True, True)):
+        if any(players):
+            self.hpee.submit(inputs[0], force=self.force)
+            self.force = False
+
+    def get_gesture_estimations(self) -> Tuple[PlayerGestures, PlayerGestures]:
+        return self.hpee.get_gesture_estimations(0), self.hpee.get_gesture_estimations(1)
+
+    def refresh(self):
+        self.force = True
+
+    def annotate_frame(self, frame: cv.Mat) -> cv.Mat:
+        return self.hpee.annotate_frame(frame)
+
+    def get_stats(self) -> List[hv.InferenceStats]:
+        return [self.hpee.hpee.stats]
+
+    def set_quality(self, level: hv.QualityLevel):
+        self.hpee.set_quality(level)
+
+    def inference_time_s(self) -> float:
+        return latest_inference_s(self.hpee)
+
+    def release(self):
+        self.hpee.close()
+
+
+class InferenceNeeds:
+    """ Gesture outputs a game state reads and how often
+
+    hands: ((p1 left, p1 right), (p2 left, p2 right)), outputs that are not 
+           read are reported out of frame
+    interval: run inference on every n-th frame of the state, results are 
+              held in between
+    """
+    def __init__(
+            self, 
+            hands: Tuple[PlayerFlags, PlayerFlags] = ((True, True), (True, True)), 
+            interval: int = 1
+        ):
+        self.hands = hands
+        self.interval = max(1, interval)
+
+    def players(self) -> PlayerFlags:
+        """ (p1, p2) whose engines are needed at all
+        """
+        return any(self.hands[0]), any(self.hands[1])
+
+    def __repr__(self):
+        return f"InferenceNeeds(hands={self.hands}, interval={self.interval})"
+
+
+ALL_HANDS = InferenceNeeds()
+NO_HANDS = InferenceNeeds(((False, False), (False, False)))
+
+
+class InferenceScheduler:
+    """ Decide per frame which players' engines run for the current game state
+
+    schedule: InferenceNeeds per game state, states missing from it need all hands
+    
+    The interval restarts when the state changes and state_changed is set for 
+    that frame, the caller refreshes the inference (PlayerInference.refresh) 
+    so the first frame of a state does not reuse the previous state's results. 
+    Counters per player: frames the player's engine ran (runs) and frames it 
+    was skipped (skipped).
+    """
+    def __init__(self, schedule: Dict[Any, InferenceNeeds] = None):
+        self.schedule = {} if schedule is None else schedule
+        self.state = None
+        self.state_changed = False
+        self.frame_index = 0
+        self.runs = [0, 0]
+        self.skipped = [0, 0]
+
+    def needs(self, state) -> InferenceNeeds:
+        """ Needs of a game state
+        """
+        return self.schedule.get(state, ALL_HANDS)
+
+    def players_due(self, state) -> PlayerFlags:
+        """ (p1, p2) whose engines run this frame, call once per frame
+        """
+        self.state_changed = state != self.state
+        if self.state_changed:
+            self.state = state
+            self.frame_index = 0
+
+        needs = self.needs(state)
+        due = self.frame_index % needs.interval == 0
+        self.frame_index += 1
+
+        players = tuple(needed and due for needed in needs.players())
+        for i, run in enumerate(players):
+            if run:
+                self.runs[i] += 1
+            else:
+                self.skipped[i] += 1
+        return players
+
+    def mask(self, state, estimations: Tuple[PlayerGestures, PlayerGestures]) -> Tuple[PlayerGestures, PlayerGestures]:
+        """ Report outputs the state does not read as out of frame
+        """
+        hands = self.needs(state).hands
+        return tuple(
+            tuple(g if needed else hv.OUT_OF_FRAME_CODE for g, needed in zip(gestures, player_hands))
+            for gestures, player_hands in zip(estimations, hands)
+        )
+
+    def skip_ratio(self) -> float:
+        """ Fraction of per player engine frames that were skipped
+        """
+        skipped = sum(self.skipped)
+        return skipped / max(1, skipped + sum(self.runs))
+
+
+def create_inference(
+        mode: InferenceMode, 
+        config: hv.HPEEConfig = None, 
+        network_address: Tuple[str, int] = ("0.0.0.0", hv.DEFAULT_LINK_PORT),
+        **options
+    ) -> PlayerInference:
+    """ Create the inference strategy for a mode
+
+    options: HPEEConfig arguments for the mode's default engine config, 
+    e.g. mirror=True. Ignored if a config is given.
+    network_address: address the host listens on for NETWORK players
+    """
+    if mode == InferenceMode.NETWORK:
+        return NetworkInference(network_address)
+    if config is None:
+        config = default_engine_config(mode, **options)
+
+    match mode:
+        case InferenceMode.SHARED_ENGINE:
+            return SharedEngineInference(config)
+        case InferenceMode.ASYNC_DUAL_ENGINE:
+            return AsyncDualEngineInference(config)
+        case InferenceMode.ASYNC_SHARED_ENGINE:
+            return AsyncSharedEngineInference(config)
+        case InferenceMode.PARALLEL_DUAL_ENGINE:
+            return ParallelDualEngineInference(config)
+        case other:
+            return DualEngineInference(config)
@@ -5,6 +5,8 @@ Utility classes for reaction time game (RTG)
 import handyvision as hv
 import cv2 as cv
 
+from .inference import InferenceMode, InferenceNeeds
+
 from enum import unique, IntEnum, auto
 
 
@@ -31,6 +33,24 @@ class GameConfig:
         self.font = cv.FONT_HERSHEY_SIMPLEX
         self.start_game_count = 5
         self.default_num_rounds = 4
+        self.inference_mode = InferenceMode.DUAL_ENGINE
+        self.mirror_landmarks = False
+        self.motion_gate = False
+        self.motion_max_age_s = 0.5
+        self.search_after = 0
+        self.search_interval = 3
+        self.inference_scale = 1.0
+        self.network_address = ("0.0.0.0", hv.DEFAULT_LINK_PORT)
+        # What each state reads: every state watches all hands for FLIPOFF 
+        # muddling, IDLE (start hold), COUNTDOWN and WIN_SCREEN at a third of 
+        # the frame rate, unlisted states (CHECK_GESTURE) on every frame
+        self.inference_schedule = {
+            GameState.IDLE: InferenceNeeds(interval=3),
+            GameState.COUNTDOWN: InferenceNeeds(interval=3),
+            GameState.WIN_SCREEN: InferenceNeeds(interval=3),
+        }
+        self.adaptive_quality = False
+        self.target_fps = 30
         self.gest_to_rounds = {
             hv.Gesture.POINT : 2,
             hv.Gesture.PEACE : 4,
@@ -0,0 +1,356 @@
+""" worker_pool.py
+
+Multi-process hand pose estimation over shared memory frames.
+
+API:
+pool = HPEEWorkerPool(num_workers=2, config=HPEEConfig(), max_frame_shape=(720, 640, 3))
+job_id = pool.submit(stream, frame)     # None if the stream's worker has no free slot
+result = pool.get_result(timeout=1.0)   # WorkerResult (or None on timeout)
+p_left, p_right = result.get_gesture_estimations()
+pool.close()
+
+Every worker process holds its own MediaPipe models and owns a few slots of
+a shared memory frame ring. Submitting copies the frame into a free slot of
+the stream's worker and sends only the slot index over a pipe, the worker
+answers with a compact WorkerResult (gesture codes and landmark points)
+and the slot is free again.
+
+A stream is a camera or player lane. Streams are routed to worker
+stream % num_workers so an engine's tracking state only ever sees frames
+of one stream, a worker serving several streams keeps one engine per stream.
+
+Crashed workers are restarted, their in-flight jobs are returned as results
+with error set. Exceptions raised by inference are returned the same way
+without restarting the worker.
+"""
+import multiprocessing as mp
+import time
+
+import cv2 as cv
+import numpy as np
+
+from collections import deque
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import NamedTuple, Tuple, List, Dict
+
+from .gesture import *
+from .hand_pose_estimation import HPEE, HPEEConfig
+
+
+class WorkerResult(NamedTuple):
+    """ Compact result of one job
+
+    gestures: gesture codes indexed [engine lane][hand_index(handedness)]
+    points: (engine lanes, 2, 21, 3) float32 landmarks, NaN where there is no hand
+    Timestamps are time.perf_counter() values, comparable across processes
+    on the same machine.
+    """
+    job_id: int
+    stream: int
+    worker: int
+    gestures: Tuple[Tuple[int, int], ...]
+    points: np.ndarray
+    submitted_at: float
+    started_at: float
+    finished_at: float
+    error: str = None
+
+    def ok(self) -> bool:
+        """ True if inference ran
+        """
+        return self.error is None
+
+    def get_gesture_estimations(self, lane: int = 0) -> Tuple[int, int]:
+        """ Return (left gesture, right gesture) codes for an engine lane, out of frame for failed jobs
+        """
+        if not self.gestures:
+            return OUT_OF_FRAME_CODE, OUT_OF_FRAME_CODE
+        return self.gestures[lane]
+
+    def hand_states(self, lane: int = 0) -> List[HandState]:
+        """ [left, right] HandStates of an engine lane (None where there is no hand), e.g. for drawing
+        """
+        return [
+            None if np.isnan(points[0, 0]) else HandState(points, handedness)
+            for points, handedness in zip(self.points[lane], (Handedness.LEFT, Handedness.RIGHT))
+        ]
+
+    def inference_s(self) -> float:
+        """ Time the worker spent on the job
+        """
+        return self.finished_at - self.started_at
+
+    def latency_s(self) -> float:
+        """ Time from submission to result
+        """
+        return self.finished_at - self.submitted_at
+
+
+class WorkerPoolStats:
+    """ Job accounting for HPEEWorkerPool
+
+    rejected_busy: submits refused because the worker had no free slot
+    lost: in-flight jobs of crashed workers
+    """
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected_busy = 0
+        self.lost = 0
+        self.restarts = 0
+
+    def __repr__(self):
+        return (
+            f"WorkerPoolStats(submitted={self.submitted}, completed={self.completed}, "
+            f"failed={self.failed}, rejected_busy={self.rejected_busy}, "
+            f"lost={self.lost}, restarts={self.restarts})"
+        )
+
+
+def compact_result(
+        hpee: HPEE,
+        job_id: int,
+        stream: int,
+        worker: int,
+        submitted_at: float,
+        started_at: float
+    ) -> WorkerResult:
+    """ Build a WorkerResult from the current state of an engine
+    """
+    points = np.full((hpee.num_lanes, 2, 21, 3), np.nan, dtype=np.float32)
+    for lane, lane_states in enumerate(hpee.hand_states):
+        for hand, state in enumerate(lane_states):
+            if state is not None:
+                points[lane, hand] = state.points
+
+    return WorkerResult(
+        job_id=job_id,
+        stream=stream,
+        worker=worker,
+        gestures=tuple(tuple(lane) for lane in hpee.hand_gestures),
+        points=points,
+        submitted_at=submitted_at,
+        started_at=started_at,
+        finished_at=time.perf_counter()
+    )
+
+
+def _worker_main(worker: int, config: HPEEConfig, shm_name: str, num_slots: int, slot_bytes: int, conn):
+    """ Worker process loop: run jobs from conn on frames in the shared ring until closed
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray((num_slots, slot_bytes), dtype=np.uint8, buffer=shm.buf)
+    engines: Dict[int, HPEE] = {}
+    try:
+        while True:
+            job = conn.recv()
+            if job is None:
+                break
+
+            job_id, stream, slot, shape, submitted_at = job
+            started_at = time.perf_counter()
+            try:
+                if stream not in engines:
+                    engines[stream] = HPEE(config)
+                frame = ring[slot, :int(np.prod(shape))].reshape(shape)
+                engines[stream].update(frame)
+                result = compact_result(engines[stream], job_id, stream, worker, submitted_at, started_at)
+            except Exception as e:
+                result = WorkerResult(
+                    job_id, stream, worker, (), None, submitted_at, started_at, time.perf_counter(), repr(e)
+                )
+            conn.send(result)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del ring
+        shm.close()
+
+
+class HPEEWorkerPool:
+    """ Pool of hand pose estimation worker processes fed through shared memory
+
+    num_workers: worker processes, each with its own MediaPipe models
+    config: engine config for every stream
+    max_frame_shape: largest (height, width, channels) frame that will be submitted
+    slots_per_worker: ring slots per worker, jobs a worker can have in flight
+    """
+    def __init__(
+            self,
+            num_workers: int = 2,
+            config: HPEEConfig = HPEEConfig(),
+            max_frame_shape: Tuple[int, int, int] = (720, 1280, 3),
+            slots_per_worker: int = 2
+        ):
+        self.num_workers = max(1, num_workers)
+        self.config = config
+        self.slots_per_worker = max(1, slots_per_worker)
+        self.num_slots = self.num_workers * self.slots_per_worker
+        self.slot_bytes = int(np.prod(max_frame_shape))
+
+        self.shm = shared_memory.SharedMemory(create=True, size=self.num_slots * self.slot_bytes)
+        self.ring = np.ndarray((self.num_slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf)
+
+        self.stats = WorkerPoolStats()
+        self.context = mp.get_context("spawn")
+        self.next_job_id = 0
+        self.ready: deque = deque()
+        self.processes: List[mp.Process] = [None] * self.num_workers
+        self.conns = [None] * self.num_workers
+        self.free_slots: List[deque] = [
+            deque(range(w * self.slots_per_worker, (w + 1) * self.slots_per_worker))
+            for w in range(self.num_workers)
+        ]
+        self.in_flight: List[Dict[int, Tuple[int, int, float]]] = [{} for _ in range(self.num_workers)]
+        self.running = True
+
+        for worker in range(self.num_workers):
+            self.__start_worker(worker)
+
+    def worker_for(self, stream: int) -> int:
+        """ Worker serving a stream
+        """
+        return stream % self.num_workers
+
+    def submit(self, stream: int, frame: cv.Mat) -> int:
+        """ Copy a frame into the stream's worker's ring and queue it, return the job id
+
+        Returns None if the worker has no free slot (all its jobs are still in
+        flight) or the frame does not fit a slot.
+        """
+        if frame.dtype != np.uint8 or frame.nbytes > self.slot_bytes:
+            print(f"Frame {frame.shape} {frame.dtype} does not fit a worker pool slot")
+            return None
+
+        worker = self.worker_for(stream)
+        if not self.free_slots[worker]:
+            self.stats.rejected_busy += 1
+            return None
+
+        submitted_at = time.perf_counter()
+        slot = self.free_slots[worker].popleft()
+        np.copyto(self.ring[slot, :frame.nbytes].reshape(frame.shape), frame)
+
+        job_id = self.next_job_id
+        self.next_job_id += 1
+        self.in_flight[worker][job_id] = (slot, stream, submitted_at)
+        self.stats.submitted += 1
+        try:
+            self.conns[worker].send((job_id, stream, slot, frame.shape, submitted_at))
+        except (BrokenPipeError, ConnectionResetError, EOFError):
+            self.__restart_worker(worker)
+        return job_id
+
+    def get_result(self, timeout: float = None) -> WorkerResult:
+        """ Next finished result in completion order, None on timeout
+
+        Also notices crashed workers, restarts them and returns their lost jobs
+        as results with error set.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while not self.ready:
+            if not any(self.in_flight):
+                return None
+
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            sentinels = {self.processes[w].sentinel: w for w in range(self.num_workers)}
+            conns = {self.conns[w]: w for w in range(self.num_workers)}
+            ready = wait(list(conns) + list(sentinels), remaining)
+            if not ready and deadline is not None:
+                return None
+
+            for obj in ready:
+                if obj in conns:
+                    self.__receive(conns[obj])
+            for obj in ready:
+                if obj in sentinels and not self.processes[sentinels[obj]].is_alive():
+                    self.__restart_worker(sentinels[obj])
+
+        return self.ready.popleft()
+
+    def pending(self) -> int:
+        """ Jobs submitted but not yet returned by get_result
+        """
+        return sum(len(jobs) for jobs in self.in_flight) + len(self.ready)
+
+    def kill_worker(self, worker: int):
+        """ Kill a worker process, e.g. to exercise crash recovery
+        """
+        self.processes[worker].kill()
+
+    def close(self):
+        """ Stop the workers and free the shared memory, in-flight jobs are discarded
+        """
+        if not self.running:
+            return
+        self.running = False
+        for conn in self.conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+        for process, conn in zip(self.processes, self.conns):
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            conn.close()
+
+        del self.ring
+        self.shm.close()
+        self.shm.unlink()
+
+    def __receive(self, worker: int):
+        """
+        Private.
+        Read one result from a worker and free its slot
+        """
+        try:
+            result = self.conns[worker].recv()
+        except (EOFError, ConnectionResetError):
+            return
+
+        slot, _, _ = self.in_flight[worker].pop(result.job_id)
+        self.free_slots[worker].append(slot)
+        if result.ok():
+            self.stats.completed += 1
+        else:
+            self.stats.failed += 1
+        self.ready.append(result)
+
+    def __start_worker(self, worker: int):
+        """
+        Private.
+        Spawn a worker process with a fresh pipe
+        """
+        parent_conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=_worker_main,
+            args=(worker, self.config, self.shm.name, self.num_slots, self.slot_bytes, child_conn),
+            name=f"hpee_worker_{worker}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.processes[worker] = process
+        self.conns[worker] = parent_conn
+
+    def __restart_worker(self, worker: int):
+        """
+        Private.
+        Replace a crashed worker, its in-flight jobs are reported as lost
+        """
+        print(f"Worker {worker} exited with code {self.processes[worker].exitcode}, restarting")
+        now = time.perf_counter()
+        for job_id, (slot, stream, submitted_at) in self.in_flight[worker].items():
+            self.free_slots[worker].append(slot)
+            self.ready.append(WorkerResult(job_id, stream, worker, (), None, submitted_at, now, now, "worker crashed"))
+            self.stats.lost += 1
+        self.in_flight[worker].clear()
+
+        self.conns[worker].close()
+        self.processes[worker].join(timeout=1.0)
+        self.stats.restarts += 1
+        self.__start_worker(worker)